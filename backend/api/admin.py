@@ -1,3 +1,28 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import MasterResume, JobDescription, CustomizedResume, CustomizationProfile
+
+
+@admin.register(MasterResume)
+class MasterResumeAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'created_at')
+    list_select_related = ('user',)
+
+
+@admin.register(JobDescription)
+class JobDescriptionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'job_title', 'user', 'created_at')
+    list_select_related = ('user',)
+
+
+@admin.register(CustomizedResume)
+class CustomizedResumeAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'job_description', 'created_at')
+    list_select_related = ('user', 'job_description')
+    raw_id_fields = ('master_resume', 'job_description')
+
+
+@admin.register(CustomizationProfile)
+class CustomizationProfileAdmin(admin.ModelAdmin):
+    list_display = ('id', 'customized_resume', 'sample_count', 'peak_memory', 'created_at')
+    raw_id_fields = ('customized_resume',)
@@ -0,0 +1,116 @@
+import uuid
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.contrib.auth.signals import user_logged_out
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+User = get_user_model()
+
+
+# Generation shared by every entry, bumped by changes that can touch many users at once
+ALL_USERS_GENERATION_KEY = 'jwt-user-gen:*'
+
+
+def _cache_keys(user_id):
+    return f'jwt-user:{user_id}', f'jwt-user-gen:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    """Drop a user from the JWT user cache so the next request re-reads it"""
+    entry_key, generation_key = _cache_keys(user_id)
+    # A new generation also voids entries stored by requests that read the row just before the change
+    cache.set(generation_key, uuid.uuid4().hex, settings.JWT_USER_CACHE_TTL or None)
+    cache.delete(entry_key)
+
+
+def invalidate_all_cached_users():
+    """Drop every user from the JWT user cache"""
+    cache.set(ALL_USERS_GENERATION_KEY, uuid.uuid4().hex, settings.JWT_USER_CACHE_TTL or None)
+
+
+def update_users(queryset, **fields):
+    """queryset.update(**fields) on users, dropping the JWT user cache.
+
+    QuerySet.update() sends no save signals, so bulk changes to users (deactivating accounts,
+    revoking staff) must go through here or the cache serves the old rows until they expire.
+    """
+    with transaction.atomic():
+        updated = queryset.update(**fields)
+        _invalidate_now_and_on_commit(invalidate_all_cached_users)
+    return updated
+
+
+def _invalidate_now_and_on_commit(invalidate, *args):
+    invalidate(*args)
+    # Again once committed, so a request reading the old row mid-transaction cannot re-cache it
+    transaction.on_commit(lambda: invalidate(*args))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that resolves the token's user through a short-lived cache.
+
+    The whole User row is cached, including is_active, is_staff, is_superuser and the password
+    hash. Entries live for settings.JWT_USER_CACHE_TTL seconds and are dropped whenever the user
+    is saved (profile edits, password changes, deactivation), deleted or logged out, and all of
+    them when group membership or permissions change or users are bulk-updated through
+    update_users(). Group and per-user permissions themselves are not cached: has_perm() still
+    queries them per request. Invalidating across workers needs a shared cache backend (e.g.
+    Redis), like the customize request coalescer.
+    """
+
+    def get_user(self, validated_token):
+        if not settings.JWT_USER_CACHE_TTL:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        entry_key, generation_key = _cache_keys(user_id)
+        cached = cache.get_many([entry_key, generation_key, ALL_USERS_GENERATION_KEY])
+        generation = (cached.get(generation_key), cached.get(ALL_USERS_GENERATION_KEY))
+        entry = cached.get(entry_key)
+        if entry is None or entry[0] != generation:
+            user = super().get_user(validated_token)
+            cache.set(entry_key, (generation, user), settings.JWT_USER_CACHE_TTL)
+            return user
+        user = entry[1]
+
+        # Checks that depend on the token have to run on every request
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def _invalidate_on_user_change(sender, instance, **kwargs):
+    _invalidate_now_and_on_commit(invalidate_cached_user, instance.pk)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def _invalidate_on_access_change(sender, action, **kwargs):
+    # Either side of these relations may change many users at once; they change rarely
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        _invalidate_now_and_on_commit(invalidate_all_cached_users)
+
+
+@receiver(user_logged_out)
+def _invalidate_on_logout(sender, request, user, **kwargs):
+    if user is not None:
+        invalidate_cached_user(user.pk)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from api.models import CustomizedResume
+from api.utils import pdf_pool
+
+
+class Command(BaseCommand):
+    help = "Extract searchable text for customized resumes generated before search was added"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help="Rows loaded per query")
+
+    def handle(self, *args, **options):
+        # Rows are updated one by one so the search_vector trigger indexes each as it goes
+        rows = CustomizedResume.objects.filter(resume_text='').exclude(customized_resume_file='').only(
+            'id', 'customized_resume_file'
+        )
+        updated = failed = 0
+        for customized_resume in rows.iterator(chunk_size=options['batch_size']):
+            text = pdf_pool.extract_plain_text(customized_resume.customized_resume_file.path)
+            if not text:
+                self.stderr.write(f"Resume {customized_resume.id}: no text extracted")
+                failed += 1
+                continue
+            CustomizedResume.objects.filter(pk=customized_resume.pk).update(resume_text=text)
+            updated += 1
+        self.stdout.write(self.style.SUCCESS(f"Indexed {updated} resumes ({failed} unreadable)"))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from api.services.storage_gc import StorageGarbageCollector
+
+
+class Command(BaseCommand):
+    help = "Remove media files no longer referenced by any resume row, and stale temp files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Files checked against the database per query")
+        parser.add_argument('--min-age', type=int, default=3600,
+                            help="Seconds a file must be untouched before it can be treated as orphaned")
+        parser.add_argument('--temp-max-age', type=int, default=3600,
+                            help="Seconds after which files in temp/ are considered abandoned")
+        parser.add_argument('--limit', type=int, default=None,
+                            help="Stop after removing this many files")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Report what would be removed without deleting anything")
+
+    def handle(self, *args, **options):
+        collector = StorageGarbageCollector(
+            batch_size=options['batch_size'],
+            min_age=options['min_age'],
+            temp_max_age=options['temp_max_age'],
+            limit=options['limit'],
+            dry_run=options['dry_run'],
+        )
+        stats = collector.run()
+        verb = "Would remove" if options['dry_run'] else "Removed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {stats['removed']} of {stats['scanned']} scanned files, "
+            f"reclaiming {stats['reclaimed_bytes']} bytes ({stats['errors']} errors)"
+        ))
@@ -0,0 +1,71 @@
+import re
+import time
+import uuid
+import random
+import logging
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+from .utils.request_context import request_id, span_events_sampled
+
+logger = logging.getLogger('resume_customizer')
+
+REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+@sync_and_async_middleware
+def request_context_middleware(get_response):
+    """Give each request a correlation id for its log records and log one summary record per request.
+
+    An incoming X-Request-ID header is reused when it looks sane, so ids can be followed across
+    the proxy; the id is echoed back in the response.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            tokens, started = _start(request)
+            try:
+                response = await get_response(request)
+            finally:
+                _reset(tokens)
+            return _finish(request, response, started)
+    else:
+        def middleware(request):
+            tokens, started = _start(request)
+            try:
+                response = get_response(request)
+            finally:
+                _reset(tokens)
+            return _finish(request, response, started)
+    return middleware
+
+
+def _start(request):
+    incoming = request.headers.get('X-Request-ID', '')
+    request.request_id = incoming if REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex
+    tokens = (
+        request_id.set(request.request_id),
+        span_events_sampled.set(random.random() < settings.LOG_SPAN_SAMPLE_RATE),
+    )
+    return tokens, time.perf_counter()
+
+
+def _reset(tokens):
+    request_id.reset(tokens[0])
+    span_events_sampled.reset(tokens[1])
+
+
+def _finish(request, response, started):
+    response['X-Request-ID'] = request.request_id
+    duration_ms = (time.perf_counter() - started) * 1000
+    logger.info(
+        "%s %s %s %.1fms", request.method, request.path, response.status_code, duration_ms,
+        extra={
+            'request_id': request.request_id,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 1),
+        }
+    )
+    return response
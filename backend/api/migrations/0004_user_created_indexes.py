@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_alter_jobdescription_description_text'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customizedresume',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='customresume_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobdescription',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='jobdesc_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='masterresume',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='masterresume_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_user_created_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customizedresume',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:25
+
+import api.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_customizedresume_content_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customizedresume',
+            name='customized_resume_file',
+            field=models.FileField(upload_to=api.models.customized_resume_upload_to),
+        ),
+        migrations.AlterField(
+            model_name='masterresume',
+            name='resume_file',
+            field=models.FileField(upload_to=api.models.master_resume_upload_to),
+        ),
+    ]
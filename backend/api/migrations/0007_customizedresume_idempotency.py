@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_sharded_upload_paths'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customizedresume',
+            name='idempotency_key',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='customizedresume',
+            name='input_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='customizedresume',
+            index=models.Index(fields=['user', 'idempotency_key'], name='customresume_idem_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customizedresume',
+            index=models.Index(fields=['user', 'input_hash'], name='customresume_input_hash_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:33
+
+import api.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_customizedresume_idempotency'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customizedresume',
+            name='thumbnail',
+            field=models.FileField(blank=True, upload_to=api.models.thumbnail_upload_to),
+        ),
+    ]
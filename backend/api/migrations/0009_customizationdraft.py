@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_customizedresume_thumbnail'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomizationDraft',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('replacements', models.JSONField(default=dict)),
+                ('group_rewrites', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('customized_resume', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.customizedresume')),
+                ('job_description', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.jobdescription')),
+                ('master_resume', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.masterresume')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-created_at', '-id'], name='draft_user_created_idx')],
+            },
+        ),
+    ]
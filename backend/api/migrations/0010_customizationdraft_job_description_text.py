@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_customizationdraft'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customizationdraft',
+            name='job_description_text',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
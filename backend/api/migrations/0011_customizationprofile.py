@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_customizationdraft_job_description_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomizationProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('folded_stacks', models.TextField(blank=True, default='')),
+                ('sample_interval', models.FloatField()),
+                ('sample_count', models.PositiveIntegerField(default=0)),
+                ('stage_timings', models.JSONField(default=dict)),
+                ('stage_memory', models.JSONField(default=dict)),
+                ('peak_memory', models.PositiveBigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('customized_resume', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profile', to='api.customizedresume')),
+            ],
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:24
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations, models
+
+# Search vectors are computed by BEFORE INSERT/UPDATE triggers, so bulk_create, queryset
+# updates and admin edits all keep them current. Triggers and GIN indexes only exist on
+# PostgreSQL; other backends (SQLite in development and tests) get plain nullable columns.
+SEARCH_TRIGGERS = [
+    (
+        'api_jobdescription',
+        "setweight(to_tsvector('english', coalesce({row}.job_title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce({row}.description_text, '')), 'B')",
+        'job_title, description_text',
+        'jobdesc_search_idx',
+    ),
+    (
+        'api_customizedresume',
+        "to_tsvector('english', coalesce({row}.resume_text, ''))",
+        'resume_text',
+        'customresume_search_idx',
+    ),
+]
+
+
+def create_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, vector, columns, index in SEARCH_TRIGGERS:
+        schema_editor.execute(f"""
+            CREATE FUNCTION {table}_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := {vector.format(row='NEW')};
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        schema_editor.execute(f"""
+            CREATE TRIGGER {table}_search_vector_trigger
+            BEFORE INSERT OR UPDATE OF {columns} ON {table}
+            FOR EACH ROW EXECUTE FUNCTION {table}_search_vector_update()
+        """)
+        schema_editor.execute(f"UPDATE {table} SET search_vector = {vector.format(row=table)}")
+        schema_editor.execute(f"CREATE INDEX {index} ON {table} USING gin (search_vector)")
+
+
+def drop_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, _, _, index in SEARCH_TRIGGERS:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {index}")
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_search_vector_trigger ON {table}")
+        schema_editor.execute(f"DROP FUNCTION IF EXISTS {table}_search_vector_update()")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_customizationprofile'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customizedresume',
+            name='resume_text',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='customizedresume',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='jobdescription',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='customizedresume',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='customresume_search_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='jobdescription',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='jobdesc_search_idx'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_triggers, drop_search_triggers),
+            ],
+        ),
+    ]
@@ -1,20 +1,45 @@
+import uuid
+import hashlib
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 User = get_user_model()
 
+def sharded_path(prefix, filename):
+    """Build '<prefix>/ab/cd/<token>_<filename>' so no single directory grows unbounded"""
+    token = uuid.uuid4().hex
+    return f'{prefix}/{token[:2]}/{token[2:4]}/{token}_{filename}'
+
+def master_resume_upload_to(instance, filename):
+    return sharded_path('resumes', filename)
+
+def customized_resume_upload_to(instance, filename):
+    return sharded_path('customized_resumes', filename)
+
+def thumbnail_upload_to(instance, filename):
+    return sharded_path('thumbnails', filename)
+
 class MasterResume(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    resume_file = models.FileField(upload_to='resumes/')
+    resume_file = models.FileField(upload_to=master_resume_upload_to)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.user.username}'s Master Resume"
+        return f"Master Resume {self.id}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='masterresume_user_created_idx'),
+        ]
 
 class JobDescription(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     job_title = models.CharField(max_length=255)
     description_text = models.TextField()
+    # Title (weight A) and text (weight B); maintained by a Postgres trigger on every write
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -22,13 +47,89 @@ class JobDescription(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='jobdesc_user_created_idx'),
+            GinIndex(fields=['search_vector'], name='jobdesc_search_idx'),
+        ]
 
 class CustomizedResume(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     master_resume = models.ForeignKey(MasterResume, on_delete=models.CASCADE)
     job_description = models.ForeignKey(JobDescription, null=True, blank=True, on_delete=models.CASCADE)
-    customized_resume_file = models.FileField(upload_to='customized_resumes/')
+    customized_resume_file = models.FileField(upload_to=customized_resume_upload_to)
+    # First-page PNG preview, rendered while the PDF is open for replacement (or lazily on first request)
+    thumbnail = models.FileField(upload_to=thumbnail_upload_to, blank=True)
+    # SHA-256 of the stored PDF, used as the strong ETag for downloads
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+    # Client-supplied Idempotency-Key, and the hash of (user, resume, JD, model) used when none is sent
+    idempotency_key = models.CharField(max_length=255, blank=True, default='')
+    input_hash = models.CharField(max_length=64, blank=True, default='')
+    # Plain text of the generated PDF, and its search vector maintained by a Postgres trigger
+    resume_text = models.TextField(blank=True, default='')
+    search_vector = SearchVectorField(null=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def ensure_content_hash(self):
+        """Compute and store content_hash for rows created before hashes were recorded"""
+        if not self.content_hash:
+            hasher = hashlib.sha256()
+            with self.customized_resume_file.open('rb') as f:
+                for chunk in f.chunks():
+                    hasher.update(chunk)
+            self.content_hash = hasher.hexdigest()
+            self.save(update_fields=['content_hash'])
+        return self.content_hash
+
+    def __str__(self):
+        # Only touch local columns so admin and logging never trigger extra queries
+        return f"Customized Resume {self.id} (job description {self.job_description_id})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='customresume_user_created_idx'),
+            models.Index(fields=['user', 'idempotency_key'], name='customresume_idem_key_idx'),
+            models.Index(fields=['user', 'input_hash'], name='customresume_input_hash_idx'),
+            GinIndex(fields=['search_vector'], name='customresume_search_idx'),
+        ]
+
+class CustomizationDraft(models.Model):
+    """AI rewrites of one customization run.
+
+    Dry runs store them to be rendered later without new AI calls; full runs store them
+    (already linked to their CustomizedResume) so a later JD edit can reuse unaffected groups.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    master_resume = models.ForeignKey(MasterResume, on_delete=models.CASCADE)
+    job_description = models.ForeignKey(JobDescription, on_delete=models.CASCADE)
+    # The JD text the rewrites were generated for; the JobDescription row itself may be edited later
+    job_description_text = models.TextField(blank=True, default='')
+    # span id -> {'text': rewritten text, 'info': span layout}, as consumed by replace_text_in_pdf
+    replacements = models.JSONField(default=dict)
+    # [{'section', 'original', 'rewritten', 'spans': [{'span_id', 'original', 'text'}]}]
+    group_rewrites = models.JSONField(default=list)
+    customized_resume = models.ForeignKey(CustomizedResume, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Customization Draft {self.id}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='draft_user_created_idx'),
+        ]
+
+class CustomizationProfile(models.Model):
+    """Sampled stack profile and per-stage peak memory of one profiled customization (staff only)"""
+    customized_resume = models.OneToOneField(CustomizedResume, on_delete=models.CASCADE, related_name='profile')
+    # Folded stacks ("root;...;leaf count" per line), as read by flamegraph.pl and speedscope
+    folded_stacks = models.TextField(blank=True, default='')
+    sample_interval = models.FloatField()
+    sample_count = models.PositiveIntegerField(default=0)
+    # stage -> seconds, and stage -> peak bytes traced by tracemalloc during the stage
+    stage_timings = models.JSONField(default=dict)
+    stage_memory = models.JSONField(default=dict)
+    peak_memory = models.PositiveBigIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"Customized Resume for {self.job_description.job_title} - {self.user.username}"
\ No newline at end of file
+        return f"Customization Profile {self.id} (customized resume {self.customized_resume_id})"
@@ -0,0 +1,33 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """Keyset pagination over (created_at, id), newest first.
+
+    Uses the (user, created_at) indexes so deep pages cost the same as the first one,
+    unlike offset pagination which has to scan and discard every skipped row.
+
+    Opt-in: list endpoints returned a bare array before they were paginated, so a page (with
+    next/previous links) is only returned when the request has ?page_size= or ?cursor=.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.page_size_query_param not in params and self.cursor_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class SearchPagination(PageNumberPagination):
+    """Numbered pages for ranked search results.
+
+    Rank is computed per query, so there is no stored column for a cursor to seek on; result
+    sets are bounded by one user's rows, which keeps the offset cheap.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -1,6 +1,7 @@
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 from django.contrib.auth.models import User
-from .models import MasterResume, JobDescription, CustomizedResume
+from .models import MasterResume, JobDescription, CustomizedResume, CustomizationDraft
 
 class MasterResumeSerializer(serializers.ModelSerializer):
     class Meta:
@@ -10,12 +11,61 @@ class MasterResumeSerializer(serializers.ModelSerializer):
 class JobDescriptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = JobDescription
-        fields = '__all__'
+        exclude = ['search_vector']
+
+class JobDescriptionListSerializer(serializers.ModelSerializer):
+    """Slim serializer for list views; leaves out the full description text"""
+    class Meta:
+        model = JobDescription
+        fields = ['id', 'job_title', 'created_at']
+
+class JobDescriptionSearchSerializer(JobDescriptionListSerializer):
+    """List fields plus the search rank (null when the database cannot rank)"""
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta(JobDescriptionListSerializer.Meta):
+        fields = JobDescriptionListSerializer.Meta.fields + ['rank']
 
 class CustomizedResumeSerializer(serializers.ModelSerializer):
     class Meta:
         model = CustomizedResume
-        fields = '__all__'
+        exclude = ['resume_text', 'search_vector']
+        # Set by the customize pipeline; idempotent replays look rows up by the first two and
+        # downloads use content_hash as the ETag
+        read_only_fields = ['idempotency_key', 'input_hash', 'content_hash', 'thumbnail']
+
+    def update(self, instance, validated_data):
+        if 'customized_resume_file' in validated_data:
+            # A replaced file gets a new hash and thumbnail, computed again on first download
+            validated_data.update(content_hash='', thumbnail='')
+        return super().update(instance, validated_data)
+
+class CustomizedResumeListSerializer(serializers.ModelSerializer):
+    """Slim serializer for list views; job title comes from the select_related join"""
+    job_title = serializers.CharField(source='job_description.job_title', default=None, read_only=True)
+    thumbnail_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CustomizedResume
+        fields = ['id', 'master_resume', 'job_description', 'job_title', 'customized_resume_file',
+                  'thumbnail_url', 'created_at']
+
+    def get_thumbnail_url(self, obj):
+        # Always the endpoint, which backfills missing thumbnails and sets long cache headers
+        return reverse('customizedresume-thumbnail', args=[obj.id], request=self.context.get('request'))
+
+class CustomizedResumeSearchSerializer(CustomizedResumeListSerializer):
+    """List fields plus the search rank (null when the database cannot rank)"""
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta(CustomizedResumeListSerializer.Meta):
+        fields = CustomizedResumeListSerializer.Meta.fields + ['rank']
+
+class CustomizationDraftSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CustomizationDraft
+        fields = ['id', 'master_resume', 'job_description', 'group_rewrites', 'customized_resume', 'created_at']
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -0,0 +1,142 @@
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+
+logger = logging.getLogger('resume_customizer')
+
+def compute_input_hash(user_id, resume_hash, job_description, model_name):
+    """Deterministic key for a customization request: (user, resume hash, JD hash, model)"""
+    jd_hash = hashlib.sha256(job_description.strip().encode('utf-8')).hexdigest()
+    raw = f'{user_id}:{resume_hash}:{jd_hash}:{model_name}'
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def hash_uploaded_file(uploaded_file):
+    """SHA-256 of an uploaded file, read chunk by chunk unless the upload handler already computed it"""
+    digest = getattr(uploaded_file, 'sha256', None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        hasher.update(chunk)
+    uploaded_file.seek(0)
+    return hasher.hexdigest()
+
+class _InFlightCall:
+    def __init__(self, input_hash):
+        self.input_hash = input_hash
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class RequestCoalescer:
+    """Collapse identical concurrent computations onto a single in-flight call.
+
+    Threads in the same process wait on the leader's result directly. Across processes a
+    cache lock marks the key as in flight; followers poll `lookup` until the leader's row
+    shows up or the lock is released. This needs a shared cache backend (e.g. Redis) to
+    coalesce between workers; with the default local-memory cache it is per process only.
+
+    Keys are per Idempotency-Key when the client sends one, so a caller whose input_hash differs
+    from the in-flight call's is reusing the key for a different request and is rejected.
+    """
+
+    def __init__(self, timeout=None, poll_interval=0.5):
+        self.timeout = timeout or getattr(settings, 'CUSTOMIZE_INFLIGHT_TIMEOUT', 300)
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._calls = {}
+        # Tasks of the async path; only ever touched from the event loop thread
+        self._async_calls = {}
+
+    def run(self, key, compute, lookup, input_hash=''):
+        """Return compute() for key, sharing it with concurrent callers of the same key"""
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _InFlightCall(input_hash)
+
+        if not is_leader:
+            self._check_same_request(call.input_hash, input_hash)
+            logger.info(f"Attaching to in-flight customization {key[:12]}")
+            if not call.done.wait(self.timeout):
+                raise TimeoutError("Timed out waiting for in-flight customization")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run_across_processes(key, compute, lookup)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _run_across_processes(self, key, compute, lookup):
+        lock_key = f'customize-inflight:{key}'
+        deadline = time.monotonic() + self.timeout
+        while not cache.add(lock_key, 1, self.timeout):
+            # Another worker holds the key; wait for its row instead of paying for the AI again
+            existing = lookup()
+            if existing is not None:
+                return existing
+            if time.monotonic() > deadline:
+                raise TimeoutError("Timed out waiting for in-flight customization")
+            time.sleep(self.poll_interval)
+
+        try:
+            # The previous holder may have finished between our lookup and acquiring the lock
+            existing = lookup()
+            if existing is not None:
+                return existing
+            return compute()
+        finally:
+            cache.delete(lock_key)
+
+    def _check_same_request(self, leader_hash, input_hash):
+        if leader_hash != input_hash:
+            raise ValidationError("Idempotency-Key was already used for a different request")
+
+    async def arun(self, key, compute, lookup, input_hash=''):
+        """Async counterpart of run: compute and lookup are coroutine functions"""
+        task, leader_hash = self._async_calls.get(key, (None, input_hash))
+        if task is None:
+            task = asyncio.ensure_future(self._arun_across_processes(key, compute, lookup))
+            self._async_calls[key] = task, input_hash
+            task.add_done_callback(lambda _: self._async_calls.pop(key, None))
+        else:
+            self._check_same_request(leader_hash, input_hash)
+            logger.info(f"Attaching to in-flight customization {key[:12]}")
+        # Shielded so one client disconnecting does not cancel the work others are waiting on
+        return await asyncio.wait_for(asyncio.shield(task), self.timeout)
+
+    async def _arun_across_processes(self, key, compute, lookup):
+        lock_key = f'customize-inflight:{key}'
+        deadline = time.monotonic() + self.timeout
+        while not await sync_to_async(cache.add)(lock_key, 1, self.timeout):
+            existing = await lookup()
+            if existing is not None:
+                return existing
+            if time.monotonic() > deadline:
+                raise TimeoutError("Timed out waiting for in-flight customization")
+            await asyncio.sleep(self.poll_interval)
+
+        try:
+            existing = await lookup()
+            if existing is not None:
+                return existing
+            return await compute()
+        finally:
+            await sync_to_async(cache.delete)(lock_key)
+
+coalescer = RequestCoalescer()
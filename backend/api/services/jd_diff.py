@@ -0,0 +1,54 @@
+import re
+import difflib
+
+WORD_RE = re.compile(r"[a-z0-9][a-z0-9+#.\-]*[a-z0-9+#]|[a-z0-9]")
+# Short function words that say nothing about a requirement
+STOP_WORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have', 'in', 'is', 'it',
+    'of', 'on', 'or', 'our', 'that', 'the', 'their', 'this', 'to', 'we', 'will', 'with', 'you', 'your',
+    'experience', 'years', 'year', 'plus', 'strong', 'ability', 'knowledge', 'working', 'work',
+}
+# Sections that carry the overall pitch and should follow any newly added requirement
+PITCH_SECTIONS = {'Summary', 'Skills'}
+
+def split_requirements(text):
+    """Split a job description into normalized requirement lines / sentences"""
+    parts = re.split(r'[\n\r]+|(?<=[.;!?])\s+|^\s*[-*•]\s*', text or '', flags=re.MULTILINE)
+    return [' '.join(part.split()).lower() for part in parts if part and part.strip()]
+
+def tokenize(text):
+    return {word for word in WORD_RE.findall((text or '').lower()) if word not in STOP_WORDS}
+
+class JobDescriptionDiff:
+    """Requirement-level difference between two versions of a job description"""
+
+    def __init__(self, old_text, new_text):
+        old_lines = split_requirements(old_text)
+        new_lines = split_requirements(new_text)
+        self.added = []
+        self.removed = []
+        matcher = difflib.SequenceMatcher(a=old_lines, b=new_lines, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag in ('replace', 'delete'):
+                self.removed.extend(old_lines[i1:i2])
+            if tag in ('replace', 'insert'):
+                self.added.extend(new_lines[j1:j2])
+        # Terms of the requirements that changed, minus those present in both versions
+        unchanged_terms = tokenize(' '.join(line for line in new_lines if line not in self.added))
+        self.changed_terms = tokenize(' '.join(self.added + self.removed)) - unchanged_terms
+
+    @property
+    def has_changes(self):
+        return bool(self.added or self.removed)
+
+    def affects_group(self, section_name, original_text, previous_rewrite):
+        """Whether a group has to be rewritten again for the new job description.
+
+        A group is affected when its source text or its previous rewrite mentions a term from an
+        added or removed requirement, and pitch sections follow every added requirement.
+        """
+        if not self.has_changes:
+            return False
+        if self.added and section_name in PITCH_SECTIONS:
+            return True
+        return bool(self.changed_terms & (tokenize(original_text) | tokenize(previous_rewrite)))
@@ -0,0 +1,134 @@
+import os
+import hashlib
+import logging
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+from ..models import MasterResume, JobDescription, CustomizedResume, CustomizationDraft
+from ..utils import pdf_pool
+
+logger = logging.getLogger('resume_customizer')
+
+
+class BatchEntry:
+    """Rows produced by one customization; model instances are filled in on commit"""
+
+    def __init__(self, master_resume, job_description, customized_resume=None, draft=None, link_draft=None):
+        self.master_resume = master_resume
+        self.job_description = job_description
+        self.customized_resume = customized_resume
+        self.draft = draft
+        self.link_draft = link_draft
+
+
+class CustomizationBatch:
+    """Writes the rows of one customization request, or of a whole batch, in one transaction.
+
+    Files go to storage first, outside the transaction, so no lock is held during file I/O.
+    Then every model is inserted with a single bulk_create in dependency order. The result is
+    a constant number of queries per batch (one INSERT per model) instead of several round
+    trips per customization. If the transaction fails, the files stored for the batch are
+    deleted again, and no partial rows are left behind.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.entries = []
+
+    def add(self, master_resume, job_description, pdf_path=None, thumbnail_path=None, idempotency_key='',
+            input_hash='', draft=None, link_draft=None):
+        """Queue one customization.
+
+        master_resume and job_description are either saved instances or, for new inputs, the
+        uploaded file and the description text. pdf_path is a rendered PDF to store as a
+        CustomizedResume. draft is a dict of CustomizationDraft fields (job_description_text,
+        replacements, group_rewrites) to store with the result, and link_draft an existing draft
+        to point at the new CustomizedResume.
+        """
+        if not isinstance(master_resume, MasterResume):
+            master_resume = MasterResume(user=self.user, resume_file=master_resume)
+        if not isinstance(job_description, JobDescription):
+            job_description = JobDescription(user=self.user, description_text=job_description)
+
+        customized_resume = None
+        if pdf_path is not None:
+            customized_resume = CustomizedResume(
+                user=self.user,
+                master_resume=master_resume,
+                job_description=job_description,
+                idempotency_key=idempotency_key,
+                input_hash=input_hash
+            )
+            customized_resume._pdf_path = pdf_path
+            customized_resume._thumbnail_path = thumbnail_path
+
+        draft_obj = None
+        if draft is not None:
+            draft_obj = CustomizationDraft(
+                user=self.user,
+                master_resume=master_resume,
+                job_description=job_description,
+                customized_resume=customized_resume,
+                **draft
+            )
+
+        entry = BatchEntry(master_resume, job_description, customized_resume, draft_obj, link_draft)
+        self.entries.append(entry)
+        return entry
+
+    def commit(self):
+        """Store the files and insert every queued row atomically; returns the entries"""
+        stored = []
+        try:
+            for entry in self.entries:
+                self._store_files(entry, stored)
+            with transaction.atomic():
+                self._bulk_create(MasterResume, [e.master_resume for e in self.entries])
+                self._bulk_create(JobDescription, [e.job_description for e in self.entries])
+                self._bulk_create(CustomizedResume, [e.customized_resume for e in self.entries])
+                self._bulk_create(CustomizationDraft, [e.draft for e in self.entries])
+                linked = []
+                for entry in self.entries:
+                    if entry.link_draft is not None:
+                        entry.link_draft.customized_resume = entry.customized_resume
+                        linked.append(entry.link_draft)
+                if linked:
+                    CustomizationDraft.objects.bulk_update(linked, ['customized_resume'])
+        except Exception:
+            for file in stored:
+                try:
+                    file.storage.delete(file.name)
+                except Exception as e:
+                    logger.warning(f"Failed to remove {file.name} after a failed commit: {str(e)}")
+            raise
+        logger.info(f"Committed {len(self.entries)} customization(s) in one transaction")
+        return self.entries
+
+    def _store_files(self, entry, stored):
+        if entry.master_resume.pk is None and not entry.master_resume.resume_file._committed:
+            upload = entry.master_resume.resume_file
+            entry.master_resume.resume_file.save(os.path.basename(upload.name), upload.file, save=False)
+            stored.append(entry.master_resume.resume_file)
+
+        customized_resume = entry.customized_resume
+        if customized_resume is None:
+            return
+        with open(customized_resume._pdf_path, 'rb') as f:
+            pdf_bytes = f.read()
+        customized_resume.content_hash = hashlib.sha256(pdf_bytes).hexdigest()
+        # Indexed for search by the search_vector trigger when the row is inserted
+        customized_resume.resume_text = pdf_pool.extract_plain_text(customized_resume._pdf_path)
+        customized_resume.customized_resume_file.save('customized_resume.pdf', ContentFile(pdf_bytes), save=False)
+        stored.append(customized_resume.customized_resume_file)
+
+        thumbnail_path = customized_resume._thumbnail_path
+        if thumbnail_path and os.path.exists(thumbnail_path):
+            with open(thumbnail_path, 'rb') as f:
+                customized_resume.thumbnail.save('thumbnail.png', ContentFile(f.read()), save=False)
+            stored.append(customized_resume.thumbnail)
+
+    def _bulk_create(self, model, objs):
+        # Shared inputs (the same master resume for several JDs) and existing rows are skipped
+        new = list({id(obj): obj for obj in objs if obj is not None and obj.pk is None}.values())
+        if new:
+            model.objects.bulk_create(new)
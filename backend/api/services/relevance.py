@@ -0,0 +1,67 @@
+import logging
+from django.conf import settings
+
+from .jd_diff import WORD_RE, STOP_WORDS
+
+logger = logging.getLogger('resume_customizer')
+
+# The overall pitch is tailored whatever its score; keyword-dense Skills lists score high anyway
+ALWAYS_REWRITTEN_SECTIONS = {'Summary'}
+
+def terms(text):
+    return [word for word in WORD_RE.findall((text or '').lower()) if word not in STOP_WORDS]
+
+def relevance_scores(job_description, texts):
+    """Cosine similarity of each text to the job description over TF-IDF weighted terms.
+
+    Document frequencies come from the texts themselves plus the job description, so terms
+    that appear in every group of a resume count for little. Term frequencies are sublinear
+    (1 + log tf) so a line repeating one keyword does not dominate.
+    """
+    import numpy as np
+
+    documents = [terms(job_description)] + [terms(text) for text in texts]
+    vocabulary = {}
+    rows, cols = [], []
+    for row, words in enumerate(documents):
+        for word in words:
+            rows.append(row)
+            cols.append(vocabulary.setdefault(word, len(vocabulary)))
+    if not vocabulary:
+        return np.zeros(len(texts))
+
+    counts = np.zeros((len(documents), len(vocabulary)))
+    np.add.at(counts, (rows, cols), 1)
+    weights = np.log1p(counts)
+    document_frequency = np.count_nonzero(counts, axis=0)
+    weights *= np.log((1 + len(documents)) / (1 + document_frequency)) + 1
+    norms = np.linalg.norm(weights, axis=1, keepdims=True)
+    weights /= np.where(norms == 0, 1, norms)
+    return weights[1:] @ weights[0]
+
+def select_relevant_groups(groups, job_description):
+    """Flag which (section name, original lines, joined text) groups are worth an AI call.
+
+    Summary groups are always rewritten. Other groups need a relevance score of at least
+    AI_RELEVANCE_THRESHOLD and, when AI_RELEVANCE_TOP_K is set, a place among the top K of
+    their section. Returns one bool per group, in order.
+    """
+    threshold = settings.AI_RELEVANCE_THRESHOLD
+    top_k = settings.AI_RELEVANCE_TOP_K
+    if threshold <= 0 and top_k <= 0:
+        return [True] * len(groups)
+
+    scores = relevance_scores(job_description, [text for _, _, text in groups])
+    selected = [section in ALWAYS_REWRITTEN_SECTIONS or score >= threshold for (section, _, _), score in zip(groups, scores)]
+    if top_k > 0:
+        ranked = {}
+        for index in sorted(range(len(groups)), key=lambda i: -scores[i]):
+            section = groups[index][0]
+            if selected[index] and section not in ALWAYS_REWRITTEN_SECTIONS:
+                ranked[section] = ranked.get(section, 0) + 1
+                selected[index] = ranked[section] <= top_k
+
+    for (section, _, text), score, keep in zip(groups, scores, selected):
+        if not keep:
+            logger.debug("Skipping group in '%s' with relevance %.3f: '%.40s...'", section, score, text)
+    return selected
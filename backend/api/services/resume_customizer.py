@@ -1,73 +1,415 @@
 import os
-import uuid
+import time
+import asyncio
 import logging
+from contextlib import contextmanager, nullcontext
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 from django.core.exceptions import ValidationError
 
-from ..models import MasterResume, JobDescription, CustomizedResume
-from ..utils.pdf_processor import PDFProcessor
-from ..utils.ai_service import AIService
+from ..models import CustomizedResume, CustomizationDraft, CustomizationProfile, sharded_path
+from ..utils import pdf_pool
+from ..utils.text_alignment import SpanAligner, align_to_spans
+from .persistence import CustomizationBatch
+from .idempotency import coalescer, compute_input_hash, hash_uploaded_file
+from .jd_diff import JobDescriptionDiff
+from .relevance import select_relevant_groups
+from .scheduler import INTERACTIVE, DRY_RUN, BULK, pipeline_slot, apipeline_slot
 
 logger = logging.getLogger('resume_customizer')
 
 class ResumeCustomizer:
     """Service class for customizing resumes based on job descriptions"""
     
-    def __init__(self, user):
+    def __init__(self, user, priority=INTERACTIVE):
         self.user = user
+        # Scheduling class for this customizer's work; clients may only lower it to BULK
+        self.priority = priority
+        # PyMuPDF, pdfminer and google-genai load on first use, not when the views are imported
+        from ..utils.pdf_processor import PDFProcessor
+        from ..utils.ai_service import AIService
         self.pdf_processor = PDFProcessor()
         self.ai_service = AIService()
         self.temp_files = []
+        # Per-group original -> rewritten record of the last replacement run, for dry runs
+        self.group_rewrites = []
+        # Span font -> MeasuredFont of the embedded fonts the renderer reuses, for width budgets
+        self.measured_fonts = {}
+        # Seconds spent per pipeline stage (queue, upload, extract, ai, render, save)
+        self.stage_timings = {}
+        # RequestProfiler for staff-requested profiling runs; None for every other request
+        self.profiler = None
     
-    def customize_resume(self, master_resume_file, job_description):
-        """Main method to customize a resume"""
+    def customize_resume(self, master_resume_file, job_description, idempotency_key=None):
+        """Main method to customize a resume.
+
+        Identical requests are deduplicated: a completed duplicate returns the existing
+        CustomizedResume and a concurrent one attaches to the in-flight computation.
+        `self.replayed` tells the caller whether an existing result was returned.
+        """
+        self._validate_input(master_resume_file, job_description)
+        self.replayed = False
+        input_hash = compute_input_hash(
+            self.user.id,
+            hash_uploaded_file(master_resume_file),
+            job_description,
+            self.ai_service.model
+        )
+        idempotency_key = (idempotency_key or '').strip()[:255]
+
+        existing = self._find_existing(idempotency_key, input_hash)
+        if existing is not None:
+            self.replayed = True
+            logger.info(f"Returning existing customized resume {existing.id} for duplicate request")
+            return existing
+
+        ran_pipeline = []
+
+        def compute():
+            ran_pipeline.append(True)
+            queued_at = time.perf_counter()
+            with self.profiler or nullcontext(), pipeline_slot(self.user.id, self.priority):
+                self.stage_timings['queue'] = time.perf_counter() - queued_at
+                return self._run_pipeline(master_resume_file, job_description, idempotency_key, input_hash)
+
+        result = coalescer.run(
+            f'{self.user.id}:{idempotency_key or input_hash}',
+            compute=compute,
+            lookup=lambda: self._find_existing(idempotency_key, input_hash),
+            input_hash=input_hash
+        )
+        # Requests that attached to someone else's computation get that row back
+        self.replayed = not ran_pipeline
+        if self.profiler is not None and ran_pipeline:
+            self._save_profile(result)
+        return result
+
+    async def acustomize_resume(self, master_resume_file, job_description, idempotency_key=None):
+        """Async version of customize_resume for ASGI views.
+
+        AI calls go through the provider's aio client, PDF work is awaited on the process
+        pool, and only the ORM and file I/O are offloaded to threads.
+        """
+        if self.profiler is not None:
+            # Profiled runs get a thread of their own, so the sampler sees only this customization
+            return await sync_to_async(self.customize_resume, thread_sensitive=False)(
+                master_resume_file, job_description, idempotency_key
+            )
+        self._validate_input(master_resume_file, job_description)
+        self.replayed = False
+        input_hash = compute_input_hash(
+            self.user.id,
+            await asyncio.to_thread(hash_uploaded_file, master_resume_file),
+            job_description,
+            self.ai_service.model
+        )
+        idempotency_key = (idempotency_key or '').strip()[:255]
+        find_existing = sync_to_async(self._find_existing)
+
+        existing = await find_existing(idempotency_key, input_hash)
+        if existing is not None:
+            self.replayed = True
+            logger.info(f"Returning existing customized resume {existing.id} for duplicate request")
+            return existing
+
+        ran_pipeline = []
+
+        async def compute():
+            ran_pipeline.append(True)
+            queued_at = time.perf_counter()
+            async with apipeline_slot(self.user.id, self.priority):
+                self.stage_timings['queue'] = time.perf_counter() - queued_at
+                return await self._arun_pipeline(master_resume_file, job_description, idempotency_key, input_hash)
+
+        result = await coalescer.arun(
+            f'{self.user.id}:{idempotency_key or input_hash}',
+            compute=compute,
+            lookup=lambda: find_existing(idempotency_key, input_hash),
+            input_hash=input_hash
+        )
+        self.replayed = not ran_pipeline
+        return result
+
+    def _dry_run_priority(self):
+        return BULK if self.priority == BULK else DRY_RUN
+
+    def _validate_input(self, master_resume_file, job_description):
+        if not master_resume_file:
+            logger.error("No resume file provided")
+            raise ValidationError("No resume file provided")
+        if not job_description:
+            logger.error("No job description provided")
+            raise ValidationError("No job description provided")
+
+    def _find_existing(self, idempotency_key, input_hash):
+        """Return a completed CustomizedResume for this request, if there is one"""
+        queryset = CustomizedResume.objects.filter(user=self.user).order_by('-created_at')
+        if idempotency_key:
+            existing = queryset.filter(idempotency_key=idempotency_key).first()
+            if existing is not None and existing.input_hash != input_hash:
+                raise ValidationError("Idempotency-Key was already used for a different request")
+            return existing
+        return queryset.filter(input_hash=input_hash).first()
+
+    def _run_pipeline(self, master_resume_file, job_description, idempotency_key, input_hash):
+        """Run extraction, AI rewriting and rendering for a request that has no result yet"""
         try:
-            # Validate input
-            if not master_resume_file:
-                logger.error("No resume file provided")
-                raise ValidationError("No resume file provided")
-            if not job_description:
-                logger.error("No job description provided")
-                raise ValidationError("No job description provided")
-            
-            # Save temporary file
-            temp_path = default_storage.save(f'temp/{uuid.uuid4()}_{master_resume_file.name}', master_resume_file)
-            temp_file_path = os.path.join(settings.MEDIA_ROOT, temp_path)
-            self.temp_files.append(temp_file_path)
-            logger.info(f"Temporary file saved: {temp_file_path}")
-            
-            # Extract text with layout and block info
-            layout_info, text_blocks = self.pdf_processor.extract_text_with_layout(temp_file_path)
-            if not layout_info:
-                raise ValidationError("No text extracted from PDF")
-            logger.info(f"Extracted {len(layout_info)} text items with layout")
-            logger.info(f"Text blocks map has {len(text_blocks)} entries")
-            
-            # Identify sections
-            sections = self.pdf_processor.identify_sections(layout_info)
-            logger.info(f"Identified sections: {list(sections.keys())}")
+            with self._stage('upload'):
+                temp_file_path = self._save_temp_upload(master_resume_file)
+            with self._stage('extract'):
+                sections, text_blocks = self._extract_sections(temp_file_path)
             
             # Generate replacements
-            replacements = self._generate_replacements(sections, job_description, text_blocks)
+            with self._stage('ai'):
+                replacements = self._generate_replacements(sections, job_description, text_blocks)
             logger.info(f"Generated {len(replacements)} replacements")
             
             # Replace text in PDF
-            customized_resume_path = self.pdf_processor.replace_text_in_pdf(temp_file_path, replacements)
+            thumbnail_path = self._temp_path('thumbnail.png')
+            with self._stage('render'):
+                customized_resume_path = pdf_pool.replace_text_in_pdf(temp_file_path, replacements, thumbnail_path)
             self.temp_files.append(customized_resume_path)
             logger.info(f"Customized PDF created: {customized_resume_path}")
             
             # Save to database
-            return self._save_to_database(master_resume_file, job_description, customized_resume_path)
+            with self._stage('save'):
+                return self._save_to_database(
+                    master_resume_file, job_description, customized_resume_path, idempotency_key, input_hash,
+                    thumbnail_path, replacements
+                )
             
         finally:
             self._cleanup_temp_files()
     
+    async def _arun_pipeline(self, master_resume_file, job_description, idempotency_key, input_hash):
+        """Async version of _run_pipeline"""
+        try:
+            with self._stage('upload'):
+                temp_file_path = await sync_to_async(self._save_temp_upload)(master_resume_file)
+            with self._stage('extract'):
+                sections, text_blocks = await self._aextract_sections(temp_file_path)
+
+            with self._stage('ai'):
+                replacements = await self._agenerate_replacements(sections, job_description, text_blocks)
+            logger.info(f"Generated {len(replacements)} replacements")
+
+            thumbnail_path = self._temp_path('thumbnail.png')
+            with self._stage('render'):
+                customized_resume_path = await pdf_pool.areplace_text_in_pdf(temp_file_path, replacements, thumbnail_path)
+            self.temp_files.append(customized_resume_path)
+            logger.info(f"Customized PDF created: {customized_resume_path}")
+
+            with self._stage('save'):
+                return await sync_to_async(self._save_to_database)(
+                    master_resume_file, job_description, customized_resume_path, idempotency_key, input_hash,
+                    thumbnail_path, replacements
+                )
+
+        finally:
+            await asyncio.to_thread(self._cleanup_temp_files)
+
+    def draft_resume(self, master_resume_file, job_description):
+        """Dry run: generate and store the rewrites without rendering a PDF.
+
+        Returns a CustomizationDraft that commit_draft() can later render without calling
+        the AI again. Dry runs are not deduplicated; each one is a new iteration.
+        """
+        self._validate_input(master_resume_file, job_description)
+        try:
+            with pipeline_slot(self.user.id, self._dry_run_priority()):
+                temp_file_path = self._save_temp_upload(master_resume_file)
+                sections, text_blocks = self._extract_sections(temp_file_path)
+                replacements = self._generate_replacements(sections, job_description, text_blocks)
+                logger.info(f"Generated {len(replacements)} replacements for draft")
+                return self._save_draft(master_resume_file, job_description, replacements)
+        finally:
+            self._cleanup_temp_files()
+
+    async def adraft_resume(self, master_resume_file, job_description):
+        """Async version of draft_resume"""
+        self._validate_input(master_resume_file, job_description)
+        try:
+            async with apipeline_slot(self.user.id, self._dry_run_priority()):
+                temp_file_path = await sync_to_async(self._save_temp_upload)(master_resume_file)
+                sections, text_blocks = await self._aextract_sections(temp_file_path)
+                replacements = await self._agenerate_replacements(sections, job_description, text_blocks)
+                logger.info(f"Generated {len(replacements)} replacements for draft")
+                return await sync_to_async(self._save_draft)(master_resume_file, job_description, replacements)
+        finally:
+            await asyncio.to_thread(self._cleanup_temp_files)
+
+    def commit_draft(self, draft):
+        """Render a draft's stored replacements into a CustomizedResume; no AI calls are made"""
+        if draft.customized_resume_id:
+            self.replayed = True
+            return draft.customized_resume
+
+        self.replayed = False
+        with pipeline_slot(self.user.id, self.priority):
+            return self._render_draft(draft)
+
+    def _render_draft(self, draft):
+        try:
+            replacements = self.pdf_processor.replacements_from_json(draft.replacements)
+            thumbnail_path = self._temp_path('thumbnail.png')
+            customized_resume_path = pdf_pool.replace_text_in_pdf(
+                draft.master_resume.resume_file.path, replacements, thumbnail_path
+            )
+            self.temp_files.append(customized_resume_path)
+            logger.info(f"Customized PDF created from draft {draft.id}: {customized_resume_path}")
+
+            batch = CustomizationBatch(self.user)
+            entry = batch.add(draft.master_resume, draft.job_description, customized_resume_path, thumbnail_path,
+                              link_draft=draft)
+            batch.commit()
+            logger.info(f"Customized resume saved with ID: {entry.customized_resume.id}")
+            return entry.customized_resume
+        finally:
+            self._cleanup_temp_files()
+
+    def recustomize(self, job_description_obj, dry_run=False):
+        """Re-customize after a job description edit, reusing rewrites of unaffected groups.
+
+        The latest run for this job description provides the previous JD text and the stored
+        group rewrites. Only groups touched by added or removed requirements go back to the AI.
+        `self.reuse_stats` reports how many groups were reused and regenerated.
+        """
+        previous = CustomizationDraft.objects.filter(
+            user=self.user, job_description=job_description_obj
+        ).select_related('master_resume').order_by('-created_at', '-id').first()
+        if previous is None:
+            raise ValidationError("This job description has not been customized yet")
+
+        jd_diff = JobDescriptionDiff(previous.job_description_text, job_description_obj.description_text)
+        with pipeline_slot(self.user.id, self._dry_run_priority() if dry_run else self.priority):
+            draft = self._recustomize_groups(previous, job_description_obj, jd_diff)
+            if dry_run:
+                return draft
+            self.replayed = False
+            return self._render_draft(draft)
+
+    def _recustomize_groups(self, previous, job_description_obj, jd_diff):
+        """Build a new draft from the previous run, asking the AI only for affected groups"""
+        stored_rewrites = {(group['section'], group['original']): group['rewritten'] for group in previous.group_rewrites}
+        self.reuse_stats = {'reused': 0, 'regenerated': 0, 'skipped': 0}
+        job_description = job_description_obj.description_text
+
+        try:
+            sections, text_blocks = self._extract_sections(previous.master_resume.resume_file.path)
+            replacements = {}
+            self.group_rewrites = []
+            groups = list(self._iter_groups(sections))
+            relevant = select_relevant_groups(groups, job_description)
+            for (section_name, original_texts, original_text_full), keep in zip(groups, relevant):
+                customized_text = stored_rewrites.get((section_name, original_text_full))
+                if customized_text is not None and not jd_diff.affects_group(section_name, original_text_full, customized_text):
+                    self.reuse_stats['reused'] += 1
+                    self._apply_group_rewrite(section_name, original_texts, original_text_full, customized_text,
+                                              text_blocks, replacements)
+                elif keep:
+                    self._rewrite_group(section_name, original_texts, original_text_full,
+                                        job_description, text_blocks, replacements)
+                    self.reuse_stats['regenerated'] += 1
+                else:
+                    self.reuse_stats['skipped'] += 1
+            logger.info(f"Re-customization reused {self.reuse_stats['reused']} groups, "
+                        f"regenerated {self.reuse_stats['regenerated']}, skipped {self.reuse_stats['skipped']}")
+
+            return self._save_draft(
+                previous.master_resume, job_description_obj, replacements, job_description_obj.description_text
+            )
+        finally:
+            self._cleanup_temp_files()
+
+    def _save_temp_upload(self, master_resume_file):
+        """Save the uploaded resume under temp/ and return its absolute path"""
+        temp_path = default_storage.save(sharded_path('temp', master_resume_file.name), master_resume_file)
+        temp_file_path = os.path.join(settings.MEDIA_ROOT, temp_path)
+        self.temp_files.append(temp_file_path)
+        logger.info(f"Temporary file saved: {temp_file_path}")
+        return temp_file_path
+
+    def _extract_sections(self, pdf_path):
+        """Extract text with layout and block info, then identify sections"""
+        layout_info, text_blocks = pdf_pool.extract_text_with_layout(pdf_path)
+        self.measured_fonts = self.pdf_processor.measured_fonts(
+            pdf_pool.glyph_widths(pdf_path, self._span_texts(text_blocks))
+        )
+        return self._sections_from_layout(layout_info, text_blocks)
+
+    async def _aextract_sections(self, pdf_path):
+        layout_info, text_blocks = await pdf_pool.aextract_text_with_layout(pdf_path)
+        self.measured_fonts = self.pdf_processor.measured_fonts(
+            await pdf_pool.aglyph_widths(pdf_path, self._span_texts(text_blocks))
+        )
+        return self._sections_from_layout(layout_info, text_blocks)
+
+    def _span_texts(self, text_blocks):
+        # The (font, text) pairs the renderer learns its subset fonts' usable characters from
+        return [(block.get('font'), block.get('text', '')) for block in text_blocks.values()]
+
+    def _sections_from_layout(self, layout_info, text_blocks):
+        if not layout_info:
+            raise ValidationError("No text extracted from PDF")
+        logger.info(f"Extracted {len(layout_info)} text items with layout")
+        logger.info(f"Text blocks map has {len(text_blocks)} entries")
+        
+        # Identify sections
+        sections = self.pdf_processor.identify_sections(layout_info)
+        logger.info(f"Identified sections: {list(sections.keys())}")
+        return sections, text_blocks
+
     def _generate_replacements(self, sections, job_description, text_blocks):
         """Generate text replacements with improved text block matching"""
         replacements = {}
+        self.group_rewrites = []
         
+        for section_name, original_texts, original_text_full in self._relevant_groups(sections, job_description):
+            # Get AI-generated customized content for this group
+            self._rewrite_group(section_name, original_texts, original_text_full, job_description,
+                                text_blocks, replacements)
+            
+        return replacements
+
+    def _rewrite_group(self, section_name, original_texts, original_text_full, job_description,
+                       text_blocks, replacements):
+        """Ask the AI for one group's rewrite, aligning streamed lines while it is still generating"""
+        alignment = StreamedAlignment(self, original_texts, text_blocks) if settings.AI_STREAMING else None
+        customized_text = self.ai_service.generate_customized_content(
+            original_text_full,
+            job_description,
+            section_name,
+            on_line=alignment.on_line if alignment else None
+        )
+        self._apply_group_rewrite(section_name, original_texts, original_text_full, customized_text,
+                                  text_blocks, replacements, alignment)
+
+    async def _agenerate_replacements(self, sections, job_description, text_blocks):
+        """Async version of _generate_replacements: AI calls for all groups run concurrently"""
+        groups = self._relevant_groups(sections, job_description)
+        semaphore = asyncio.Semaphore(settings.AI_MAX_CONCURRENT_CALLS)
+
+        async def rewrite(section_name, original_texts, original_text_full):
+            alignment = StreamedAlignment(self, original_texts, text_blocks) if settings.AI_STREAMING else None
+            async with semaphore:
+                customized_text = await self.ai_service.agenerate_customized_content(
+                    original_text_full, job_description, section_name,
+                    on_line=alignment.on_line if alignment else None
+                )
+            return customized_text, alignment
+
+        results = await asyncio.gather(*(rewrite(*group) for group in groups))
+
+        replacements = {}
+        self.group_rewrites = []
+        for (section_name, original_texts, original_text_full), (customized_text, alignment) in zip(groups, results):
+            self._apply_group_rewrite(section_name, original_texts, original_text_full, customized_text,
+                                      text_blocks, replacements, alignment)
+        return replacements
+
+    def _iter_groups(self, sections):
+        """Yield (section name, original lines, joined text) for every group worth rewriting"""
         # Process each section separately
         for section_name, items in sections.items():
             if not items:
@@ -84,37 +426,56 @@ class ResumeCustomizer:
                 
                 if len(original_text_full) < 10:  # Skip very short sections
                     continue
-                
-                # Get AI-generated customized content for this group
-                customized_text = self.ai_service.generate_customized_content(
-                    original_text_full, 
-                    job_description,
-                    section_name
-                )
-                
-                logger.info(f"Original group in '{section_name}' length: {len(original_text_full)}")
-                logger.info(f"Customized group in '{section_name}' length: {len(customized_text)}")
-                
-                # Create better matching chunks
-                customized_chunks = self._create_matching_chunks(original_texts, customized_text)
-                
-                # Match text blocks for replacement
-                for i, (orig_text, new_text) in enumerate(zip(original_texts, customized_chunks)):
-                    if not orig_text.strip() or not new_text.strip():
-                        continue
-                    
-                    # Find the best matching block
-                    matched_key = self._find_best_matching_block(orig_text, text_blocks)
-                    
-                    if matched_key:
-                        # Store replacement with additional info
-                        replacements[matched_key] = {
-                            'text': new_text,
-                            'info': text_blocks[matched_key]
-                        }
-                        logger.info(f"Created replacement in {section_name}: '{orig_text[:30]}...' -> '{new_text[:30]}...'")
+
+                yield section_name, original_texts, original_text_full
+
+    def _relevant_groups(self, sections, job_description):
+        """The groups of _iter_groups that the local relevance scorer deems worth an AI call"""
+        groups = list(self._iter_groups(sections))
+        relevant = [group for group, keep in zip(groups, select_relevant_groups(groups, job_description)) if keep]
+        if len(relevant) < len(groups):
+            logger.info(f"Relevance filter kept {len(relevant)} of {len(groups)} groups for AI rewriting")
+        return relevant
+
+    def _apply_group_rewrite(self, section_name, original_texts, original_text_full, customized_text,
+                             text_blocks, replacements, alignment=None):
+        """Split a group's rewritten text back over its lines and record the matching replacements"""
+        logger.debug("Group in '%s': %d original -> %d customized characters",
+                     section_name, len(original_text_full), len(customized_text))
+        
+        # Streamed text was matched and measured while it arrived; otherwise do both now
+        customized_chunks = alignment.chunks_for(customized_text) if alignment else None
+        if customized_chunks is not None:
+            matched_keys = alignment.matched_keys
+        else:
+            matched_keys = self._match_blocks(original_texts, text_blocks)
+            customized_chunks = self._create_matching_chunks(
+                original_texts, customized_text, [text_blocks.get(key) if key else None for key in matched_keys]
+            )
+        spans = []
+        
+        # Match text blocks for replacement
+        for orig_text, new_text, matched_key in zip(original_texts, customized_chunks, matched_keys):
+            if not orig_text.strip() or not new_text.strip():
+                continue
             
-        return replacements
+            if matched_key:
+                # Store replacement with additional info
+                replacements[matched_key] = {
+                    'text': new_text,
+                    'info': text_blocks[matched_key]
+                }
+                spans.append({'span_id': matched_key, 'original': orig_text, 'text': new_text})
+                # INFO so the sampling filter sees it at the default level; it keeps a sample of requests
+                logger.info("Created replacement in %s: '%.30s...' -> '%.30s...'", section_name, orig_text, new_text,
+                            extra={'span_event': True})
+
+        self.group_rewrites.append({
+            'section': section_name,
+            'original': original_text_full,
+            'rewritten': customized_text,
+            'spans': spans
+        })
     
     def _group_items_by_proximity(self, items):
         """Group items by their vertical proximity to capture related content"""
@@ -148,58 +509,20 @@ class ResumeCustomizer:
             
         return groups
     
-    def _create_matching_chunks(self, original_texts, customized_text):
-        """Create customized text chunks that better match original text structure"""
-        # Count total content length in original and customized text
-        orig_chars_total = sum(len(text) for text in original_texts)
-        custom_chars_total = len(customized_text)
-        
-        # Calculate proportions and split intelligently
-        chunks = []
-        start_pos = 0
-        
-        for orig_text in original_texts:
-            orig_length = len(orig_text)
-            # Calculate proportional chunk size
-            proportion = orig_length / max(1, orig_chars_total)
-            chunk_size = max(1, int(proportion * custom_chars_total))
-            
-            # Adjust to sentence or punctuation boundaries where possible
-            end_pos = min(start_pos + chunk_size, custom_chars_total)
-            
-            # Look for sentence-ending punctuation near the calculated end position
-            window_size = min(30, chunk_size // 2)  # Look 30 chars or half chunk size, whichever is smaller
-            search_start = max(start_pos, end_pos - window_size)
-            search_end = min(custom_chars_total, end_pos + window_size)
-            
-            # Find the nearest sentence break
-            sentence_break = end_pos
-            for i in range(end_pos, search_start, -1):
-                if i < custom_chars_total and customized_text[i-1] in '.!?':
-                    sentence_break = i
-                    break
-            
-            # If no sentence break found going backward, try forward
-            if sentence_break == end_pos:
-                for i in range(end_pos, search_end):
-                    if i < custom_chars_total and customized_text[i-1] in '.!?':
-                        sentence_break = i
-                        break
-            
-            # Extract the chunk
-            chunk = customized_text[start_pos:sentence_break].strip()
-            chunks.append(chunk)
-            start_pos = sentence_break
-        
-        # If we have remaining text, add it to the last chunk
-        if start_pos < custom_chars_total and chunks:
-            chunks[-1] = chunks[-1] + ' ' + customized_text[start_pos:].strip()
-        
-        # Ensure we have the same number of chunks as original texts
-        while len(chunks) < len(original_texts):
-            chunks.append("")
-            
-        return chunks[:len(original_texts)]
+    def _create_matching_chunks(self, original_texts, customized_text, blocks=None):
+        """Split customized text over the original lines by each line's rendered width budget"""
+        return align_to_spans(customized_text, self._span_budgets(original_texts, blocks), self.pdf_processor.em_width)
+
+    def _span_budgets(self, original_texts, blocks=None):
+        blocks = blocks or [None] * len(original_texts)
+        return [
+            self.pdf_processor.span_width_budget(block, orig_text, self.measured_fonts)
+            for orig_text, block in zip(original_texts, blocks)
+        ]
+
+    def _match_blocks(self, original_texts, text_blocks):
+        """Best matching text block key (or None) for each original line"""
+        return [self._find_best_matching_block(orig_text, text_blocks) for orig_text in original_texts]
     
     def _find_best_matching_block(self, text, text_blocks):
         """Find the best matching text block for replacement"""
@@ -231,35 +554,88 @@ class ResumeCustomizer:
             return best_match
         return None
     
-    def _save_to_database(self, master_resume_file, job_description, customized_resume_path):
+    def _save_to_database(self, master_resume_file, job_description, customized_resume_path,
+                          idempotency_key='', input_hash='', thumbnail_path=None, replacements=None):
         """Save customized resume to database"""
         try:
-            master_resume = MasterResume.objects.create(
-                resume_file=master_resume_file, 
-                user=self.user
-            )
-            job_description_obj = JobDescription.objects.create(
-                description_text=job_description, 
-                user=self.user
+            batch = CustomizationBatch(self.user)
+            entry = batch.add(
+                master_resume_file, job_description, customized_resume_path, thumbnail_path,
+                idempotency_key=idempotency_key, input_hash=input_hash,
+                # Keep the rewrites so an edited JD can be re-customized incrementally
+                draft=self._draft_fields(job_description, replacements) if replacements is not None else None
             )
-            
-            with open(customized_resume_path, 'rb') as f:
-                customized_resume_file = ContentFile(f.read())
-                filename = f'customized_resume_{uuid.uuid4()}.pdf'
-                customized_resume = CustomizedResume.objects.create(
-                    master_resume=master_resume,
-                    job_description=job_description_obj,
-                    user=self.user
-                )
-                customized_resume.customized_resume_file.save(filename, customized_resume_file)
-            
-            logger.info(f"Customized resume saved with ID: {customized_resume.id}")
-            return customized_resume
+            batch.commit()
+            logger.info(f"Customized resume saved with ID: {entry.customized_resume.id}")
+            return entry.customized_resume
             
         except Exception as e:
             logger.error(f"Error saving to database: {str(e)}", exc_info=True)
             raise ValidationError(f"Error saving customized resume: {str(e)}")
+
+    def _save_draft(self, master_resume, job_description, replacements, job_description_text=None):
+        """Store the inputs (new or existing) and generated rewrites of a dry run"""
+        try:
+            batch = CustomizationBatch(self.user)
+            entry = batch.add(
+                master_resume, job_description,
+                draft=self._draft_fields(job_description_text or job_description, replacements)
+            )
+            batch.commit()
+            logger.info(f"Customization draft saved with ID: {entry.draft.id}")
+            return entry.draft
+        except Exception as e:
+            logger.error(f"Error saving draft: {str(e)}", exc_info=True)
+            raise ValidationError(f"Error saving customization draft: {str(e)}")
     
+    def _draft_fields(self, job_description_text, replacements):
+        return {
+            'job_description_text': job_description_text,
+            'replacements': self.pdf_processor.replacements_to_json(replacements),
+            'group_rewrites': self.group_rewrites,
+        }
+
+    @contextmanager
+    def _stage(self, name):
+        """Add the wall time of the block to stage_timings[name]"""
+        start = time.perf_counter()
+        try:
+            if self.profiler is None:
+                yield
+            else:
+                with self.profiler.stage(name):
+                    yield
+        finally:
+            self.stage_timings[name] = self.stage_timings.get(name, 0.0) + time.perf_counter() - start
+
+    def _save_profile(self, customized_resume):
+        profiler = self.profiler
+        CustomizationProfile.objects.update_or_create(customized_resume=customized_resume, defaults={
+            'folded_stacks': profiler.sampler.folded(),
+            'sample_interval': profiler.interval,
+            'sample_count': profiler.sampler.samples,
+            'stage_timings': self.stage_timings,
+            'stage_memory': profiler.stage_memory,
+            'peak_memory': profiler.peak_memory,
+        })
+
+    def server_timing(self):
+        """Stage timings as a Server-Timing header value (milliseconds).
+
+        When AI rewrites were requested, an ai-fallback entry reports how many of them failed and
+        kept the original text, e.g. ai-fallback;desc="1/7".
+        """
+        entries = [f'{name};dur={seconds * 1000:.1f}' for name, seconds in self.stage_timings.items()]
+        if self.ai_service.rewrites:
+            entries.append(f'ai-fallback;desc="{self.ai_service.fallbacks}/{self.ai_service.rewrites}"')
+        return ', '.join(entries)
+
+    def _temp_path(self, filename):
+        """Reserve a path under MEDIA_ROOT/temp that is removed with the other temp files"""
+        path = os.path.join(settings.MEDIA_ROOT, sharded_path('temp', filename))
+        self.temp_files.append(path)
+        return path
+
     def _cleanup_temp_files(self):
         """Clean up temporary files"""
         for temp_file in self.temp_files:
@@ -268,4 +644,38 @@ class ResumeCustomizer:
                     os.remove(temp_file)
                     logger.info(f"Cleaned up: {temp_file}")
             except Exception as e:
-                logger.warning(f"Failed to clean up {temp_file}: {str(e)}")
\ No newline at end of file
+                logger.warning(f"Failed to clean up {temp_file}: {str(e)}")
+
+
+class StreamedAlignment:
+    """Aligns a group's rewrite to its spans' width budgets while the AI is still streaming it.
+
+    The first streamed line matches the original lines to text blocks and sets up a SpanAligner
+    with their width budgets; every line is fed to it as it arrives, so only the final split is
+    left once the response is complete.
+    """
+
+    def __init__(self, customizer, original_texts, text_blocks):
+        self.customizer = customizer
+        self.original_texts = original_texts
+        self.text_blocks = text_blocks
+        self.lines = []
+        self.matched_keys = None
+        self.aligner = None
+
+    def on_line(self, index, line):
+        if self.aligner is None:
+            customizer = self.customizer
+            self.matched_keys = customizer._match_blocks(self.original_texts, self.text_blocks)
+            blocks = [self.text_blocks.get(key) if key else None for key in self.matched_keys]
+            self.aligner = SpanAligner(
+                customizer._span_budgets(self.original_texts, blocks), customizer.pdf_processor.em_width
+            )
+        self.lines.append(line)
+        self.aligner.feed(line)
+
+    def chunks_for(self, customized_text):
+        """Width-aligned chunks if the final text is exactly what streamed in, else None"""
+        if self.aligner is None or customized_text != '\n'.join(self.lines):
+            return None
+        return self.aligner.chunks()
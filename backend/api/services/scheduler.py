@@ -0,0 +1,205 @@
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import OrderedDict, deque
+from contextlib import contextmanager, asynccontextmanager
+from django.conf import settings
+
+logger = logging.getLogger('resume_customizer')
+
+# Priority classes, served strictly in this order
+INTERACTIVE = 'interactive'
+DRY_RUN = 'dry_run'
+BULK = 'bulk'
+PRIORITIES = (INTERACTIVE, DRY_RUN, BULK)
+
+# (user id, priority) of the pipeline running in this context, so nested AI calls inherit it
+current_job = contextvars.ContextVar('current_job', default=(None, INTERACTIVE))
+
+class _Waiter:
+    def __init__(self, user_id, priority, loop=None):
+        self.user_id = user_id
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+        self.loop = loop
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future = loop.create_future()
+
+    def grant(self):
+        self.granted = True
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+class FairShareScheduler:
+    """Admission control with a global concurrency cap, priority classes and per-user fair queuing.
+
+    When a slot frees up it goes to the highest priority class with waiters; inside a class users
+    are served round-robin, so one user's 200 queued jobs take turns with everyone else's single
+    request instead of running ahead of them. Works for threads (`slot`) and coroutines (`aslot`).
+    """
+
+    def __init__(self, name, capacity):
+        self.name = name
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._running = 0
+        # priority -> OrderedDict(user id -> deque of waiters); dict order is the round-robin order
+        self._queues = {priority: OrderedDict() for priority in PRIORITIES}
+        self._waits = deque(maxlen=1000)
+        self._total_admitted = 0
+
+    @contextmanager
+    def slot(self, user_id=None, priority=INTERACTIVE):
+        waiter = self._enqueue(user_id, priority)
+        if waiter is not None:
+            waiter.event.wait()
+        try:
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def aslot(self, user_id=None, priority=INTERACTIVE):
+        waiter = self._enqueue(user_id, priority, asyncio.get_running_loop())
+        if waiter is not None:
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                with self._lock:
+                    if not waiter.granted:
+                        self._remove(waiter)
+                        raise
+                # Granted while being cancelled: hand the slot on
+                self._release()
+                raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _enqueue(self, user_id, priority, loop=None):
+        """Take a slot immediately if possible (returns None), otherwise queue and return the waiter"""
+        if priority not in self._queues:
+            priority = INTERACTIVE
+        with self._lock:
+            if self._running < self.capacity and not self._has_waiters():
+                self._running += 1
+                self._record_wait(0.0)
+                return None
+            waiter = _Waiter(user_id, priority, loop)
+            self._queues[priority].setdefault(user_id, deque()).append(waiter)
+            return waiter
+
+    def _release(self):
+        with self._lock:
+            self._running -= 1
+            waiter = self._next_waiter()
+            if waiter is not None:
+                self._running += 1
+                self._record_wait(time.monotonic() - waiter.enqueued_at)
+                waiter.grant()
+
+    def _next_waiter(self):
+        for priority in PRIORITIES:
+            users = self._queues[priority]
+            if not users:
+                continue
+            user_id, waiters = next(iter(users.items()))
+            waiter = waiters.popleft()
+            # Rotate the user to the back of the class so the next slot goes to someone else
+            del users[user_id]
+            if waiters:
+                users[user_id] = waiters
+            return waiter
+        return None
+
+    def _remove(self, waiter):
+        users = self._queues[waiter.priority]
+        waiters = users.get(waiter.user_id)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del users[waiter.user_id]
+
+    def _has_waiters(self):
+        return any(self._queues[priority] for priority in PRIORITIES)
+
+    def _record_wait(self, seconds):
+        self._total_admitted += 1
+        self._waits.append(seconds)
+
+    def metrics(self):
+        """Snapshot of queue depth and admission wait times (over the last 1000 admissions)"""
+        with self._lock:
+            waits = sorted(self._waits)
+            queued = {
+                priority: sum(len(waiters) for waiters in self._queues[priority].values())
+                for priority in PRIORITIES
+            }
+            return {
+                'name': self.name,
+                'capacity': self.capacity,
+                'running': self._running,
+                'queued': queued,
+                'queued_total': sum(queued.values()),
+                'queued_users': len({
+                    user_id for priority in PRIORITIES for user_id in self._queues[priority]
+                }),
+                'admitted_total': self._total_admitted,
+                'wait_seconds': {
+                    'avg': sum(waits) / len(waits) if waits else 0.0,
+                    'p50': waits[len(waits) // 2] if waits else 0.0,
+                    'p95': waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0,
+                    'max': waits[-1] if waits else 0.0,
+                },
+            }
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+def get_scheduler(name):
+    """Process-wide schedulers: 'pipeline' (whole customizations) and 'ai' (individual AI calls)"""
+    with _schedulers_lock:
+        if name not in _schedulers:
+            capacity = {
+                'pipeline': settings.CUSTOMIZE_MAX_CONCURRENT,
+                'ai': settings.AI_MAX_CONCURRENT_REQUESTS,
+            }[name]
+            _schedulers[name] = FairShareScheduler(name, capacity)
+        return _schedulers[name]
+
+@contextmanager
+def pipeline_slot(user_id, priority):
+    """Admit one customization and make its (user, priority) the context for nested AI calls"""
+    with get_scheduler('pipeline').slot(user_id, priority):
+        token = current_job.set((user_id, priority))
+        try:
+            yield
+        finally:
+            current_job.reset(token)
+
+@asynccontextmanager
+async def apipeline_slot(user_id, priority):
+    async with get_scheduler('pipeline').aslot(user_id, priority):
+        token = current_job.set((user_id, priority))
+        try:
+            yield
+        finally:
+            current_job.reset(token)
+
+def ai_slot():
+    return get_scheduler('ai').slot(*current_job.get())
+
+def aai_slot():
+    return get_scheduler('ai').aslot(*current_job.get())
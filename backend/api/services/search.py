@@ -0,0 +1,29 @@
+from functools import reduce
+from operator import or_
+from django.db import connections
+from django.db.models import F, Q, Value, FloatField
+from django.contrib.postgres.search import SearchQuery, SearchRank
+
+# Text search configuration the search_vector triggers (migration 0012) index with
+SEARCH_CONFIG = 'english'
+
+def search(queryset, query, fallback_fields):
+    """Rows of queryset matching query, best match first, annotated with `rank`.
+
+    On PostgreSQL the query uses web search syntax ("quoted phrases", -excluded, or) against
+    the GIN-indexed search_vector column and is ranked with ts_rank, so title matches (weight A)
+    beat matches in the text. Other backends (SQLite in development and tests) fall back to an
+    unranked, case-insensitive match of every word in fallback_fields, newest first.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        search_query = SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-rank', '-created_at', '-id')
+
+    condition = Q()
+    for word in query.split():
+        condition &= reduce(or_, [Q(**{f'{field}__icontains': word}) for field in fallback_fields])
+    return queryset.filter(condition).annotate(
+        rank=Value(None, output_field=FloatField())
+    ).order_by('-created_at', '-id')
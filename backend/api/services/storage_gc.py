@@ -0,0 +1,127 @@
+import os
+import time
+import logging
+from django.conf import settings
+
+from ..models import MasterResume, CustomizedResume
+
+logger = logging.getLogger('resume_customizer')
+
+class StorageGarbageCollector:
+    """Find and remove media files that no database row references, plus stale temp files"""
+
+    # Directory under MEDIA_ROOT -> (model, file field) that owns the files in it
+    MANAGED_DIRS = {
+        'resumes': (MasterResume, 'resume_file'),
+        'customized_resumes': (CustomizedResume, 'customized_resume_file'),
+        'thumbnails': (CustomizedResume, 'thumbnail'),
+    }
+    TEMP_DIR = 'temp'
+
+    def __init__(self, batch_size=500, min_age=3600, temp_max_age=3600, limit=None, dry_run=False):
+        self.batch_size = batch_size
+        # Files younger than this are never treated as orphans: a request may have written
+        # the file but not yet committed the row that points at it
+        self.min_age = min_age
+        self.temp_max_age = temp_max_age
+        self.limit = limit
+        self.dry_run = dry_run
+        self.stats = {'scanned': 0, 'removed': 0, 'reclaimed_bytes': 0, 'errors': 0}
+
+    def run(self):
+        """Collect orphaned blobs and stale temp files, returning the stats dict"""
+        now = time.time()
+        for directory, (model, field_name) in self.MANAGED_DIRS.items():
+            for batch in self._batched(self._walk(directory, now - self.min_age)):
+                referenced = set(
+                    model.objects.filter(**{f'{field_name}__in': [name for name, _ in batch]})
+                    .values_list(field_name, flat=True)
+                )
+                for name, size in batch:
+                    if name not in referenced:
+                        self._remove(name, size)
+                if self._limit_reached():
+                    return self.stats
+
+        for batch in self._batched(self._walk(self.TEMP_DIR, now - self.temp_max_age)):
+            for name, size in batch:
+                self._remove(name, size)
+            if self._limit_reached():
+                break
+
+        if not self.dry_run:
+            self._prune_empty_dirs(now)
+        return self.stats
+
+    def _walk(self, directory, cutoff):
+        """Yield (storage name, size) for files under MEDIA_ROOT/directory last modified before cutoff"""
+        root = os.path.join(settings.MEDIA_ROOT, directory)
+        stack = [root]
+        while stack:
+            try:
+                entries = os.scandir(stack.pop())
+            except FileNotFoundError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                        continue
+                    try:
+                        stat = entry.stat(follow_symlinks=False)
+                    except FileNotFoundError:
+                        continue
+                    self.stats['scanned'] += 1
+                    if stat.st_mtime < cutoff:
+                        name = os.path.relpath(entry.path, settings.MEDIA_ROOT).replace(os.sep, '/')
+                        yield name, stat.st_size
+
+    def _batched(self, iterable):
+        batch = []
+        for item in iterable:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+                if self._limit_reached():
+                    return
+        if batch:
+            yield batch
+
+    def _remove(self, name, size):
+        if self._limit_reached():
+            return
+        if not self.dry_run:
+            try:
+                os.remove(os.path.join(settings.MEDIA_ROOT, name))
+            except FileNotFoundError:
+                return
+            except OSError as e:
+                logger.warning(f"Failed to remove {name}: {str(e)}")
+                self.stats['errors'] += 1
+                return
+        logger.info(f"Removed unreferenced media file: {name}")
+        self.stats['removed'] += 1
+        self.stats['reclaimed_bytes'] += size
+
+    def _limit_reached(self):
+        return self.limit is not None and self.stats['removed'] >= self.limit
+
+    def _prune_empty_dirs(self, now):
+        """Remove empty shard directories not modified within the age window.
+
+        Writers makedirs() a shard and then create their file in it, so a directory that was
+        just created (or just emptied) may be about to receive a file; it is left for a later run.
+        """
+        max_ages = {**{directory: self.min_age for directory in self.MANAGED_DIRS}, self.TEMP_DIR: self.temp_max_age}
+        for directory, max_age in max_ages.items():
+            root = os.path.join(settings.MEDIA_ROOT, directory)
+            cutoff = now - max_age
+            for dirpath, _, _ in os.walk(root, topdown=False):
+                if dirpath != root:
+                    try:
+                        if os.stat(dirpath).st_mtime >= cutoff:
+                            continue
+                        os.rmdir(dirpath)
+                    except OSError:
+                        pass
@@ -1,3 +1,1348 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zipfile
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import update_users
+from .models import (
+    MasterResume, JobDescription, CustomizedResume, CustomizationDraft, CustomizationProfile, sharded_path
+)
+from .services.idempotency import RequestCoalescer, hash_uploaded_file
+from .services.persistence import CustomizationBatch
+from .services.relevance import select_relevant_groups
+from .services.search import SEARCH_CONFIG
+from .services.scheduler import FairShareScheduler, INTERACTIVE, DRY_RUN, BULK
+from .services.storage_gc import StorageGarbageCollector
+from .utils.ai_service import AIService
+from .utils.text_alignment import align_to_spans
+from .utils.log_handlers import QueueListenerHandler, RequestContextFilter, SpanSamplingFilter
+from .utils.request_context import request_id, span_events_sampled
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ListEndpointQueryCountTests(TestCase):
+    """List endpoints must run in a constant number of queries regardless of row count"""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _create_rows(self, count):
+        for i in range(count):
+            master_resume = MasterResume.objects.create(user=self.user, resume_file=ContentFile(b'', name='r.pdf'))
+            job_description = JobDescription.objects.create(
+                user=self.user, job_title=f'Job {i}', description_text='Python developer'
+            )
+            CustomizedResume.objects.create(
+                user=self.user,
+                master_resume=master_resume,
+                job_description=job_description,
+                customized_resume_file=ContentFile(b'', name='c.pdf'),
+            )
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_list_endpoints_use_constant_queries(self):
+        for url in ['/api/master-resumes/', '/api/job-descriptions/', '/api/customized-resumes/']:
+            self._create_rows(2)
+            few, _ = self._count_queries(url)
+            self._create_rows(15)
+            many, _ = self._count_queries(url)
+            self.assertEqual(few, many, url)
+            self.assertEqual(many, 1, url)
+
+    def test_customized_resume_list_is_slim_and_cursor_paginated(self):
+        self._create_rows(25)
+        # Without page_size the whole list comes back as a bare array, as before pagination
+        _, response = self._count_queries('/api/customized-resumes/')
+        self.assertEqual(len(response.data), 25)
+        self.assertIn('job_title', response.data[0])
+
+        _, response = self._count_queries('/api/customized-resumes/?page_size=20')
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertIsNotNone(response.data['next'])
+        self.assertIn('job_title', response.data['results'][0])
+
+        _, response = self._count_queries(response.data['next'])
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+
+    def test_list_is_scoped_to_user(self):
+        self._create_rows(3)
+        other = User.objects.create_user(username='bob', password='secret')
+        self.client.force_authenticate(other)
+        _, response = self._count_queries('/api/customized-resumes/')
+        self.assertEqual(response.data, [])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, DOWNLOAD_SENDFILE_BACKEND='')
+class CustomizedResumeDownloadTests(TestCase):
+    """Download endpoint validators, ranges and proxy offload"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        master_resume = MasterResume.objects.create(user=self.user, resume_file=ContentFile(b'', name='r.pdf'))
+        self.customized_resume = CustomizedResume.objects.create(
+            user=self.user,
+            master_resume=master_resume,
+            customized_resume_file=ContentFile(b'%PDF-1.4 0123456789', name='c.pdf'),
+        )
+        self.url = f'/api/customized-resumes/{self.customized_resume.id}/download/'
+
+    def test_full_download_sets_strong_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 0123456789')
+        self.assertFalse(response['ETag'].startswith('W/'))
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_range_request(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=9-12')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 9-12/19')
+        self.assertEqual(b''.join(response.streaming_content), b'0123')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=50-')
+        self.assertEqual(response.status_code, 416)
+
+        # A reversed range is invalid and ignored
+        response = self.client.get(self.url, HTTP_RANGE='bytes=12-9')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 0123456789')
+
+    @override_settings(DOWNLOAD_SENDFILE_BACKEND='nginx', DOWNLOAD_SENDFILE_PREFIX='/protected-media/')
+    def test_nginx_offload(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.customized_resume.customized_resume_file.name}')
+        self.assertEqual(response.content, b'')
+
+    def test_other_users_cannot_download(self):
+        self.client.force_authenticate(User.objects.create_user(username='bob', password='secret'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_idempotency_fields_are_read_only(self):
+        CustomizedResume.objects.filter(pk=self.customized_resume.pk).update(idempotency_key='k1', input_hash='h1')
+        response = self.client.patch(f'/api/customized-resumes/{self.customized_resume.id}/',
+                                     {'idempotency_key': 'k2', 'input_hash': 'h2'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.customized_resume.refresh_from_db()
+        self.assertEqual((self.customized_resume.idempotency_key, self.customized_resume.input_hash), ('k1', 'h1'))
+
+    def test_etag_follows_the_served_file(self):
+        etag = self.client.get(self.url)['ETag']
+        detail = f'/api/customized-resumes/{self.customized_resume.id}/'
+        self.client.patch(detail, {'content_hash': 'forged', 'thumbnail': 'thumbnails/x.png'}, format='json')
+        self.assertEqual(self.client.get(self.url)['ETag'], etag)
+
+        # Replacing the file drops the stored hash, so the next download hashes the new file
+        response = self.client.patch(detail, {'customized_resume_file': ContentFile(b'%PDF-1.4 new', name='d.pdf')},
+                                     format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(self.url)['ETag'], '"%s"' % hashlib.sha256(b'%PDF-1.4 new').hexdigest())
+
+
+class StorageGarbageCollectorTests(TestCase):
+    """Orphaned blobs and stale temp files are removed, referenced files are kept"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_removes_orphans_and_stale_temp_files(self):
+        user = User.objects.create_user(username='alice', password='secret')
+        kept = MasterResume.objects.create(user=user, resume_file=ContentFile(b'keep', name='a.pdf'))
+        orphan = MasterResume.objects.create(user=user, resume_file=ContentFile(b'orphan', name='b.pdf'))
+        orphan_path = orphan.resume_file.path
+        orphan.delete()
+        temp_path = os.path.join(self.media_root, sharded_path('temp', 'c.pdf'))
+        os.makedirs(os.path.dirname(temp_path), exist_ok=True)
+        with open(temp_path, 'wb') as f:
+            f.write(b'temp')
+
+        stats = StorageGarbageCollector(min_age=-60, temp_max_age=-60, batch_size=1).run()
+
+        self.assertTrue(os.path.exists(kept.resume_file.path))
+        self.assertFalse(os.path.exists(orphan_path))
+        self.assertFalse(os.path.exists(temp_path))
+        self.assertEqual(stats['reclaimed_bytes'], len(b'orphan') + len(b'temp'))
+
+    def test_recently_modified_shard_dirs_are_kept(self):
+        fresh = os.path.join(self.media_root, 'temp', 'aa', 'bb')
+        stale = os.path.join(self.media_root, 'temp', 'cc', 'dd')
+        os.makedirs(fresh)
+        os.makedirs(stale)
+        # An empty shard untouched for two hours, and one a request has just created
+        old = time.time() - 7200
+        os.utime(stale, (old, old))
+        os.utime(os.path.dirname(stale), (old, old))
+
+        StorageGarbageCollector(min_age=3600, temp_max_age=3600).run()
+
+        self.assertTrue(os.path.isdir(fresh))
+        self.assertFalse(os.path.exists(stale))
+
+
+class RequestCoalescerTests(TestCase):
+    """Concurrent identical requests share one computation"""
+
+    def test_concurrent_callers_share_one_computation(self):
+        coalescer = RequestCoalescer(timeout=5)
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'result'
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(coalescer.run('k', compute, lambda: None)))
+        leader.start()
+        started.wait(5)
+        followers = [
+            threading.Thread(target=lambda: results.append(coalescer.run('k', compute, lambda: None)))
+            for _ in range(3)
+        ]
+        for thread in followers:
+            thread.start()
+        # Give the followers time to attach before the leader finishes
+        time.sleep(0.2)
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['result'] * 4)
+
+    def test_reused_key_with_different_input_is_rejected_while_in_flight(self):
+        coalescer = RequestCoalescer(timeout=5)
+        started = threading.Event()
+        release = threading.Event()
+
+        def compute():
+            started.set()
+            release.wait(5)
+            return 'result'
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(coalescer.run('k3', compute, lambda: None, 'hash-a')))
+        leader.start()
+        started.wait(5)
+        try:
+            with self.assertRaisesMessage(ValidationError, 'already used for a different request'):
+                coalescer.run('k3', compute, lambda: None, 'hash-b')
+        finally:
+            release.set()
+            leader.join(5)
+        self.assertEqual(results, ['result'])
+
+    def test_reused_key_with_different_input_is_rejected_while_in_flight_async(self):
+        coalescer = RequestCoalescer(timeout=5)
+
+        async def scenario():
+            release = asyncio.Event()
+
+            async def compute():
+                await release.wait()
+                return 'result'
+
+            async def lookup():
+                return None
+
+            leader = asyncio.ensure_future(coalescer.arun('k4', compute, lookup, 'hash-a'))
+            await asyncio.sleep(0)
+            error = None
+            try:
+                await coalescer.arun('k4', compute, lookup, 'hash-b')
+            except ValidationError as e:
+                error = e
+            follower = asyncio.ensure_future(coalescer.arun('k4', compute, lookup, 'hash-a'))
+            release.set()
+            return error, await leader, await follower
+
+        error, leader_result, follower_result = async_to_sync(scenario)()
+        self.assertIn('already used for a different request', str(error))
+        self.assertEqual((leader_result, follower_result), ('result', 'result'))
+
+    def test_existing_result_from_another_worker_is_reused(self):
+        coalescer = RequestCoalescer(timeout=5)
+        self.assertEqual(coalescer.run('k2', lambda: 'fresh', lambda: 'stored'), 'stored')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class CustomizedResumeExportTests(TestCase):
+    """Bulk export streams a valid ZIP of the selected resumes"""
+
+    def test_export_selected_ids(self):
+        user = User.objects.create_user(username='alice', password='secret')
+        client = APIClient()
+        client.force_authenticate(user)
+        master_resume = MasterResume.objects.create(user=user, resume_file=ContentFile(b'', name='r.pdf'))
+        ids = []
+        for i in range(3):
+            job_description = JobDescription.objects.create(user=user, job_title=f'Data Engineer {i}', description_text='x')
+            ids.append(CustomizedResume.objects.create(
+                user=user,
+                master_resume=master_resume,
+                job_description=job_description,
+                customized_resume_file=ContentFile(b'%PDF-' + bytes([i]) * 1000, name='c.pdf'),
+            ).id)
+
+        response = client.get('/api/customized-resumes/export/', {'ids': f'{ids[0]},{ids[2]}'})
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(sorted(archive.namelist()), [f'{ids[0]}_data-engineer-0.pdf', f'{ids[2]}_data-engineer-2.pdf'])
+        self.assertEqual(archive.read(f'{ids[2]}_data-engineer-2.pdf'), b'%PDF-' + bytes([2]) * 1000)
+
+        self.assertEqual(client.get('/api/customized-resumes/export/').status_code, 400)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, PDF_POOL_WORKERS=0)
+class CustomizedResumeThumbnailTests(TestCase):
+    """Missing thumbnails are backfilled on first request and served with long cache headers"""
+
+    def test_thumbnail_backfill(self):
+        import fitz
+
+        doc = fitz.open()
+        doc.new_page().insert_text((50, 72), 'Jane Doe', fontsize=14)
+        pdf_bytes = doc.tobytes()
+        doc.close()
+
+        user = User.objects.create_user(username='alice', password='secret')
+        client = APIClient()
+        client.force_authenticate(user)
+        master_resume = MasterResume.objects.create(user=user, resume_file=ContentFile(b'', name='r.pdf'))
+        customized_resume = CustomizedResume.objects.create(
+            user=user,
+            master_resume=master_resume,
+            customized_resume_file=ContentFile(pdf_bytes, name='c.pdf'),
+        )
+
+        response = client.get(f'/api/customized-resumes/{customized_resume.id}/thumbnail/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'\x89PNG'))
+        customized_resume.refresh_from_db()
+        self.assertTrue(customized_resume.thumbnail)
+
+        response = client.get(
+            f'/api/customized-resumes/{customized_resume.id}/thumbnail/', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+
+def make_resume_pdf():
+    import fitz
+
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((50, 60), 'EXPERIENCE - PYTHON, AIRFLOW', fontsize=14)
+    page.insert_text((50, 80), 'Built data pipelines with Python and Airflow', fontsize=10)
+    page.insert_text((50, 94), 'Maintained Django services for billing', fontsize=10)
+    pdf_bytes = doc.tobytes()
+    doc.close()
+    return pdf_bytes
+
+
+class FakeGenaiClient:
+    """Stands in for google.genai.Client; rewrites each prompt's section text in upper case"""
+
+    def __init__(self, api_key=None):
+        self.calls = 0
+        self.models = mock.Mock()
+        self.models.generate_content.side_effect = self._generate
+        self.models.generate_content_stream.side_effect = self._generate_stream
+        self.aio = mock.Mock()
+        self.aio.models.generate_content.side_effect = self._agenerate
+        self.aio.models.generate_content_stream.side_effect = self._agenerate_stream
+
+    def _generate(self, contents, model):
+        self.calls += 1
+        section = contents.split('SECTION:', 1)[1].split('INSTRUCTIONS:', 1)[0]
+        return mock.Mock(text=section.strip().upper())
+
+    def _generate_stream(self, contents, model):
+        # Small pieces so lines arrive split across chunks
+        text = self._generate(contents, model).text
+        return [mock.Mock(text=text[i:i + 7]) for i in range(0, len(text), 7)]
+
+    async def _agenerate(self, contents, model):
+        return self._generate(contents, model)
+
+    async def _agenerate_stream(self, contents, model):
+        chunks = self._generate_stream(contents, model)
+
+        async def stream():
+            for chunk in chunks:
+                yield chunk
+        return stream()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, PDF_POOL_WORKERS=0)
+class DryRunTests(TestCase):
+    """Dry runs return rewrites without rendering; committing renders them without AI calls"""
+
+    def test_dry_run_then_commit(self):
+        user = User.objects.create_user(username='alice', password='secret')
+        client = APIClient()
+        client.force_authenticate(user)
+        fake_client = FakeGenaiClient()
+
+        with mock.patch('api.utils.ai_service.genai.Client', return_value=fake_client):
+            response = client.post('/api/customized-resumes/customize', {
+                'master_resume': ContentFile(make_resume_pdf(), name='resume.pdf'),
+                'job_description': 'Python data engineer',
+                'dry_run': 'true',
+            }, format='multipart')
+            self.assertEqual(response.status_code, 201)
+            self.assertFalse(CustomizedResume.objects.exists())
+            group = response.data['groups'][0]
+            self.assertEqual(group['section'], 'Experience')
+            self.assertTrue(group['spans'])
+            self.assertEqual(group['spans'][0]['text'], group['spans'][0]['text'].upper())
+
+            calls_before_commit = fake_client.calls
+            response = client.post(response.data['commit_url'])
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(fake_client.calls, calls_before_commit)
+            self.assertEqual(CustomizedResume.objects.count(), 1)
+
+            draft = CustomizationDraft.objects.get()
+            response = client.post(f'/api/customization-drafts/{draft.id}/commit/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(CustomizedResume.objects.count(), 1)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, PDF_POOL_WORKERS=0)
+class ResumeUploadHandlerTests(TestCase):
+    """Resume uploads are validated while streaming in and hashed in the same pass"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def customize(self, content):
+        with mock.patch('api.utils.ai_service.genai.Client', return_value=FakeGenaiClient()) as client_cls:
+            response = self.client.post('/api/customized-resumes/customize', {
+                'master_resume': ContentFile(content, name='resume.pdf'),
+                'job_description': 'Data engineer',
+                'dry_run': 'true',
+            }, format='multipart')
+        return response, client_cls
+
+    def test_invalid_uploads_are_rejected_before_the_pipeline(self):
+        import fitz
+
+        doc = fitz.open()
+        for _ in range(3):
+            doc.new_page()
+        three_pages = doc.tobytes()
+        doc.close()
+
+        cases = [
+            (b'PK\x03\x04 not a pdf' * 100, 'not a PDF'),
+            (b'%PDF-1.4 truncated', 'not a readable PDF'),
+            (make_resume_pdf() + b' ' * 4096, 'exceeds'),
+            (three_pages, '3 pages'),
+        ]
+        with override_settings(RESUME_UPLOAD_MAX_BYTES=len(three_pages) + 1024, RESUME_UPLOAD_MAX_PAGES=2):
+            for content, error in cases:
+                response, client_cls = self.customize(content)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(error, response.data['error'])
+                client_cls.return_value.models.generate_content_stream.assert_not_called()
+        self.assertFalse(CustomizationDraft.objects.exists())
+
+    def test_upload_hash_is_reused(self):
+        pdf_bytes = make_resume_pdf()
+        # In memory, and streamed to a temporary file
+        for memory_size in (settings.FILE_UPLOAD_MAX_MEMORY_SIZE, 0):
+            with override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=memory_size):
+                request = RequestFactory().post('/', {'master_resume': ContentFile(pdf_bytes, name='resume.pdf')})
+                upload = request.FILES['master_resume']
+            self.assertEqual(upload.sha256, hashlib.sha256(pdf_bytes).hexdigest())
+            self.assertEqual(upload.read(), pdf_bytes)
+            with mock.patch.object(upload, 'chunks') as chunks:
+                self.assertEqual(hash_uploaded_file(upload), upload.sha256)
+            chunks.assert_not_called()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, PDF_POOL_WORKERS=0)
+class IncrementalRecustomizationTests(TestCase):
+    """Editing a job description only regenerates the groups its changed requirements touch"""
+
+    def test_unaffected_groups_are_reused(self):
+        user = User.objects.create_user(username='alice', password='secret')
+        client = APIClient()
+        client.force_authenticate(user)
+        fake_client = FakeGenaiClient()
+
+        with mock.patch('api.utils.ai_service.genai.Client', return_value=fake_client):
+            response = client.post('/api/customized-resumes/customize', {
+                'master_resume': ContentFile(make_resume_pdf(), name='resume.pdf'),
+                'job_description': 'Python data engineer.\nBuild batch pipelines.',
+            }, format='multipart')
+            self.assertEqual(response.status_code, 201)
+            job_description = JobDescription.objects.get()
+            url = f'/api/job-descriptions/{job_description.id}/recustomize/'
+
+            job_description.description_text += '\nRun Kubernetes clusters.'
+            job_description.save()
+            calls = fake_client.calls
+            response = client.post(url)
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual((response.data['groups_reused'], response.data['groups_regenerated']), (1, 0))
+            self.assertEqual(fake_client.calls, calls)
+
+            job_description.description_text += '\nOwn our Airflow deployment.'
+            job_description.save()
+            response = client.post(url)
+            self.assertEqual((response.data['groups_reused'], response.data['groups_regenerated']), (0, 1))
+            self.assertEqual(CustomizedResume.objects.count(), 3)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, PDF_POOL_WORKERS=0, GEMINI_BASE_URL='http://127.0.0.1:8765')
+class ServerTimingTests(TestCase):
+    """Customize reports its pipeline stages in Server-Timing; replays do not"""
+
+    def test_stage_timings_header(self):
+        user = User.objects.create_user(username='alice', password='secret')
+        client = APIClient()
+        client.force_authenticate(user)
+        pdf_bytes = make_resume_pdf()
+        data = lambda: {
+            'master_resume': ContentFile(pdf_bytes, name='resume.pdf'),
+            'job_description': 'Python data engineer',
+        }
+
+        with mock.patch('api.utils.ai_service.genai.Client', return_value=FakeGenaiClient()) as client_cls:
+            response = client.post('/api/customized-resumes/customize', data(), format='multipart', HTTP_IDEMPOTENCY_KEY='k1')
+            self.assertEqual(response.status_code, 201)
+            entries = response['Server-Timing'].split(', ')
+            stages = [entry.split(';')[0] for entry in entries if ';dur=' in entry]
+            self.assertEqual(sorted(stages), ['ai', 'extract', 'queue', 'render', 'save', 'upload'])
+            self.assertIn('ai-fallback;desc="0/1"', entries)
+            self.assertEqual(client_cls.call_args.kwargs['http_options'], {'base_url': 'http://127.0.0.1:8765'})
+
+            response = client.post('/api/customized-resumes/customize', data(), format='multipart', HTTP_IDEMPOTENCY_KEY='k1')
+            self.assertEqual(response['Idempotent-Replayed'], 'true')
+            self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_failed_ai_calls_are_reported_as_fallbacks(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='alice', password='secret'))
+        failing = FakeGenaiClient()
+        failing.models.generate_content.side_effect = RuntimeError('503 from provider')
+        failing.models.generate_content_stream.side_effect = RuntimeError('503 from provider')
+
+        with mock.patch('api.utils.ai_service.genai.Client', return_value=failing):
+            response = client.post('/api/customized-resumes/customize', {
+                'master_resume': ContentFile(make_resume_pdf(), name='resume.pdf'),
+                'job_description': 'Python data engineer',
+            }, format='multipart')
+        # The request still succeeds, with the original lines kept
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('ai-fallback;desc="1/1"', response['Server-Timing'])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, PDF_POOL_WORKERS=0)
+class AsyncCustomizeTests(TestCase):
+    """The async customize view runs the pipeline on the aio client with the sync view's contract"""
+
+    url = '/api/customized-resumes/customize-async'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='secret')
+        self.headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        self.pdf_bytes = make_resume_pdf()
+        self.fake_client = FakeGenaiClient()
+        patcher = mock.patch('api.utils.ai_service.genai.Client', return_value=self.fake_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def data(self, **extra):
+        return {'master_resume': ContentFile(self.pdf_bytes, name='resume.pdf'),
+                'job_description': 'Python data engineer', **extra}
+
+    async def test_requires_token(self):
+        response = await self.async_client.post(self.url, self.data())
+        self.assertEqual(response.status_code, 401)
+
+    async def test_customize_then_replay(self):
+        headers = {**self.headers, 'Idempotency-Key': 'a1'}
+        response = await self.async_client.post(self.url, self.data(), headers=headers)
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.json()['download_url'].endswith(f"/customized-resumes/{response.json()['id']}/download/"))
+        self.assertTrue(response.has_header('Server-Timing'))
+        # Every AI call went through the aio client
+        self.assertGreater(self.fake_client.calls, 0)
+        self.fake_client.models.generate_content.assert_not_called()
+        self.fake_client.models.generate_content_stream.assert_not_called()
+
+        replay = await self.async_client.post(self.url, self.data(), headers=headers)
+        self.assertEqual(replay.status_code, 200)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(replay.json()['id'], response.json()['id'])
+        self.assertEqual(await CustomizedResume.objects.acount(), 1)
+
+    async def test_dry_run(self):
+        response = await self.async_client.post(self.url, self.data(dry_run='true'), headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('commit_url', response.json())
+        self.assertEqual(response.json()['groups'][0]['section'], 'Experience')
+        self.assertFalse(await CustomizedResume.objects.aexists())
+        self.assertEqual(await CustomizationDraft.objects.acount(), 1)
+
+    async def test_validation_error(self):
+        response = await self.async_client.post(self.url, self.data(job_description=''), headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('No job description provided', response.json()['error'])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, PDF_POOL_WORKERS=0, PROFILE_SAMPLE_INTERVAL=0.001)
+class RequestProfilingTests(TestCase):
+    """Staff can profile one customization; the flag does nothing for other users"""
+
+    def customize(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        with mock.patch('api.utils.ai_service.genai.Client', return_value=FakeGenaiClient()):
+            response = client.post('/api/customized-resumes/customize', {
+                'master_resume': ContentFile(make_resume_pdf(), name='resume.pdf'),
+                'job_description': f'Data engineer {user.username}',
+            }, format='multipart', HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 201)
+        return client, response
+
+    def test_staff_profile_is_stored_and_served(self):
+        staff = User.objects.create_user(username='admin', password='secret', is_staff=True)
+        client, response = self.customize(staff)
+
+        response = client.get(response.data['profile_url'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['stage_memory']), {'upload', 'extract', 'ai', 'render', 'save'})
+        self.assertGreater(response.data['peak_memory'], 0)
+        self.assertGreater(response.data['sample_count'], 0)
+        self.assertFalse(tracemalloc.is_tracing())
+
+        folded = client.get(response.data['folded_url']).content.decode()
+        self.assertIn('_run_pipeline', folded)
+        self.assertGreater(int(folded.splitlines()[0].rsplit(' ', 1)[1]), 0)
+
+    def test_flag_is_ignored_for_other_users(self):
+        user = User.objects.create_user(username='alice', password='secret')
+        client, response = self.customize(user)
+        self.assertNotIn('profile_url', response.data)
+        self.assertFalse(CustomizationProfile.objects.exists())
+        self.assertEqual(client.get(f"/api/profiles/{response.data['id']}").status_code, 403)
+
+    def test_tracing_started_elsewhere_is_left_running(self):
+        from .utils.profiling import RequestProfiler
+
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+        with RequestProfiler(interval=0.001):
+            pass
+        self.assertTrue(tracemalloc.is_tracing())
+
+
+class PDFPoolTests(TestCase):
+    """A real worker process gives the same extraction and rendering as running inline"""
+
+    def test_pool_matches_inline(self):
+        import fitz
+        from .utils import pdf_pool
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        pdf_path = os.path.join(tmp_dir, 'resume.pdf')
+        with open(pdf_path, 'wb') as f:
+            f.write(make_resume_pdf())
+
+        def run():
+            layout = pdf_pool.extract_text_with_layout(pdf_path)
+            replacements = {
+                key: {'info': info, 'text': 'Maintained Django billing services'}
+                for key, info in layout[1].items() if info['text'].strip() == 'Maintained Django services for billing'
+            }
+            self.assertEqual(len(replacements), 1)
+            output_path = pdf_pool.replace_text_in_pdf(pdf_path, replacements)
+            self.addCleanup(os.remove, output_path)
+            with fitz.open(output_path) as doc:
+                return layout, doc[0].get_text()
+
+        with override_settings(PDF_POOL_WORKERS=0):
+            inline = run()
+        with override_settings(PDF_POOL_WORKERS=1):
+            self.addCleanup(self._shutdown_pool)
+            self.assertIsNotNone(pdf_pool.get_executor())
+            pooled = run()
+            self.assertEqual(async_to_sync(pdf_pool.aextract_text_with_layout)(pdf_path), inline[0])
+
+        self.assertEqual(pooled, inline)
+        self.assertIn('Maintained Django billing services', pooled[1])
+
+    def _shutdown_pool(self):
+        from .utils import pdf_pool
+        if pdf_pool._executor is not None:
+            pdf_pool._executor.shutdown()
+            pdf_pool._executor = None
+
+
+class PageShardedExtractionTests(TestCase):
+    """Long documents are extracted in page-range shards that merge into the serial result"""
+
+    def test_sharded_extraction_matches_serial(self):
+        import fitz
+        from concurrent.futures import ThreadPoolExecutor
+        from .utils import pdf_pool
+        from .utils.pdf_processor import PDFProcessor
+
+        doc = fitz.open()
+        for page_num in range(7):
+            page = doc.new_page()
+            page.insert_text((50, 60), f'EXPERIENCE {page_num}', fontsize=14)
+            page.insert_text((50, 80), f'Built pipeline number {page_num} in Python', fontsize=10)
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        pdf_path = os.path.join(tmp_dir, 'long_resume.pdf')
+        doc.save(pdf_path)
+        doc.close()
+        serial = PDFProcessor().extract_text_with_layout(pdf_path)
+
+        # Threads stand in for the process pool; the task and merge code paths are the same
+        executor = ThreadPoolExecutor(max_workers=3)
+        self.addCleanup(executor.shutdown)
+        with mock.patch.object(pdf_pool, '_executor', executor), \
+                mock.patch.object(pdf_pool, '_worker_processor', PDFProcessor()), \
+                mock.patch.object(pdf_pool, 'usable_cores', return_value=3), \
+                mock.patch.object(pdf_pool, '_call_processor', wraps=pdf_pool._call_processor) as call, \
+                override_settings(PDF_POOL_WORKERS=3, PDF_EXTRACT_PAGES_PER_SHARD=2):
+            self.assertEqual(pdf_pool.page_shards(pdf_path), [range(0, 2), range(2, 4), range(4, 7)])
+            call.reset_mock()
+            sharded = pdf_pool.extract_text_with_layout(pdf_path)
+            # The page count comes from a worker, then one task per shard
+            self.assertEqual([c.args[0] for c in call.call_args_list], ['page_count'] + ['extract_text_with_layout'] * 3)
+            self.assertEqual(async_to_sync(pdf_pool.aextract_text_with_layout)(pdf_path), serial)
+
+            with override_settings(PDF_EXTRACT_PAGES_PER_SHARD=10):
+                self.assertIsNone(pdf_pool.page_shards(pdf_path))
+            with override_settings(PDF_EXTRACT_PAGES_PER_SHARD=0):
+                self.assertIsNone(pdf_pool.page_shards(pdf_path))
+            with mock.patch.object(pdf_pool, 'usable_cores', return_value=1):
+                self.assertIsNone(pdf_pool.page_shards(pdf_path))
+
+        self.assertEqual(sharded[0], serial[0])
+        self.assertEqual(list(sharded[1].items()), list(serial[1].items()))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RenderFontTests(TestCase):
+    """Replacements reuse the span's embedded font when it can draw them, with cached metrics"""
+
+    def test_embedded_font_reuse_and_fallback(self):
+        import fitz
+        from .utils.font_cache import font_cache
+        from .utils.pdf_processor import PDFProcessor
+
+        doc = fitz.open()
+        page = doc.new_page()
+        page.insert_font(fontname='Emb', fontbuffer=fitz.Font('tiro').buffer)
+        page.insert_text((50, 60), 'Built data pipelines with Python', fontname='Emb', fontsize=11)
+        page.insert_text((50, 80), 'Maintained Django services', fontname='Emb', fontsize=11)
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        pdf_path = os.path.join(tmp_dir, 'embedded.pdf')
+        doc.save(pdf_path)
+        doc.close()
+
+        processor = PDFProcessor()
+        _, text_blocks = processor.extract_text_with_layout(pdf_path)
+        first, second = sorted(text_blocks.values(), key=lambda b: b['rect'].y0)
+        replacements = {
+            'a': {'text': 'Built batch pipelines in Python', 'info': first},
+            # Not in the embedded font: drawn with the base-14 fallback instead
+            'b': {'text': 'Maintained Django services \u6f22', 'info': second},
+        }
+        output_path = processor.replace_text_in_pdf(pdf_path, replacements)
+        self.addCleanup(os.remove, output_path)
+
+        output = fitz.open(output_path)
+        font_names = {font[4] for font in output[0].get_fonts()}
+        text = output[0].get_text()
+        output.close()
+        self.assertTrue(any(name.startswith('RF') for name in font_names))
+        self.assertIn('tiro', font_names)
+        self.assertIn('Built batch pipelines in Python', text)
+
+        # Cached widths match PyMuPDF's own base-14 measurement, which is only exact for ASCII:
+        # get_text_length skips the character after each multi-byte one
+        helv = font_cache.base14('helv')[0]
+        sample = 'Built data pipelines with Python and Airflow'
+        self.assertAlmostEqual(helv.text_length(sample, 10), fitz.get_text_length(sample, fontname='helv', fontsize=10))
+        self.assertAlmostEqual(
+            helv.text_length('R\u00e9sum\u00e9', 10),
+            sum(fitz.get_text_length(c, fontname='helv', fontsize=10) for c in 'R\u00e9sum\u00e9')
+        )
+
+    def test_width_budget_uses_the_rendered_font(self):
+        import fitz
+        from .utils import pdf_pool
+        from .utils.pdf_processor import PDFProcessor
+
+        # Droid Sans's name maps to the Helvetica fallback, but its widths differ
+        embedded = fitz.Font('cjk')
+        doc = fitz.open()
+        page = doc.new_page()
+        page.insert_font(fontname='Emb', fontbuffer=embedded.buffer)
+        page.insert_text((50, 60), 'Built data pipelines with Python', fontname='Emb', fontsize=11)
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        pdf_path = os.path.join(tmp_dir, 'embedded.pdf')
+        doc.save(pdf_path)
+        doc.close()
+
+        processor = PDFProcessor()
+        _, text_blocks = processor.extract_text_with_layout(pdf_path)
+        block = next(iter(text_blocks.values()))
+        self.assertEqual(processor._get_best_font(None, block['font']), 'helv')
+        with override_settings(PDF_POOL_WORKERS=0):
+            widths = pdf_pool.glyph_widths(pdf_path, [(block['font'], block['text'])])
+        font, _ = processor.span_width_budget(block, block['text'], processor.measured_fonts(widths))
+
+        sample = 'Owned Airflow pipelines'
+        self.assertAlmostEqual(processor.em_width(sample, font), embedded.text_length(sample, 1))
+        self.assertNotAlmostEqual(processor.em_width(sample, font), processor.em_width(sample, 'helv'), places=2)
+        # Text the embedded font cannot draw is rendered, and so measured, in the fallback
+        self.assertAlmostEqual(processor.em_width('\U0001F600', font), processor.em_width('\U0001F600', 'helv'))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RedactionReplacementTests(TestCase):
+    """Replaced spans are removed from the content stream without touching adjacent text"""
+
+    def test_old_text_removed_and_neighbours_kept(self):
+        import fitz
+        from .utils.pdf_processor import PDFProcessor
+
+        doc = fitz.open()
+        page = doc.new_page()
+        label_width = fitz.get_text_length('Skills:', fontname='hebo', fontsize=10)
+        page.insert_text((50, 48), 'Line directly above here', fontsize=10)
+        page.insert_text((50, 60), 'Skills:', fontname='hebo', fontsize=10)
+        page.insert_text((50 + label_width, 60), 'Python, SQL', fontsize=10)
+        page.insert_text((50, 72), 'Next line directly below', fontsize=10)
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        pdf_path = os.path.join(tmp_dir, 'skills.pdf')
+        doc.save(pdf_path)
+        doc.close()
+
+        processor = PDFProcessor()
+        _, text_blocks = processor.extract_text_with_layout(pdf_path)
+        skills = next(block for block in text_blocks.values() if block['text'] == 'Python, SQL')
+        output_path = processor.replace_text_in_pdf(pdf_path, {'k': {'text': 'Go, Kafka', 'info': skills}})
+        self.addCleanup(os.remove, output_path)
+
+        output = fitz.open(output_path)
+        text = output[0].get_text()
+        self.assertNotIn('Python', text)
+        for kept in ['Line directly above here', 'Skills:', 'Go, Kafka', 'Next line directly below']:
+            self.assertIn(kept, text)
+        self.assertEqual(list(output[0].annots()), [])
+        output.close()
+
+
+class FairShareSchedulerTests(TestCase):
+    """Slots go to higher priority classes first and round-robin between users within a class"""
+
+    def test_priority_then_round_robin(self):
+        scheduler = FairShareScheduler('test', capacity=1)
+        order = []
+
+        def job(user_id, priority, label):
+            with scheduler.slot(user_id, priority):
+                order.append(label)
+
+        threads = []
+        with scheduler.slot('holder', INTERACTIVE):
+            for user_id, priority, label in [
+                ('a', BULK, 'a1'), ('a', BULK, 'a2'), ('a', BULK, 'a3'),
+                ('b', BULK, 'b1'), ('c', DRY_RUN, 'c1'), ('d', INTERACTIVE, 'd1'),
+            ]:
+                thread = threading.Thread(target=job, args=(user_id, priority, label))
+                thread.start()
+                threads.append(thread)
+                # Enqueue in a known order
+                while scheduler.metrics()['queued_total'] < len(threads):
+                    time.sleep(0.001)
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(order, ['d1', 'c1', 'a1', 'b1', 'a2', 'a3'])
+        metrics = scheduler.metrics()
+        self.assertEqual(metrics['queued_total'], 0)
+        self.assertEqual(metrics['running'], 0)
+        self.assertEqual(metrics['admitted_total'], 7)
+
+
+class StreamedGenerationTests(TestCase):
+    """Streamed rewrites hand each finished line over before the response is complete"""
+
+    def test_lines_are_reported_while_streaming(self):
+        events = []
+
+        def stream(contents, model):
+            for piece in ['Led the PYTHON ', 'platform\nBuilt AIR', 'FLOW pipelines\n', 'Ran ETL']:
+                events.append(piece)
+                yield mock.Mock(text=piece)
+
+        fake_client = mock.Mock()
+        fake_client.models.generate_content_stream.side_effect = stream
+        with mock.patch('api.utils.ai_service.genai.Client', return_value=fake_client):
+            text = AIService().generate_customized_content(
+                'Led the python platform\nBuilt airflow pipelines\nRan ETL', 'Data engineer', 'Experience',
+                on_line=lambda index, line: events.append((index, line))
+            )
+
+        self.assertEqual(text, 'Led the PYTHON platform\nBuilt AIRFLOW pipelines\nRan ETL')
+        self.assertEqual(events, [
+            'Led the PYTHON ', 'platform\nBuilt AIR', (0, 'Led the PYTHON platform'),
+            'FLOW pipelines\n', (1, 'Built AIRFLOW pipelines'),
+            'Ran ETL', (2, 'Ran ETL'),
+        ])
+        fake_client.models.generate_content.assert_not_called()
+
+
+class RelevanceFilterTests(TestCase):
+    """Only groups related to the job description are sent to the AI"""
+
+    GROUPS = [
+        ('Summary', [], 'Friendly and reliable team player'),
+        ('Experience', [], 'Built Airflow and Spark pipelines in Python'),
+        ('Experience', [], 'Wrote Python scripts for billing'),
+        ('Experience', [], 'Barista: prepared espresso drinks'),
+        ('Education', [], 'jane.doe@example.com | London'),
+    ]
+    JOB_DESCRIPTION = 'Data engineer building Spark and Airflow pipelines with Python'
+
+    @override_settings(AI_RELEVANCE_THRESHOLD=0.02, AI_RELEVANCE_TOP_K=0)
+    def test_unrelated_groups_are_skipped(self):
+        self.assertEqual(select_relevant_groups(self.GROUPS, self.JOB_DESCRIPTION), [True, True, True, False, False])
+
+    @override_settings(AI_RELEVANCE_THRESHOLD=0.02, AI_RELEVANCE_TOP_K=1)
+    def test_top_k_per_section(self):
+        self.assertEqual(select_relevant_groups(self.GROUPS, self.JOB_DESCRIPTION), [True, True, False, False, False])
+
+    @override_settings(AI_RELEVANCE_THRESHOLD=0, AI_RELEVANCE_TOP_K=0)
+    def test_disabled(self):
+        self.assertEqual(select_relevant_groups(self.GROUPS, self.JOB_DESCRIPTION), [True] * 5)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, PDF_POOL_WORKERS=0)
+class SearchTests(TestCase):
+    """Search endpoints match the user's own job descriptions and generated resume text"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_job_description_search_is_scoped_and_paginated(self):
+        other = User.objects.create_user(username='bob', password='secret')
+        JobDescription.objects.create(user=self.user, job_title='Data Engineer', description_text='Spark and Airflow')
+        JobDescription.objects.create(user=self.user, job_title='Barista', description_text='Espresso drinks')
+        JobDescription.objects.create(user=other, job_title='Data Engineer', description_text='Spark')
+
+        response = self.client.get('/api/job-descriptions/search/', {'q': 'spark engineer'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['job_title'], 'Data Engineer')
+        self.assertIn('rank', response.data['results'][0])
+
+        self.assertEqual(self.client.get('/api/job-descriptions/search/').status_code, 400)
+
+    def test_generated_resume_text_is_searchable(self):
+        from .utils import pdf_pool
+
+        with mock.patch('api.utils.ai_service.genai.Client', return_value=FakeGenaiClient()), \
+                mock.patch.object(pdf_pool, 'run_pdf_task', wraps=pdf_pool.run_pdf_task) as run_pdf_task:
+            response = self.client.post('/api/customized-resumes/customize', {
+                'master_resume': ContentFile(make_resume_pdf(), name='resume.pdf'),
+                'job_description': 'Python data engineer',
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        # Text extraction for the search index is PDF work, so it goes through the pool
+        self.assertIn('extract_plain_text', [c.args[0] for c in run_pdf_task.call_args_list])
+        self.assertIn('AIRFLOW', CustomizedResume.objects.get().resume_text.upper())
+
+        response = self.client.get('/api/customized-resumes/search/', {'q': 'airflow'})
+        self.assertEqual([row['id'] for row in response.data['results']], [CustomizedResume.objects.get().id])
+        self.assertEqual(self.client.get('/api/customized-resumes/search/', {'q': 'kubernetes'}).data['count'], 0)
+
+        # Rows generated before search existed are picked up by the backfill command
+        CustomizedResume.objects.update(resume_text='')
+        self.assertEqual(self.client.get('/api/customized-resumes/search/', {'q': 'airflow'}).data['count'], 0)
+        call_command('backfill_resume_text', stdout=io.StringIO())
+        self.assertEqual(self.client.get('/api/customized-resumes/search/', {'q': 'airflow'}).data['count'], 1)
+
+
+@skipUnless(connection.vendor == 'postgresql', "Ranked search and the search_vector triggers only exist on PostgreSQL")
+class PostgresSearchTests(TestCase):
+    """Triggers keep search_vector current and results are ranked, title matches first"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_triggers_populate_search_vector(self):
+        job_description = JobDescription.objects.create(
+            user=self.user, job_title='Data Engineer', description_text='Spark and Airflow'
+        )
+        self.assertEqual(
+            list(JobDescription.objects.filter(search_vector=SearchQuery('airflows', config=SEARCH_CONFIG))),
+            [job_description]
+        )
+
+        master_resume = MasterResume.objects.create(user=self.user, resume_file=ContentFile(b'', name='r.pdf'))
+        customized_resume = CustomizedResume.objects.create(
+            user=self.user, master_resume=master_resume, customized_resume_file=ContentFile(b'', name='c.pdf')
+        )
+        query = SearchQuery('kubernetes', config=SEARCH_CONFIG)
+        self.assertFalse(CustomizedResume.objects.filter(search_vector=query).exists())
+        # Queryset updates bypass save(), but not the trigger
+        CustomizedResume.objects.filter(pk=customized_resume.pk).update(resume_text='Ran Kubernetes clusters')
+        self.assertTrue(CustomizedResume.objects.filter(search_vector=query).exists())
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexdef FROM pg_indexes WHERE indexname IN ('jobdesc_search_idx', 'customresume_search_idx')"
+            )
+            indexes = [row[0] for row in cursor.fetchall()]
+        self.assertEqual(len(indexes), 2)
+        for indexdef in indexes:
+            self.assertIn('USING gin (search_vector)', indexdef)
+
+    def test_results_are_ranked(self):
+        # Created first, so only its rank can put it ahead of the newer text match
+        in_title = JobDescription.objects.create(user=self.user, job_title='Spark Engineer', description_text='Pipelines')
+        in_text = JobDescription.objects.create(user=self.user, job_title='Analyst', description_text='Spark reports')
+        JobDescription.objects.create(user=self.user, job_title='Barista', description_text='Espresso drinks')
+
+        results = self.client.get('/api/job-descriptions/search/', {'q': 'spark'}).data['results']
+        self.assertEqual([row['id'] for row in results], [in_title.id, in_text.id])
+        self.assertGreater(results[0]['rank'], results[1]['rank'])
+
+        # Web search syntax: phrases and exclusions
+        JobDescription.objects.create(user=self.user, job_title='Spark Engineer Intern', description_text='')
+        results = self.client.get('/api/job-descriptions/search/', {'q': '"spark engineer" -intern'}).data['results']
+        self.assertEqual([row['id'] for row in results], [in_title.id])
+
+
+class ChunkAlignmentTests(TestCase):
+    """Rewritten text is split over the original lines by their rendered width"""
+
+    def test_chunks_follow_span_widths_and_sentence_ends(self):
+        # One unit per character; the second span is three times as wide as the first
+        chunks = align_to_spans(
+            'Built Airflow DAGs. Scaled the Python ingestion platform to billions of events daily.',
+            [('helv', 20), ('helv', 60)],
+            lambda word, font: len(word)
+        )
+        self.assertEqual(chunks, ['Built Airflow DAGs.', 'Scaled the Python ingestion platform to billions of events daily.'])
+
+    def test_rewrite_fits_matched_blocks(self):
+        import fitz
+        from .services.resume_customizer import ResumeCustomizer
+        from .utils.pdf_processor import PDFProcessor
+
+        narrow = {'rect': fitz.Rect(50, 100, 170, 112), 'font': 'Helvetica', 'size': 10}
+        wide = {'rect': fitz.Rect(50, 114, 450, 126), 'font': 'Helvetica', 'size': 10}
+        customizer = ResumeCustomizer.__new__(ResumeCustomizer)
+        customizer.pdf_processor = PDFProcessor()
+        customizer.measured_fonts = {}
+        chunks = customizer._create_matching_chunks(
+            ['Python developer', 'Maintained data pipelines and reporting for the finance team'],
+            'Senior Python engineer. Owned Airflow data pipelines and reporting for the finance organisation.',
+            [narrow, wide]
+        )
+
+        self.assertEqual(chunks[0], 'Senior Python engineer.')
+        for chunk, block in zip(chunks, [narrow, wide]):
+            self.assertLessEqual(fitz.get_text_length(chunk, fontname='helv', fontsize=10), block['rect'].width * 1.05)
+
+    def test_streamed_lines_are_rebalanced_to_span_widths(self):
+        import fitz
+        from .services.resume_customizer import ResumeCustomizer, StreamedAlignment
+        from .utils.pdf_processor import PDFProcessor
+
+        text_blocks = {
+            'p0_b0_l0_s0': {'text': 'Python developer', 'rect': fitz.Rect(50, 100, 170, 112),
+                            'font': 'Helvetica', 'size': 10},
+            'p0_b0_l1_s0': {'text': 'Maintained data pipelines and reporting for the finance team',
+                            'rect': fitz.Rect(50, 114, 450, 126), 'font': 'Helvetica', 'size': 10},
+        }
+        customizer = ResumeCustomizer.__new__(ResumeCustomizer)
+        customizer.pdf_processor = PDFProcessor()
+        customizer.measured_fonts = {}
+        original_texts = [block['text'] for block in text_blocks.values()]
+        alignment = StreamedAlignment(customizer, original_texts, text_blocks)
+
+        # Two lines for two spans, but the first is far wider than the narrow span it replaces
+        lines = ['Senior Python engineer. Owned Airflow data pipelines and reporting', 'for the finance organisation.']
+        for index, line in enumerate(lines):
+            alignment.on_line(index, line)
+        self.assertEqual(alignment.matched_keys, list(text_blocks))
+
+        chunks = alignment.chunks_for('\n'.join(lines))
+        self.assertEqual(chunks, customizer._create_matching_chunks(
+            original_texts, ' '.join(lines), list(text_blocks.values())
+        ))
+        self.assertEqual(chunks[0], 'Senior Python engineer.')
+        for chunk, block in zip(chunks, text_blocks.values()):
+            self.assertLessEqual(fitz.get_text_length(chunk, fontname='helv', fontsize=10), block['rect'].width * 1.05)
+
+        # Text changed after streaming (length adjustment, fallback) is aligned from scratch
+        self.assertIsNone(alignment.chunks_for('Python developer'))
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    """Polling with a JWT skips the user lookup until the user changes or logs out"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='secret')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def _user_queries(self, path='/api/customized-resumes/'):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        return response, [q for q in queries.captured_queries if 'FROM "auth_user"' in q['sql']]
+
+    def test_user_is_cached_between_polls(self):
+        response, first = self._user_queries()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(first), 1)
+        response, second = self._user_queries()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(second, [])
+
+    def test_deactivation_takes_effect_immediately(self):
+        self._user_queries()
+        self.user.is_active = False
+        self.user.save()
+        response, _ = self._user_queries()
+        self.assertEqual(response.status_code, 401)
+
+    def test_logout_drops_cached_user(self):
+        self._user_queries()
+        self.assertEqual(self.client.post('/api/logout').status_code, 200)
+        _, queries = self._user_queries()
+        self.assertEqual(len(queries), 1)
+
+    def test_bulk_deactivation_takes_effect_immediately(self):
+        self._user_queries()
+        self.assertEqual(update_users(User.objects.filter(username='alice'), is_active=False), 1)
+        response, _ = self._user_queries()
+        self.assertEqual(response.status_code, 401)
+
+    def test_group_change_drops_cached_users(self):
+        other = User.objects.create_user(username='bob', password='secret')
+        self._user_queries()
+        group = Group.objects.create(name='reviewers')
+        group.user_set.add(other)
+        # Any membership change drops every entry, not just the members'
+        _, queries = self._user_queries()
+        self.assertEqual(len(queries), 1)
+        _, queries = self._user_queries()
+        self.assertEqual(queries, [])
+
+
+class LazyImportTests(TestCase):
+    """Loading the URLconf must not import the PDF or AI libraries"""
+
+    def test_urlconf_import_skips_heavy_libraries(self):
+        code = (
+            "import sys, django; django.setup(); import api.urls; "
+            "print(' '.join(m for m in ('fitz', 'pdfminer', 'pikepdf', 'google.genai') if m in sys.modules))"
+        )
+        result = subprocess.run([sys.executable, '-c', code], cwd=settings.BASE_DIR,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), '')
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.records.append(record)
+        self.threads.add(threading.get_ident())
+
+
+class RequestLoggingTests(TestCase):
+    """Records carry the request's correlation id and are written off the logging thread"""
+
+    def test_request_id_is_echoed_or_generated(self):
+        client = APIClient()
+        response = client.get('/api/customized-resumes/', HTTP_X_REQUEST_ID='req-123')
+        self.assertEqual(response['X-Request-ID'], 'req-123')
+        response = client.get('/api/customized-resumes/', HTTP_X_REQUEST_ID='bad id!')
+        self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{32}$')
+
+    def test_queue_handler_tags_and_samples_span_events(self):
+        target = RecordingHandler()
+        handler = QueueListenerHandler([target])
+        handler.addFilter(RequestContextFilter())
+        handler.addFilter(SpanSamplingFilter(rate=0))
+        test_logger = logging.getLogger('resume_customizer.tests.queue')
+        test_logger.addHandler(handler)
+        test_logger.propagate = False
+        test_logger.setLevel(logging.DEBUG)
+
+        tokens = request_id.set('abc'), span_events_sampled.set(False)
+        try:
+            test_logger.info("Generated %d replacements", 3)
+            test_logger.debug("span", extra={'span_event': True})
+        finally:
+            request_id.reset(tokens[0])
+            span_events_sampled.reset(tokens[1])
+        test_logger.debug("span outside a request", extra={'span_event': True})
+        with mock.patch.object(target, 'flush') as target_flush:
+            handler.flush()
+        # A plain flush reaches the targets without ending background logging
+        target_flush.assert_called_once()
+        self.assertTrue(handler._listener._thread.is_alive())
+        test_logger.removeHandler(handler)
+        handler.close()
+        self.assertIsNone(handler._listener._thread)
+
+        self.assertEqual([(r.getMessage(), r.request_id) for r in target.records], [('Generated 3 replacements', 'abc')])
+        self.assertNotIn(threading.get_ident(), target.threads)
+
+    def test_span_events_are_sampled_at_the_default_level(self):
+        from .services.resume_customizer import ResumeCustomizer
+        from .utils.pdf_processor import PDFProcessor
+
+        customizer = ResumeCustomizer.__new__(ResumeCustomizer)
+        customizer.pdf_processor = PDFProcessor()
+        customizer.measured_fonts = {}
+        customizer.group_rewrites = []
+        target = RecordingHandler()
+        target.addFilter(SpanSamplingFilter(rate=0))
+        customizer_logger = logging.getLogger('resume_customizer')
+        customizer_logger.addHandler(target)
+        self.addCleanup(customizer_logger.removeHandler, target)
+        level = customizer_logger.level
+        # The default LOG_LEVEL
+        customizer_logger.setLevel(logging.INFO)
+        self.addCleanup(customizer_logger.setLevel, level)
+
+        text_blocks = {'p0_b0_l0_s0': {'text': 'Python developer'}}
+        for sampled in (True, False):
+            token = span_events_sampled.set(sampled)
+            try:
+                customizer._apply_group_rewrite('Experience', ['Python developer'], 'Python developer',
+                                                'Senior Python developer', text_blocks, {})
+            finally:
+                span_events_sampled.reset(token)
+
+        # Only the sampled request's span event gets through
+        self.assertEqual([r.getMessage() for r in target.records if getattr(r, 'span_event', False)],
+                         ["Created replacement in Experience: 'Python developer...' -> 'Senior Python developer...'"])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class CustomizationBatchTests(TestCase):
+    """A batch of customizations is written with one INSERT per model, all or nothing"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='secret')
+        self.pdf_path = os.path.join(MEDIA_ROOT, 'rendered.pdf')
+        with open(self.pdf_path, 'wb') as f:
+            f.write(make_resume_pdf())
+
+    def _batch(self, count):
+        batch = CustomizationBatch(self.user)
+        upload = ContentFile(make_resume_pdf(), name='resume.pdf')
+        first = batch.add(upload, 'Job 0', self.pdf_path, draft={'job_description_text': 'Job 0'})
+        for i in range(1, count):
+            batch.add(first.master_resume, f'Job {i}', self.pdf_path, draft={'job_description_text': f'Job {i}'})
+        return batch
+
+    def test_batch_inserts_once_per_model(self):
+        with CaptureQueriesContext(connection) as queries:
+            entries = self._batch(5).commit()
+
+        inserts = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 4)
+        self.assertEqual(CustomizedResume.objects.filter(user=self.user).count(), 5)
+        self.assertEqual(MasterResume.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(entries[3].draft.customized_resume, entries[3].customized_resume)
+        self.assertTrue(entries[3].customized_resume.content_hash)
+
+    def test_failed_commit_leaves_no_rows_or_files(self):
+        batch = self._batch(3)
+        with mock.patch.object(CustomizationDraft.objects, 'bulk_create', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                batch.commit()
+
+        self.assertFalse(MasterResume.objects.exists())
+        self.assertFalse(CustomizedResume.objects.exists())
+        for entry in batch.entries:
+            self.assertFalse(os.path.exists(entry.customized_resume.customized_resume_file.path))
+        self.assertFalse(os.path.exists(batch.entries[0].master_resume.resume_file.path))
 
-# Create your tests here.
@@ -1,13 +1,17 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from .views import MasterResumeViewSet, JobDescriptionViewSet, CustomizedResumeViewSet
+from .views import (
+    MasterResumeViewSet, JobDescriptionViewSet, CustomizedResumeViewSet, CustomizationDraftViewSet,
+    SchedulerMetricsView, CustomizationProfileView, customize_resume_async
+)
 from .auth_views import LoginView, LogoutView, RegisterView, UserView
 
 router = DefaultRouter()
 router.register(r'master-resumes', MasterResumeViewSet)
 router.register(r'job-descriptions', JobDescriptionViewSet)
 router.register(r'customized-resumes', CustomizedResumeViewSet)
+router.register(r'customization-drafts', CustomizationDraftViewSet)
 
 urlpatterns = [
     # Authentication endpoints
@@ -18,6 +22,13 @@ urlpatterns = [
     path('user/<int:pk>/', UserView.as_view(), name='user-detail'),
     # Direct route to the customize action
     path('customized-resumes/customize', CustomizedResumeViewSet.as_view({'post': 'customize'}), name='customize-resume'),
+    # Native async variant of customize, for ASGI deployments
+    path('customized-resumes/customize-async', customize_resume_async, name='customize-resume-async'),
+    # Scheduler queue depth and wait times, staff only
+    path('scheduler/metrics', SchedulerMetricsView.as_view(), name='scheduler-metrics'),
+    # Profiles of staff-requested profiled customizations, staff only
+    path('profiles/<int:pk>', CustomizationProfileView.as_view(), name='customization-profile'),
+    path('profiles/<int:pk>/folded', CustomizationProfileView.as_view(), {'folded': True}, name='customization-profile-folded'),
     
     # API endpoints
     path('', include(router.urls)),
@@ -4,21 +4,58 @@ from django.core.exceptions import ValidationError
 import json
 from google import genai
 
+from ..services.scheduler import ai_slot, aai_slot
+
 logger = logging.getLogger('resume_customizer')
 
+class StreamedLines:
+    """Collects streamed response text and reports every finished, non-blank line to a callback"""
+
+    def __init__(self, on_line):
+        self.on_line = on_line
+        self.lines = []
+        self._pending = ''
+
+    def feed(self, text):
+        *finished, self._pending = (self._pending + (text or '')).split('\n')
+        for line in finished:
+            self._emit(line)
+
+    def close(self):
+        """Flush the trailing partial line and return the whole text"""
+        self._emit(self._pending)
+        self._pending = ''
+        return '\n'.join(self.lines)
+
+    def _emit(self, line):
+        line = line.strip()
+        if line:
+            self.on_line(len(self.lines), line)
+            self.lines.append(line)
+
 class AIService:
     """Service class for AI-related functionality"""
     
     def __init__(self):
         try:
-            self.client = genai.Client(api_key=settings.GEMINI_AI_KEY)
+            http_options = {'base_url': settings.GEMINI_BASE_URL} if settings.GEMINI_BASE_URL else None
+            self.client = genai.Client(api_key=settings.GEMINI_AI_KEY, http_options=http_options)
+            self.model = settings.GEMINI_MODEL
+            # Section rewrites requested, and how many failed and kept the original text unchanged
+            self.rewrites = 0
+            self.fallbacks = 0
             # self.model = self.client.models.get("gemini-1.5-pro")
         except Exception as e:
             logger.error(f"Error initializing Gemini client: {str(e)}", exc_info=True)
             raise ValidationError(f"Error initializing AI service: {str(e)}")
     
-    def generate_customized_content(self, original_text, job_description, section_name=""):
-        """Generate customized content using Google Gemini AI with improved instructions"""
+    def generate_customized_content(self, original_text, job_description, section_name="", on_line=None):
+        """Generate customized content using Google Gemini AI with improved instructions
+
+        With on_line, the response is streamed and on_line(index, line) is called for each finished
+        line while the rest is still being generated.
+        """
+        self.rewrites += 1
         try:
             # Create a more specific prompt based on section
             prompt = self._create_section_specific_prompt(original_text, job_description, section_name)
@@ -40,18 +77,24 @@ class AIService:
             # }
             
             # Generate content
-            response = self.client.models.generate_content(
-                contents=prompt,
-                model='gemini-1.5-pro',    
-            )
+            with ai_slot():
+                if on_line is None:
+                    response = self.client.models.generate_content(
+                        contents=prompt,
+                        model=self.model,    
+                    )
+                    new_text = response.text.strip()
+                else:
+                    lines = StreamedLines(on_line)
+                    for chunk in self.client.models.generate_content_stream(contents=prompt, model=self.model):
+                        lines.feed(chunk.text)
+                    new_text = lines.close()
             
             # Process and return the text
-            new_text = response.text.strip()
             logger.debug(f"AI generated text length: {len(new_text)} characters")
             
             # Ensure we're not getting something drastically different in length
-            if len(new_text) < len(original_text) * 0.5 or len(new_text) > len(original_text) * 1.5:
-                logger.warning(f"AI generated text length ({len(new_text)}) differs substantially from original ({len(original_text)})")
+            if self._length_differs_substantially(new_text, original_text):
                 # Try to adjust the text length if needed
                 new_text = self._adjust_text_length(new_text, original_text)
             
@@ -60,8 +103,44 @@ class AIService:
         except Exception as e:
             logger.error(f"Error generating AI content: {str(e)}", exc_info=True)
             # Fallback to original text in case of errors
+            self.fallbacks += 1
             return original_text
     
+    async def agenerate_customized_content(self, original_text, job_description, section_name="", on_line=None):
+        """Async version of generate_customized_content using the client's aio interface"""
+        self.rewrites += 1
+        try:
+            prompt = self._create_section_specific_prompt(original_text, job_description, section_name)
+            async with aai_slot():
+                if on_line is None:
+                    response = await self.client.aio.models.generate_content(
+                        contents=prompt,
+                        model=self.model,
+                    )
+                    new_text = response.text.strip()
+                else:
+                    lines = StreamedLines(on_line)
+                    async for chunk in await self.client.aio.models.generate_content_stream(
+                        contents=prompt,
+                        model=self.model,
+                    ):
+                        lines.feed(chunk.text)
+                    new_text = lines.close()
+            logger.debug(f"AI generated text length: {len(new_text)} characters")
+            if self._length_differs_substantially(new_text, original_text):
+                new_text = await self._aadjust_text_length(new_text, original_text)
+            return new_text
+        except Exception as e:
+            logger.error(f"Error generating AI content: {str(e)}", exc_info=True)
+            self.fallbacks += 1
+            return original_text
+
+    def _length_differs_substantially(self, new_text, original_text):
+        if len(new_text) < len(original_text) * 0.5 or len(new_text) > len(original_text) * 1.5:
+            logger.warning(f"AI generated text length ({len(new_text)}) differs substantially from original ({len(original_text)})")
+            return True
+        return False
+    
     def _create_section_specific_prompt(self, original_text, job_description, section_name):
         """Create a section-specific prompt for better customization"""
         # Base instructions for all sections
@@ -118,54 +197,70 @@ class AIService:
     
     def _adjust_text_length(self, new_text, original_text):
         """Adjust the length of the generated text to match the original"""
+        adjustment = self._length_adjustment_prompt(new_text, original_text)
+        if adjustment is None:
+            return new_text
+        prompt, kind = adjustment
+        try:
+            with ai_slot():
+                response = self.client.models.generate_content(
+                    contents=prompt,
+                    model=self.model,
+                )
+            return self._accept_adjusted_text(response.text.strip(), new_text, kind)
+        except Exception as e:
+            logger.warning(f"Failed to {kind} text: {str(e)}")
+        
+        # Return the original generated text if adjustments failed
+        return new_text
+
+    async def _aadjust_text_length(self, new_text, original_text):
+        """Async counterpart of _adjust_text_length"""
+        adjustment = self._length_adjustment_prompt(new_text, original_text)
+        if adjustment is None:
+            return new_text
+        prompt, kind = adjustment
+        try:
+            async with aai_slot():
+                response = await self.client.aio.models.generate_content(
+                    contents=prompt,
+                    model=self.model,
+                )
+            return self._accept_adjusted_text(response.text.strip(), new_text, kind)
+        except Exception as e:
+            logger.warning(f"Failed to {kind} text: {str(e)}")
+        return new_text
+
+    def _length_adjustment_prompt(self, new_text, original_text):
+        """Return (prompt, 'expand'|'shorten') when the generated text needs a length fix, else None"""
         original_length = len(original_text)
         new_length = len(new_text)
         
         # If the text is too short, try to expand it
         if new_length < original_length * 0.8:
             logger.info(f"Generated text too short, attempting to expand")
-            try:
-                expansion_prompt = f"""
+            return f"""
                 The following text needs to be expanded to approximately {original_length} characters 
                 while maintaining the same meaning and professional tone. Please expand:
                 
                 {new_text}
-                """
-                
-                expansion_response =self.client.models.generate_content(
-                contents=expansion_prompt,
-                model='gemini-1.5-pro',
-            )
-                expanded_text = expansion_response.text.strip()
-                
-                # Check if expansion was successful
-                if len(expanded_text) > new_length:
-                    return expanded_text
-            except Exception as e:
-                logger.warning(f"Failed to expand text: {str(e)}")
+                """, 'expand'
         
         # If the text is too long, try to shorten it
-        elif new_length > original_length * 1.2:
+        if new_length > original_length * 1.2:
             logger.info(f"Generated text too long, attempting to shorten")
-            try:
-                shortening_prompt = f"""
+            return f"""
                 The following text needs to be shortened to approximately {original_length} characters
                 while maintaining the professional tone and all key information. Please condense:
                 
                 {new_text}
-                """
-                
-                shortening_response = response = self.client.models.generate_content(
-                contents=shortening_prompt,
-                model='gemini-1.5-pro',
-            )
-                shortened_text = shortening_response.text.strip()
-                
-                # Check if shortening was successful
-                if len(shortened_text) < new_length:
-                    return shortened_text
-            except Exception as e:
-                logger.warning(f"Failed to shorten text: {str(e)}")
-        
-        # Return the original generated text if adjustments failed
-        return new_text
\ No newline at end of file
+                """, 'shorten'
+        return None
+
+    def _accept_adjusted_text(self, adjusted_text, new_text, kind):
+        """Keep the adjusted text only if it actually moved in the requested direction"""
+        if kind == 'expand' and len(adjusted_text) > len(new_text):
+            return adjusted_text
+        if kind == 'shorten' and len(adjusted_text) < len(new_text):
+            return adjusted_text
+        return new_text
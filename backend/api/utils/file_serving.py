@@ -0,0 +1,128 @@
+import os
+import re
+from django.conf import settings
+from django.http import HttpResponse, FileResponse, StreamingHttpResponse
+from django.utils.http import quote_etag
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+UNSATISFIABLE = object()
+
+
+def serve_file(request, field_file, content_hash, filename=None, content_type='application/pdf',
+               cache_control='private, no-cache', disposition='attachment'):
+    """Serve a stored file with a strong ETag, conditional GET and byte-range support.
+
+    When settings.DOWNLOAD_SENDFILE_BACKEND is set, the transfer is handed to the front proxy
+    (X-Accel-Redirect for nginx, X-Sendfile for apache/lighttpd) and no bytes go through Python.
+    """
+    etag = quote_etag(content_hash)
+    filename = filename or os.path.basename(field_file.name)
+
+    if _etag_matches(request.headers.get('If-None-Match'), etag):
+        response = HttpResponse(status=304)
+        response['ETag'] = etag
+        response['Cache-Control'] = cache_control
+        return response
+
+    backend = getattr(settings, 'DOWNLOAD_SENDFILE_BACKEND', '')
+    if backend:
+        response = HttpResponse(content_type=content_type)
+        if backend == 'nginx':
+            prefix = settings.DOWNLOAD_SENDFILE_PREFIX.rstrip('/')
+            response['X-Accel-Redirect'] = f"{prefix}/{field_file.name.lstrip('/')}"
+        else:
+            response['X-Sendfile'] = field_file.path
+        # The proxy takes care of Range requests itself
+        _set_common_headers(response, etag, filename, cache_control, disposition)
+        return response
+
+    file_size = field_file.size
+    byte_range = _parse_range(request, etag, file_size)
+
+    if byte_range is UNSATISFIABLE:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{file_size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(field_file.open('rb'), content_type=content_type)
+        _set_common_headers(response, etag, filename, cache_control, disposition)
+        return response
+
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        _read_range(field_file, start, end - start + 1),
+        status=206,
+        content_type=content_type
+    )
+    response['Content-Range'] = f'bytes {start}-{end}/{file_size}'
+    response['Content-Length'] = str(end - start + 1)
+    _set_common_headers(response, etag, filename, cache_control, disposition)
+    return response
+
+
+def _set_common_headers(response, etag, filename, cache_control, disposition):
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = cache_control
+    response['Content-Disposition'] = f'{disposition}; filename="{filename}"'
+
+
+def _etag_matches(header, etag):
+    """Check an If-None-Match header against our strong ETag"""
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    candidates = [tag.strip() for tag in header.split(',')]
+    # Weak comparison is what If-None-Match calls for
+    return any(tag.removeprefix('W/') == etag for tag in candidates)
+
+
+def _parse_range(request, etag, file_size):
+    """Return (start, end) for a single satisfiable byte range, None to send the whole file"""
+    header = request.headers.get('Range')
+    if not header or file_size == 0:
+        return None
+
+    # If-Range with a stale validator means the client must get the full new file
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range.strip() != etag:
+        return None
+
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        # Multi-range and malformed requests fall back to a full response
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return UNSATISFIABLE
+        return max(0, file_size - length), file_size - 1
+
+    start = int(first)
+    if last and int(last) < start:
+        # An invalid range is ignored (RFC 9110 14.1.1), so the whole file is sent
+        return None
+    if start >= file_size:
+        return UNSATISFIABLE
+    end = int(last) if last else file_size - 1
+    return start, min(end, file_size - 1)
+
+
+def _read_range(field_file, start, length):
+    with field_file.open('rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,214 @@
+import re
+import time
+import string
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import fitz  # PyMuPDF
+from django.conf import settings
+
+logger = logging.getLogger('resume_customizer')
+
+# Font programs page.insert_font can embed again as a Type0 font
+EMBEDDABLE_FONT_TYPES = ('ttf', 'otf', 'cid', 'cff')
+
+# Subset fonts are named like ABCDEF+Calibri (PDF 32000 9.6.4)
+SUBSET_TAG = re.compile(r'^[A-Z]{6}\+')
+
+def normalize_font_name(name):
+    """Comparable font name: subset tag, case, spaces and punctuation removed"""
+    return re.sub(r'[^a-z0-9]', '', SUBSET_TAG.sub('', name or '').lower())
+
+class CachedFont:
+    """A loaded font with its character coverage and per-character advance widths.
+
+    Instances are shared between renders through the font cache, so widths measured once are
+    reused by every later replacement in the same font.
+    """
+
+    def __init__(self, base14_name=None, font=None):
+        self.base14_name = base14_name
+        self.font = font
+        # Base-14 fonts render every character (unknown ones as a bullet); embedded ones need a glyph
+        self.chars = None if font is None else frozenset(chr(cp) for cp in font.valid_codepoints())
+        self._advances = {}
+
+    def text_length(self, text, fontsize):
+        advances = self._advances
+        width = 0.0
+        for char in text:
+            advance = advances.get(char)
+            if advance is None:
+                advance = advances[char] = self._advance(char)
+            width += advance
+        return width * fontsize
+
+    def _advance(self, char):
+        if self.font is None:
+            # Same measurement (and fallback glyph) insert_text uses for base-14 fonts
+            return fitz.get_text_length(char, fontname=self.base14_name, fontsize=1)
+        return self.font.glyph_advance(ord(char))
+
+class MeasuredFont:
+    """Per-character advances of a reused embedded font, measured where the document is open.
+
+    Lets the request process size text for a span's rendered font without loading the PDF.
+    Text with a character outside widths would be drawn in the base-14 fallback instead, so it
+    is measured in that font.
+    """
+
+    def __init__(self, widths, fallback):
+        self.widths = widths
+        self.fallback = fallback
+
+    def text_length(self, text, fontsize):
+        widths = self.widths
+        if all(char in widths for char in text):
+            return sum(widths[char] for char in text) * fontsize
+        return self.fallback.text_length(text, fontsize)
+
+class FontCache:
+    """Bounded process-wide LRU of CachedFont objects.
+
+    Base-14 fonts are keyed by name, fonts extracted from uploaded PDFs by a digest of the font
+    program, so the same resume font is parsed once per process however many documents use it.
+    """
+
+    def __init__(self):
+        self._fonts = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.load_seconds = 0.0
+
+    def base14(self, name):
+        return self._get(('base14', name), lambda: CachedFont(base14_name=name))
+
+    def embedded(self, font_buffer):
+        key = ('embedded', hashlib.sha1(font_buffer).hexdigest())
+        return self._get(key, lambda: CachedFont(font=fitz.Font(fontbuffer=font_buffer)))
+
+    def mean_load_seconds(self):
+        with self._lock:
+            return self.load_seconds / self.misses if self.misses else 0.0
+
+    def _get(self, key, load):
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is not None:
+                self._fonts.move_to_end(key)
+                self.hits += 1
+                return font, True
+        start = time.perf_counter()
+        font = load()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._fonts[key] = font
+            self._fonts.move_to_end(key)
+            while len(self._fonts) > settings.FONT_CACHE_SIZE:
+                self._fonts.popitem(last=False)
+            self.misses += 1
+            self.load_seconds += elapsed
+        return font, False
+
+font_cache = FontCache()
+
+class DocumentFonts:
+    """Resolves the font of every replacement in one output document.
+
+    A span keeps its original embedded font when the PDF carries one under the same name and
+    it can draw every character of the new text; otherwise it falls back to a base-14 font.
+    Each font is extracted and registered once per document (per page for the resource
+    entry), never per inserted span.
+    """
+
+    def __init__(self, doc, source_texts=None):
+        self.doc = doc
+        # normalized font name -> characters the original spans drew with it; a subset font
+        # keeps glyph slots for characters it dropped, so only these are known to render
+        self.source_chars = {}
+        for font_name, text in source_texts or []:
+            self.source_chars.setdefault(normalize_font_name(font_name), set()).update(text)
+        self._embedded = None
+        self._base14 = {}
+        self._loaded = {}
+        self._registered = set()
+        self.hits = 0
+        self.loads = 0
+        self.load_seconds = 0.0
+
+    def font_for(self, page, span_font, text, fallback):
+        """(fontname for insert_text, CachedFont) to draw text that replaces a span in span_font"""
+        embedded = self._embedded_font(span_font)
+        if embedded is not None:
+            alias, cached, subset = embedded
+            if self._covers(cached, text, span_font if subset else None):
+                if (page.number, alias) not in self._registered:
+                    page.insert_font(fontname=alias, fontbuffer=self._loaded[alias][1])
+                    self._registered.add((page.number, alias))
+                return alias, cached
+        if fallback not in self._base14:
+            self._base14[fallback] = self._fetch(font_cache.base14, fallback)
+        return fallback, self._base14[fallback]
+
+    def glyph_widths(self, span_fonts):
+        """{span font: {char: advance at 1pt}} for span fonts that font_for would draw in their embedded font"""
+        widths = {}
+        for span_font in span_fonts:
+            embedded = self._embedded_font(span_font)
+            if embedded is None:
+                continue
+            _, cached, subset = embedded
+            if subset:
+                chars = self.source_chars.get(normalize_font_name(span_font), set())
+            else:
+                # A full font covers far more than a rewrite will use
+                chars = self.source_chars.get(normalize_font_name(span_font), set()) | set(string.printable)
+            widths[span_font] = {char: cached.text_length(char, 1) for char in chars & cached.chars}
+        return widths
+
+    def saved_seconds(self):
+        """Estimated load time the process-wide cache saved this document"""
+        return self.hits * font_cache.mean_load_seconds()
+
+    def _fetch(self, getter, arg):
+        start = time.perf_counter()
+        font, hit = getter(arg)
+        if hit:
+            self.hits += 1
+        else:
+            self.loads += 1
+            self.load_seconds += time.perf_counter() - start
+        return font
+
+    def _covers(self, cached, text, subset_font):
+        chars = set(text)
+        if not chars <= cached.chars:
+            return False
+        return subset_font is None or chars <= self.source_chars.get(normalize_font_name(subset_font), set())
+
+    def _embedded_font(self, span_font):
+        if self._embedded is None:
+            self._embedded = {}
+            for page in self.doc:
+                for xref, ext, _, basefont, _, _ in page.get_fonts():
+                    if ext in EMBEDDABLE_FONT_TYPES:
+                        self._embedded.setdefault(normalize_font_name(basefont), (xref, bool(SUBSET_TAG.match(basefont))))
+        match = self._embedded.get(normalize_font_name(span_font))
+        if match is None:
+            return None
+        xref, subset = match
+        alias = f'RF{xref}'
+        if alias not in self._loaded:
+            try:
+                font_buffer = self.doc.extract_font(xref)[3]
+                if not font_buffer:
+                    raise ValueError('font program is not extractable')
+                self._loaded[alias] = (self._fetch(font_cache.embedded, font_buffer), font_buffer)
+            except Exception as e:
+                logger.warning(f"Cannot reuse embedded font {span_font}: {str(e)}")
+                self._loaded[alias] = None
+        if self._loaded[alias] is None:
+            return None
+        return alias, self._loaded[alias][0], subset
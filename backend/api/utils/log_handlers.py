@@ -0,0 +1,139 @@
+import os
+import copy
+import json
+import queue
+import random
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+from .request_context import request_id, span_events_sampled
+
+
+class LogFileHandler(logging.FileHandler):
+    """FileHandler that creates its directory when the file is first written, not at settings import"""
+
+    def __init__(self, filename, mode='a', encoding=None, errors=None):
+        super().__init__(filename, mode, encoding, delay=True, errors=errors)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class QueueListenerHandler(QueueHandler):
+    """Hands records to a background thread that formats and writes them to the target handlers.
+
+    handlers are names of handlers from settings.LOGGING (or handler objects). Filters attached
+    to this handler run on the thread that logged the record, before it is queued, so they can
+    read context variables such as the request id. The targets' own filters and formatters run on
+    the listener thread. The queue is bounded: when the writer falls behind, records are dropped
+    and counted rather than blocking the request.
+    """
+
+    def __init__(self, handlers, queue_size=10000):
+        super().__init__(queue.Queue(queue_size))
+        self.targets = handlers
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._listener = None
+        self._listener_pid = None
+        self._handlers = []
+        self._lock = threading.Lock()
+
+    def _ensure_listener(self):
+        # Started lazily, and again in a forked worker, where the parent's thread does not exist
+        if self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            if self._listener_pid is not None:
+                self.queue = queue.Queue(self.queue_size)
+            handlers = [h if isinstance(h, logging.Handler) else _handler_by_name(h) for h in self.targets]
+            self._handlers = [h for h in handlers if h]
+            self._listener = QueueListener(self.queue, *self._handlers, respect_handler_level=True)
+            self._listener.start()
+            self._listener_pid = os.getpid()
+
+    def prepare(self, record):
+        # Merge the arguments now so later mutation cannot change the message, but leave the
+        # formatting (timestamps, JSON, exception text) to the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Flush the target handlers; the listener keeps running and writes what is still queued"""
+        for handler in self._handlers:
+            handler.flush()
+
+    def close(self):
+        """Write out everything queued and stop the listener; logging.shutdown() calls this at exit"""
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                self._listener.stop()
+                self._listener_pid = None
+        super().close()
+
+
+def _handler_by_name(name):
+    getter = getattr(logging, 'getHandlerByName', None)  # Python 3.12+
+    return getter(name) if getter else logging._handlers.get(name)
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the correlation id of the request that logged them"""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = request_id.get()
+        return True
+
+
+class SpanSamplingFilter(logging.Filter):
+    """Keep per-span events (logged with extra={'span_event': True}) for a sample of requests.
+
+    Within a request the decision is made once by the request context middleware, so a sampled
+    request keeps all of its span events; outside requests each record is sampled on its own.
+    """
+
+    def __init__(self, rate=0.01):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if not getattr(record, 'span_event', False):
+            return True
+        sampled = span_events_sampled.get()
+        if sampled is None:
+            sampled = random.random() < self.rate
+        return sampled
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: standard fields, the correlation id and any extra= fields"""
+
+    RESERVED = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'span_event'}
+
+    def format(self, record):
+        payload = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'process': record.process,
+            'message': record.getMessage(),
+        }
+        payload.update((key, value) for key, value in vars(record).items() if key not in self.RESERVED)
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
@@ -0,0 +1,166 @@
+import os
+import asyncio
+import logging
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from contextvars import ContextVar
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+
+logger = logging.getLogger('resume_customizer')
+
+_executor = None
+_executor_lock = threading.Lock()
+_worker_processor = None
+# Set while a profiled request runs, so its PDF work stays in the profiled process
+_force_inline = ContextVar('pdf_pool_force_inline', default=False)
+
+def _init_worker():
+    """Warm a pool worker: configure Django and load the PDF libraries once"""
+    global _worker_processor
+    import django
+    django.setup()
+    import fitz  # noqa: F401
+    import pdfminer.high_level  # noqa: F401
+    from .pdf_processor import PDFProcessor
+    _worker_processor = PDFProcessor()
+
+def _call_processor(method_name, *args):
+    return getattr(_worker_processor, method_name)(*args)
+
+def get_executor():
+    """Return the process-wide PDF pool, or None when PDF_POOL_WORKERS is 0 (run inline)"""
+    global _executor
+    workers = settings.PDF_POOL_WORKERS
+    if workers <= 0 or _force_inline.get():
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # spawn, not fork: forking a threaded server process can copy held locks
+                _executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker
+                )
+                logger.info(f"Started PDF process pool with {workers} workers")
+    return _executor
+
+@contextmanager
+def inline():
+    """Run PDF tasks started in this context in the calling thread instead of the pool"""
+    token = _force_inline.set(True)
+    try:
+        yield
+    finally:
+        _force_inline.reset(token)
+
+def warm_up():
+    """Start every pool worker now instead of on the first request"""
+    executor = get_executor()
+    if executor is not None:
+        for future in [executor.submit(os.getpid) for _ in range(settings.PDF_POOL_WORKERS)]:
+            future.result()
+
+def run_pdf_task(method_name, *args):
+    """Run a CPU-bound PDFProcessor method in the pool and block the calling thread on the result.
+
+    Only file paths and small layout structures cross the process boundary: PDFs are already
+    on local disk in MEDIA_ROOT, so workers open them directly instead of receiving pickled bytes.
+    """
+    executor = get_executor()
+    if executor is None:
+        from .pdf_processor import PDFProcessor
+        return getattr(PDFProcessor(), method_name)(*args)
+    return executor.submit(_call_processor, method_name, *args).result()
+
+def usable_cores():
+    """CPUs this process may run on, which can be fewer than the machine has"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def _shard_workers():
+    """Workers a long document may be spread over; fewer than 2 means extract it as one task"""
+    if settings.PDF_EXTRACT_PAGES_PER_SHARD <= 0 or get_executor() is None:
+        return 0
+    # Shards on a single usable core only run one after another, paying the split for nothing
+    return min(settings.PDF_POOL_WORKERS, usable_cores())
+
+def _shard_ranges(page_count, workers):
+    shard_count = min(workers, -(-page_count // settings.PDF_EXTRACT_PAGES_PER_SHARD))
+    if shard_count <= 1:
+        return None
+    bounds = [page_count * i // shard_count for i in range(shard_count + 1)]
+    return [range(start, stop) for start, stop in zip(bounds, bounds[1:])]
+
+def page_shards(pdf_path):
+    """Split a long PDF into contiguous page ranges, one per extraction task.
+
+    Returns None when extraction should run as one task: sharding is off (the default
+    PDF_EXTRACT_PAGES_PER_SHARD of 0), the pool is off or has only one usable core, or the
+    document has no more than PDF_EXTRACT_PAGES_PER_SHARD pages. The page count is read by a
+    pool worker, so the request thread never opens the PDF.
+    """
+    workers = _shard_workers()
+    if workers <= 1:
+        return None
+    return _shard_ranges(run_pdf_task('page_count', pdf_path), workers)
+
+def _merge_layouts(results):
+    # Shards are contiguous and in page order, so concatenating them gives the serial result
+    layout_info, text_blocks = [], {}
+    for shard_layout, shard_blocks in results:
+        layout_info.extend(shard_layout)
+        text_blocks.update(shard_blocks)
+    return layout_info, text_blocks
+
+def extract_text_with_layout(pdf_path):
+    """Extract layout and text blocks, sharding long documents across the pool by page range"""
+    shards = page_shards(pdf_path)
+    if shards is None:
+        return run_pdf_task('extract_text_with_layout', pdf_path)
+    executor = get_executor()
+    futures = [executor.submit(_call_processor, 'extract_text_with_layout', pdf_path, pages) for pages in shards]
+    return _merge_layouts([future.result() for future in futures])
+
+def replace_text_in_pdf(pdf_path, replacements, thumbnail_path=None):
+    return run_pdf_task('replace_text_in_pdf', pdf_path, replacements, thumbnail_path)
+
+def render_thumbnail(pdf_path, thumbnail_path):
+    return run_pdf_task('render_thumbnail', pdf_path, thumbnail_path)
+
+def extract_plain_text(pdf_path):
+    return run_pdf_task('extract_plain_text', pdf_path)
+
+def glyph_widths(pdf_path, span_texts):
+    return run_pdf_task('glyph_widths', pdf_path, span_texts)
+
+async def arun_pdf_task(method_name, *args):
+    """Async counterpart of run_pdf_task; awaits the pool future without tying up a thread"""
+    executor = get_executor()
+    if executor is None:
+        return await asyncio.to_thread(run_pdf_task, method_name, *args)
+    return await asyncio.wrap_future(executor.submit(_call_processor, method_name, *args))
+
+async def apage_shards(pdf_path):
+    workers = _shard_workers()
+    if workers <= 1:
+        return None
+    return _shard_ranges(await arun_pdf_task('page_count', pdf_path), workers)
+
+async def aextract_text_with_layout(pdf_path):
+    shards = await apage_shards(pdf_path)
+    if shards is None:
+        return await arun_pdf_task('extract_text_with_layout', pdf_path)
+    return _merge_layouts(await asyncio.gather(*[
+        arun_pdf_task('extract_text_with_layout', pdf_path, pages) for pages in shards
+    ]))
+
+async def aglyph_widths(pdf_path, span_texts):
+    return await arun_pdf_task('glyph_widths', pdf_path, span_texts)
+
+async def areplace_text_in_pdf(pdf_path, replacements, thumbnail_path=None):
+    return await arun_pdf_task('replace_text_in_pdf', pdf_path, replacements, thumbnail_path)
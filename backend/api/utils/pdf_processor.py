@@ -1,5 +1,4 @@
 import os
-import uuid
 import logging
 import fitz  # PyMuPDF
 from django.conf import settings
@@ -7,19 +6,26 @@ from django.core.exceptions import ValidationError
 from pdfminer.high_level import extract_pages
 from pdfminer.layout import LTTextBox, LTTextLine, LTChar
 
+from ..models import sharded_path
+from .font_cache import DocumentFonts, MeasuredFont, font_cache
+
 logger = logging.getLogger('resume_customizer')
 
 class PDFProcessor:
     """Utility class for PDF processing operations"""
     
-    def extract_text_with_layout(self, pdf_path):
-        """Extract text with layout and map to raw bytes"""
+    def extract_text_with_layout(self, pdf_path, page_numbers=None):
+        """Extract text with layout and map to raw bytes
+
+        page_numbers limits extraction to those (0-based) pages, so a long document can be
+        split across pool workers; see pdf_pool.extract_text_with_layout.
+        """
         layout_info = []
         text_blocks = {}  # Maps text blocks to their positions
         
         try:
             # Use pdfminer for detailed layout info
-            for page_layout in extract_pages(pdf_path):
+            for page_layout in extract_pages(pdf_path, page_numbers=page_numbers):
                 for element in page_layout:
                     if isinstance(element, LTTextBox):
                         for line in element:
@@ -34,7 +40,7 @@ class PDFProcessor:
                                     })
             
             # Use PyMuPDF for text block extraction (more reliable for replacement)
-            self._extract_text_blocks(pdf_path, text_blocks)
+            self._extract_text_blocks(pdf_path, text_blocks, page_numbers)
             
             logger.info(f"Extracted {len(layout_info)} text items with layout")
             logger.info(f"Extracted {len(text_blocks)} text blocks for replacement")
@@ -45,11 +51,12 @@ class PDFProcessor:
             logger.error(f"Error extracting text: {str(e)}", exc_info=True)
             raise ValidationError(f"Error extracting text from PDF: {str(e)}")
     
-    def _extract_text_blocks(self, pdf_path, text_blocks):
+    def _extract_text_blocks(self, pdf_path, text_blocks, page_numbers=None):
         """Extract text blocks with PyMuPDF for more reliable replacement"""
         try:
             doc = fitz.open(pdf_path)
-            for page_num, page in enumerate(doc):
+            for page_num in (range(doc.page_count) if page_numbers is None else page_numbers):
+                page = doc[page_num]
                 # Get text blocks with their details
                 blocks = page.get_text("dict")["blocks"]
                 for b in blocks:
@@ -104,13 +111,18 @@ class PDFProcessor:
         # Return only non-empty sections
         return {k: v for k, v in sections.items() if v}
     
-    def replace_text_in_pdf(self, original_pdf_path, replacements):
-        """Replace text in the PDF using improved text replacement strategy"""
+    def replace_text_in_pdf(self, original_pdf_path, replacements, thumbnail_path=None):
+        """Replace text in the PDF using improved text replacement strategy.
+
+        When thumbnail_path is given, a first-page PNG is rendered from the already open
+        document so thumbnails cost no extra parse.
+        """
         try:
+            # Rendered into temp/ and copied into storage by the caller, so a crash leaves
+            # nothing behind that the media garbage collector cannot find
             output_path = os.path.join(
                 settings.MEDIA_ROOT, 
-                'customized_resumes', 
-                f'customized_resume_{uuid.uuid4()}.pdf'
+                sharded_path('temp', 'customized_resume.pdf')
             )
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
             
@@ -143,6 +155,11 @@ class PDFProcessor:
                     'color': replacement_info['info'].get('color')
                 })
             
+            fonts = DocumentFonts(doc, [
+                (replacement['font'], replacement['original'])
+                for page_items in page_replacements.values() for replacement in page_items
+            ])
+            
             # Process each page with its replacements
             for page_num in sorted(page_replacements.keys()):
                 if page_num >= len(doc):
@@ -159,31 +176,29 @@ class PDFProcessor:
                     )
                 )
                 
-                for replacement in page_replacements[page_num]:
-                    original_text = replacement['original']
+                page_items = [
+                    replacement for replacement in page_replacements[page_num]
+                    if replacement['new_text'] and replacement['original'] and replacement.get('rect')
+                ]
+                if not page_items:
+                    continue
+                
+                # Remove the replaced spans' glyphs from the content stream in one pass, then draw
+                # the new text on the cleaned page
+                for replacement in page_items:
+                    page.add_redact_annot(self._redaction_rect(replacement['rect']), fill=False)
+                page.apply_redactions(images=fitz.PDF_REDACT_IMAGE_NONE, graphics=fitz.PDF_REDACT_LINE_ART_NONE)
+                
+                for replacement in page_items:
                     new_text = replacement['new_text']
-                    rect = replacement.get('rect')
-                    
-                    if not new_text or not original_text or not rect:
-                        continue
+                    rect = replacement['rect']
                     
-                    # Create a clean white rectangle slightly larger than the text area
-                    padding = 1  # Small padding to ensure complete coverage
-                    clean_rect = fitz.Rect(
-                        rect.x0 - padding,
-                        rect.y0 - padding,
-                        rect.x1 + padding,
-                        rect.y1 + padding
+                    # Reuse the span's embedded font when it covers the new text, else a base-14 one
+                    font_name, font = fonts.font_for(
+                        page, replacement.get('font'), new_text,
+                        fallback=self._get_best_font(doc, replacement.get('font', "helv"))
                     )
-                    page.draw_rect(clean_rect, color=(1, 1, 1), fill=(1, 1, 1))
-                    
-                    # Get the best font
-                    font_name = self._get_best_font(doc, replacement.get('font', "helv"))
-                    font_size = replacement.get('size', 11)
-                    
-                    # Normalize font size
-                    if font_size < 6 or font_size > 24:
-                        font_size = 11
+                    font_size = self._normalize_font_size(replacement.get('size', 11))
                     
                     # Get text color
                     color = self._normalize_color(replacement.get('color', 0))
@@ -198,6 +213,7 @@ class PDFProcessor:
                         rect, 
                         new_text, 
                         font_name, 
+                        font,
                         font_size, 
                         color, 
                         vertical_adjustment
@@ -205,17 +221,112 @@ class PDFProcessor:
                     
                     replaced_count += 1
             
-            # Save the modified document
-            doc.save(output_path)
+            if thumbnail_path and len(doc):
+                self._save_thumbnail(doc[0], thumbnail_path)
+            
+            # Save the modified document. Redaction rewrote the content streams, so drop the old ones
+            # (garbage) and merge duplicates such as a re-registered embedded font program
+            doc.save(output_path, garbage=4, deflate=True)
             doc.close()
             
             logger.info(f"Replaced {replaced_count} text instances in the PDF")
+            logger.info(
+                f"Fonts: {fonts.hits} from cache, {fonts.loads} loaded in {fonts.load_seconds * 1000:.1f} ms "
+                f"(~{fonts.saved_seconds() * 1000:.1f} ms saved by the font cache)"
+            )
             return output_path
             
         except Exception as e:
             logger.error(f"Error replacing text in PDF: {str(e)}", exc_info=True)
             raise ValidationError(f"Error customizing PDF: {str(e)}")
     
+    def replacements_to_json(self, replacements):
+        """Make a replacements map JSON-serializable (fitz.Rect becomes a list)"""
+        return {
+            key: {
+                'text': replacement['text'],
+                'info': {**replacement['info'], 'rect': list(replacement['info']['rect'])}
+            }
+            for key, replacement in replacements.items()
+        }
+
+    def replacements_from_json(self, data):
+        """Inverse of replacements_to_json"""
+        return {
+            key: {
+                'text': replacement['text'],
+                'info': {**replacement['info'], 'rect': fitz.Rect(replacement['info']['rect'])}
+            }
+            for key, replacement in data.items()
+        }
+
+    def render_thumbnail(self, pdf_path, thumbnail_path):
+        """Render the first page of a PDF to a PNG thumbnail"""
+        try:
+            doc = fitz.open(pdf_path)
+            try:
+                if not len(doc):
+                    raise ValidationError("PDF has no pages")
+                self._save_thumbnail(doc[0], thumbnail_path)
+            finally:
+                doc.close()
+            return thumbnail_path
+        except ValidationError:
+            raise
+        except Exception as e:
+            logger.error(f"Error rendering thumbnail: {str(e)}", exc_info=True)
+            raise ValidationError(f"Error rendering thumbnail: {str(e)}")
+
+    def glyph_widths(self, pdf_path, span_texts):
+        """Advance widths of the embedded fonts replace_text_in_pdf will reuse for these spans.
+
+        span_texts is a list of (span font, original text). Spans whose font is missing from the
+        result are drawn in a base-14 font. Returns {} if the fonts cannot be read.
+        """
+        try:
+            with fitz.open(pdf_path) as doc:
+                return DocumentFonts(doc, span_texts).glyph_widths({font for font, _ in span_texts if font})
+        except Exception as e:
+            logger.warning(f"Cannot measure embedded fonts: {str(e)}")
+            return {}
+
+    def measured_fonts(self, glyph_widths):
+        """{span font: MeasuredFont} for the result of glyph_widths, for span_width_budget"""
+        return {
+            span_font: MeasuredFont(widths, font_cache.base14(self._get_best_font(None, span_font))[0])
+            for span_font, widths in glyph_widths.items()
+        }
+
+    def page_count(self, pdf_path):
+        with fitz.open(pdf_path) as doc:
+            return doc.page_count
+
+    def extract_plain_text(self, pdf_path):
+        """Text of every page of a PDF, for the search index; '' if unreadable"""
+        try:
+            with fitz.open(pdf_path) as doc:
+                return '\n'.join(page.get_text() for page in doc).strip()
+        except Exception as e:
+            logger.warning(f"Cannot extract text for search: {str(e)}")
+            return ''
+
+    def _redaction_rect(self, rect):
+        """Thin band through the middle of a span's box.
+
+        Redaction removes every glyph whose box touches the area, and span boxes overlap the
+        lines above and below and touch the neighbouring span, so the full box would also take
+        out parts of adjacent text. Every glyph of the span itself crosses the middle band.
+        """
+        middle = (rect.y0 + rect.y1) / 2
+        band = rect.height * 0.1
+        inset = min(0.5, rect.width / 4)
+        return fitz.Rect(rect.x0 + inset, middle - band, rect.x1 - inset, middle + band)
+
+    def _save_thumbnail(self, page, thumbnail_path):
+        os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+        pixmap = page.get_pixmap(dpi=settings.THUMBNAIL_DPI)
+        pixmap.save(thumbnail_path)
+
     def _get_best_font(self, doc, preferred_font=None):
         """Get the best font to use for text replacement"""
         # Standard fonts that should always be available
@@ -236,6 +347,31 @@ class PDFProcessor:
         # Default to Helvetica which works well in most cases
         return "helv"
     
+    def _normalize_font_size(self, font_size):
+        """Clamp implausible span sizes to the 11pt default used for rendering"""
+        if not font_size or font_size < 6 or font_size > 24:
+            return 11
+        return font_size
+
+    def span_width_budget(self, block_info, original_text, measured_fonts=None):
+        """(font, width in ems) a replacement for this span gets before the renderer wraps or shrinks it.
+
+        The font is the span's MeasuredFont from measured_fonts when the renderer reuses its
+        embedded font, else the base-14 name it falls back to.
+        """
+        if block_info and block_info.get('rect') is not None:
+            size = self._normalize_font_size(block_info.get('size'))
+            font = (measured_fonts or {}).get(block_info.get('font')) or self._get_best_font(None, block_info.get('font'))
+            return font, block_info['rect'].width / size
+        # Unmatched line: budget the original text's width in the default font
+        return 'helv', self.em_width(original_text, 'helv')
+
+    def em_width(self, text, font):
+        """Width of text at a 1pt size in a MeasuredFont or one of the fonts returned by _get_best_font"""
+        if isinstance(font, MeasuredFont):
+            return font.text_length(text, 1)
+        return font_cache.base14(font)[0].text_length(text, 1)
+
     def _normalize_color(self, color):
         """Normalize color to RGB tuple"""
         if isinstance(color, int):
@@ -249,14 +385,14 @@ class PDFProcessor:
         else:
             return (0, 0, 0)  # Default to black
     
-    def _insert_text_with_wrapping(self, page, rect, text, font_name, font_size, color, vertical_adjustment):
-        """Insert text with proper wrapping if needed"""
+    def _insert_text_with_wrapping(self, page, rect, text, font_name, font, font_size, color, vertical_adjustment):
+        """Insert text with proper wrapping if needed; widths come from the cached font's metrics"""
         try:
             # Calculate available width
             available_width = rect.width
             
             # Check if text fits in the available width
-            text_width = fitz.get_text_length(text, fontname=font_name, fontsize=font_size)
+            text_width = font.text_length(text, font_size)
             
             if text_width <= available_width * 1.05:  # Allow 5% overflow
                 # Text fits, insert at original position with vertical adjustment
@@ -278,7 +414,7 @@ class PDFProcessor:
                     for word in words:
                         test_line = current_line + [word]
                         test_text = ' '.join(test_line)
-                        test_width = fitz.get_text_length(test_text, fontname=font_name, fontsize=font_size)
+                        test_width = font.text_length(test_text, font_size)
                         
                         if test_width <= available_width:
                             current_line = test_line
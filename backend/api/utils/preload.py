@@ -0,0 +1,19 @@
+import logging
+import time
+from django.conf import settings
+
+logger = logging.getLogger('resume_customizer')
+
+
+def preload_worker_modules():
+    """Import the heavy PDF and AI libraries now, when settings.PRELOAD_WORKER_MODULES is on.
+
+    Called from the WSGI/ASGI entry points only. The PDF process pool is not started here:
+    with gunicorn --preload this runs in the master before forking, and the pool must be
+    created in each worker, on first use.
+    """
+    if not settings.PRELOAD_WORKER_MODULES:
+        return
+    start = time.perf_counter()
+    from . import pdf_processor, ai_service  # noqa: F401
+    logger.info(f"Preloaded PDF and AI modules in {(time.perf_counter() - start) * 1000:.0f} ms")
@@ -0,0 +1,132 @@
+import os
+import sys
+import time
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from django.conf import settings
+
+from . import pdf_pool
+
+logger = logging.getLogger('resume_customizer')
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+# Whether the profilers started tracemalloc, rather than finding it running (-X tracemalloc, other tools)
+_tracing_started = False
+
+def _frame_label(code):
+    # function (package/module.py:first line), the usual folded-stack frame naming
+    filename = os.sep.join(code.co_filename.split(os.sep)[-2:])
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval from a background thread.
+
+    Samples are wall-clock: time the thread spends blocked (waiting on the AI provider, the
+    pipeline queue or the database) shows up under the frame that is waiting. Stacks are kept
+    in the folded format (root;...;leaf count) read by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self):
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def _run(self):
+        labels = {}
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+def _start_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        if _tracing_users == 0:
+            _tracing_started = not tracemalloc.is_tracing()
+            if _tracing_started:
+                tracemalloc.start()
+        _tracing_users += 1
+
+def _stop_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_started:
+            tracemalloc.stop()
+
+class RequestProfiler:
+    """Profiles one customization: a stack sampler on the calling thread plus tracemalloc.
+
+    Only created for staff requests that ask for it, so normal requests never pay for either.
+    While active, PDF work runs inline instead of in the process pool, so extraction and
+    rendering are sampled and traced in this process. tracemalloc is process-wide: peaks of
+    a stage include whatever other requests in the process allocated at the same time.
+    """
+
+    def __init__(self, interval=None):
+        self.interval = interval or settings.PROFILE_SAMPLE_INTERVAL
+        self.sampler = None
+        # stage -> peak bytes allocated above the stage's starting point
+        self.stage_memory = {}
+        self.peak_memory = 0
+        self._inline = None
+
+    def __enter__(self):
+        _start_tracing()
+        self._inline = pdf_pool.inline()
+        self._inline.__enter__()
+        self.sampler = StackSampler(threading.get_ident(), self.interval)
+        self.sampler.start()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.sampler.stop()
+        self.peak_memory = max(self.peak_memory, tracemalloc.get_traced_memory()[1])
+        self._inline.__exit__(*exc_info)
+        _stop_tracing()
+        logger.info(
+            f"Profiled customization: {self.sampler.samples} samples over "
+            f"{time.perf_counter() - self._started:.2f}s, peak {self.peak_memory / 1e6:.1f} MB traced"
+        )
+        return False
+
+    @contextmanager
+    def stage(self, name):
+        """Record the peak traced memory of the block under stage_memory[name]"""
+        self.peak_memory = max(self.peak_memory, tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        try:
+            yield
+        finally:
+            peak = tracemalloc.get_traced_memory()[1]
+            self.peak_memory = max(self.peak_memory, peak)
+            self.stage_memory[name] = max(self.stage_memory.get(name, 0), peak - start)
@@ -0,0 +1,6 @@
+import contextvars
+
+# Correlation id of the request being handled; '-' outside requests
+request_id = contextvars.ContextVar('request_id', default='-')
+# Whether this request keeps its per-span events; None outside requests (decided per record)
+span_events_sampled = contextvars.ContextVar('span_events_sampled', default=None)
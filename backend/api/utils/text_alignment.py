@@ -0,0 +1,110 @@
+import re
+
+WORD_RE = re.compile(r'\S+')
+SENTENCE_END = ('.', '!', '?')
+
+# replace_text_in_pdf draws text up to 5% wider than its rect before wrapping or shrinking it
+OVERFLOW_ALLOWANCE = 1.05
+# How far (as a fraction of a span's target width) a split may move to land on a sentence end
+BREAK_SLACK = 0.25
+
+
+def align_to_spans(text, spans, word_width):
+    """Split text into one chunk per span, sized by each span's rendered width budget.
+
+    spans is a list of (font, capacity) pairs and word_width(word, font) measures a word in the
+    same units as capacity. Word and sentence boundaries are found once; text is then assigned
+    left to right in a single pass, each split preferring a nearby sentence end.
+    """
+    aligner = SpanAligner(spans, word_width)
+    aligner.feed(text)
+    return aligner.chunks()
+
+
+class SpanAligner:
+    """align_to_spans for text that arrives in pieces, such as a streamed AI response.
+
+    Each piece fed in is split into words and measured in every span font straight away, so
+    only the final left-to-right split is left once the text is complete. Pieces must end on a
+    word boundary (whole lines, for instance).
+    """
+
+    def __init__(self, spans, word_width):
+        self.spans = spans
+        self.word_width = word_width
+        # Demand is measured in the main font to spread the text over the spans
+        self.main_font = max(spans, key=lambda span: span[1])[0] if spans else None
+        self.words = []
+        self.demand = 0.0
+        self._widths = {}
+
+    def feed(self, text):
+        for word in WORD_RE.findall(text):
+            index = len(self.words)
+            self.words.append(word)
+            for font, _ in self.spans:
+                self._width(index, font)
+            if index:
+                self.demand += self._width(-1, self.main_font)
+            self.demand += self._width(index, self.main_font)
+
+    def _width(self, index, font):
+        key = (index, font)
+        if key not in self._widths:
+            self._widths[key] = self.word_width(self.words[index] if index >= 0 else ' ', font)
+        return self._widths[key]
+
+    def chunks(self):
+        """One chunk per span for everything fed so far"""
+        spans, words, width = self.spans, self.words, self._width
+        if not spans:
+            return []
+        if not words:
+            return [''] * len(spans)
+
+        # Spread the text over the spans in proportion to their capacity
+        capacity_total = sum(capacity for _, capacity in spans)
+        scale = self.demand / capacity_total if capacity_total > 0 else 1.0
+
+        chunks = []
+        j = 0
+        for i, (font, capacity) in enumerate(spans):
+            remaining_spans = len(spans) - i
+            if remaining_spans == 1:
+                chunks.append(' '.join(words[j:]))
+                break
+
+            target = (capacity if capacity_total > 0 else 1.0) * scale
+            # Leave at least one word for every later span
+            last_allowed = len(words) - (remaining_spans - 1)
+            start = j
+            filled = 0.0
+            sentence_break = None
+
+            while j < last_allowed:
+                w = width(j, font) + (width(-1, font) if j > start else 0)
+                if j > start and filled + w > target:
+                    break
+                filled += w
+                j += 1
+                if words[j - 1].endswith(SENTENCE_END):
+                    sentence_break = (j, filled)
+
+            if j > start and not words[j - 1].endswith(SENTENCE_END):
+                if sentence_break and sentence_break[1] >= target * (1 - BREAK_SLACK):
+                    j = sentence_break[0]
+                else:
+                    # Pull in a sentence end just ahead, as long as the span still fits
+                    ceiling = min(max(capacity * OVERFLOW_ALLOWANCE, target), target * (1 + BREAK_SLACK))
+                    ahead = filled
+                    for k in range(j, last_allowed):
+                        ahead += width(k, font) + width(-1, font)
+                        if ahead > ceiling:
+                            break
+                        if words[k].endswith(SENTENCE_END):
+                            j = k + 1
+                            break
+
+            chunks.append(' '.join(words[start:j]))
+
+        return chunks
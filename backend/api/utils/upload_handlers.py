@@ -0,0 +1,92 @@
+import hashlib
+import logging
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+logger = logging.getLogger('resume_customizer')
+
+# Readers accept the %PDF- marker anywhere in the first KB of the file
+PDF_HEADER = b'%PDF-'
+HEADER_WINDOW = 1024
+
+class PDFUploadMixin:
+    """Validates and hashes the resume upload while its chunks arrive.
+
+    The %PDF- header and the size limit are checked as data streams in, so a non-PDF or an
+    oversized scan is rejected before the rest of the body is read or stored. The SHA-256 is
+    computed in the same pass and left on the uploaded file as `sha256`. Once the file is
+    complete its page count is checked before any view or worker sees it.
+    """
+
+    resume_field = 'master_resume'
+
+    def new_file(self, field_name, *args, **kwargs):
+        self.checking = field_name == self.resume_field and self._stores_upload()
+        self.hasher = hashlib.sha256()
+        self.received = 0
+        self.head = b''
+        # The memory handler raises StopFutureHandlers here when it takes the file
+        super().new_file(field_name, *args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.checking:
+            self.received += len(raw_data)
+            if self.received > settings.RESUME_UPLOAD_MAX_BYTES:
+                self._reject(f"Resume file exceeds {settings.RESUME_UPLOAD_MAX_BYTES // (1024 * 1024)} MB")
+            if self.head is not None:
+                self.head += raw_data[:HEADER_WINDOW]
+                if len(self.head) >= HEADER_WINDOW:
+                    self._check_header()
+            self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded_file = super().file_complete(file_size)
+        if self.checking and uploaded_file is not None:
+            if self.head is not None:
+                self._check_header()
+            self._check_page_count(uploaded_file)
+            uploaded_file.sha256 = self.hasher.hexdigest()
+        return uploaded_file
+
+    def _stores_upload(self):
+        return True
+
+    def _check_header(self):
+        if PDF_HEADER not in self.head[:HEADER_WINDOW]:
+            self._reject("Resume file is not a PDF")
+        self.head = None
+
+    def _check_page_count(self, uploaded_file):
+        import fitz
+
+        try:
+            if hasattr(uploaded_file, 'temporary_file_path'):
+                doc = fitz.open(uploaded_file.temporary_file_path(), filetype='pdf')
+            else:
+                doc = fitz.open(stream=uploaded_file.file.getvalue(), filetype='pdf')
+        except Exception as e:
+            logger.warning(f"Unreadable PDF upload {uploaded_file.name}: {str(e)}")
+            raise ValidationError("Resume file is not a readable PDF")
+        try:
+            page_count = doc.page_count
+        finally:
+            doc.close()
+        uploaded_file.seek(0)
+        if page_count > settings.RESUME_UPLOAD_MAX_PAGES:
+            self._reject(f"Resume has {page_count} pages; at most {settings.RESUME_UPLOAD_MAX_PAGES} are supported")
+
+    def _reject(self, message):
+        logger.warning(f"Rejected resume upload {self.file_name}: {message}")
+        raise ValidationError(message)
+
+class MemoryPDFUploadHandler(PDFUploadMixin, MemoryFileUploadHandler):
+    """Small uploads, kept in memory"""
+
+    def _stores_upload(self):
+        # When the request is too large for memory the chunks are passed on to the next handler
+        return self.activated
+
+class TemporaryPDFUploadHandler(PDFUploadMixin, TemporaryFileUploadHandler):
+    """Uploads too large for memory, streamed to a temporary file"""
@@ -0,0 +1,53 @@
+import io
+import logging
+import zipfile
+
+logger = logging.getLogger('resume_customizer')
+
+CHUNK_SIZE = 64 * 1024
+
+class _StreamBuffer(io.RawIOBase):
+    """Write-only, non-seekable sink; zipfile writes into it and the generator drains it"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def stream_zip(entries):
+    """Yield a ZIP archive of (arcname, file) entries chunk by chunk.
+
+    The sink is not seekable, so zipfile writes data descriptors after each member instead of
+    seeking back to patch headers. At most one file chunk plus the central directory records
+    are held in memory, whatever the number of entries.
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        for arcname, field_file in entries:
+            try:
+                with field_file.open('rb') as source, archive.open(arcname, mode='w', force_zip64=True) as member:
+                    while True:
+                        chunk = source.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        member.write(chunk)
+                        data = buffer.drain()
+                        if data:
+                            yield data
+            except FileNotFoundError:
+                logger.warning(f"Skipping missing file in export: {field_file.name}")
+            data = buffer.drain()
+            if data:
+                yield data
+    # Closing the archive writes the central directory
+    yield buffer.drain()
@@ -1,29 +1,42 @@
 import os
-import uuid
 import logging
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_datetime, parse_date
+from django.utils.text import slugify
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.core.files.base import ContentFile
-from django.core.files.storage import default_storage
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from django.core.exceptions import ValidationError
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.views import APIView
 from rest_framework import generics
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
-from pdfminer.high_level import extract_pages
-from pdfminer.layout import LTTextBox, LTTextLine, LTChar
-import pikepdf
 
-from .models import MasterResume, JobDescription, CustomizedResume
-from .serializers import MasterResumeSerializer, JobDescriptionSerializer, CustomizedResumeSerializer, UserSerializer, RegisterSerializer
+from .models import MasterResume, JobDescription, CustomizedResume, CustomizationDraft, CustomizationProfile, sharded_path
+from .serializers import (
+    MasterResumeSerializer, JobDescriptionSerializer, JobDescriptionListSerializer, JobDescriptionSearchSerializer,
+    CustomizedResumeSerializer, CustomizedResumeListSerializer, CustomizedResumeSearchSerializer,
+    CustomizationDraftSerializer, UserSerializer, RegisterSerializer
+)
+from .pagination import CreatedAtCursorPagination, SearchPagination
+from .authentication import CachedJWTAuthentication
+from .utils.file_serving import serve_file
+from .utils.zip_stream import stream_zip
+from .utils import pdf_pool
+from .utils.profiling import RequestProfiler
 from .services.resume_customizer import ResumeCustomizer 
-from google import genai
+from .services.search import search
+from .services.scheduler import INTERACTIVE, BULK, get_scheduler
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger('resume_customizer')
 
 # Authentication Views (unchanged)
@@ -65,11 +78,12 @@ class UserView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
 
-# Model ViewSets (unchanged)
+# Model ViewSets
 class MasterResumeViewSet(viewsets.ModelViewSet):
     queryset = MasterResume.objects.all()
     serializer_class = MasterResumeSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
     
     def get_queryset(self):
         return MasterResume.objects.filter(user=self.request.user)
@@ -78,38 +92,362 @@ class JobDescriptionViewSet(viewsets.ModelViewSet):
     queryset = JobDescription.objects.all()
     serializer_class = JobDescriptionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
     
     def get_queryset(self):
-        return JobDescription.objects.filter(user=self.request.user)
+        # The search vector is only read by the database
+        return JobDescription.objects.filter(user=self.request.user).defer('search_vector')
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return JobDescriptionListSerializer
+        if self.action == 'search':
+            return JobDescriptionSearchSerializer
+        return super().get_serializer_class()
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Ranked full-text search over the user's job titles and descriptions (?q=...)."""
+        return _search_response(self, ['job_title', 'description_text'])
+
+    @action(detail=True, methods=['post'])
+    def recustomize(self, request, pk=None):
+        """Re-customize the resume for an edited job description, reusing unaffected rewrites."""
+        job_description = self.get_object()
+        try:
+            customizer = ResumeCustomizer(request.user, priority=_request_priority(request.data))
+            dry_run = _is_truthy(request.data.get('dry_run'))
+            result = customizer.recustomize(job_description, dry_run=dry_run)
+            stats = {
+                'groups_reused': customizer.reuse_stats['reused'],
+                'groups_regenerated': customizer.reuse_stats['regenerated'],
+                'groups_skipped': customizer.reuse_stats['skipped'],
+            }
+            if dry_run:
+                commit_url = reverse('customizationdraft-commit', args=[result.id], request=request)
+                return Response({**_draft_payload(result, commit_url), **stats}, status=status.HTTP_201_CREATED)
+            return Response({
+                'id': result.id,
+                'customized_resume_file': result.customized_resume_file.url,
+                'download_url': reverse('customizedresume-download', args=[result.id], request=request),
+                **stats,
+                'message': 'Resume re-customized successfully'
+            }, status=status.HTTP_201_CREATED)
+        except ValidationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Unexpected error: {str(e)}", exc_info=True)
+            return Response({'error': 'An unexpected error occurred'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 class CustomizedResumeViewSet(viewsets.ModelViewSet):
     queryset = CustomizedResume.objects.all()
     serializer_class = CustomizedResumeSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
     
     def get_queryset(self):
-        return CustomizedResume.objects.filter(user=self.request.user)
+        # Extracted text and its search vector are only read by the database
+        return CustomizedResume.objects.filter(user=self.request.user).select_related('job_description').defer(
+            'resume_text', 'search_vector', 'job_description__search_vector'
+        )
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return CustomizedResumeListSerializer
+        if self.action == 'search':
+            return CustomizedResumeSearchSerializer
+        return super().get_serializer_class()
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Ranked full-text search over the text of the user's generated resumes (?q=...)."""
+        return _search_response(self, ['resume_text'])
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Download the customized PDF with ETag and Range support."""
+        # get_object() goes through get_queryset(), so other users' resumes 404
+        customized_resume = self.get_object()
+        if not customized_resume.customized_resume_file:
+            return Response({'error': 'No file available'}, status=status.HTTP_404_NOT_FOUND)
+
+        return serve_file(request, customized_resume.customized_resume_file, customized_resume.ensure_content_hash())
+
+    @action(detail=True, methods=['get'])
+    def thumbnail(self, request, pk=None):
+        """First-page PNG preview; rendered and stored on first request for older rows."""
+        customized_resume = self.get_object()
+        if not customized_resume.customized_resume_file:
+            return Response({'error': 'No file available'}, status=status.HTTP_404_NOT_FOUND)
+
+        # The preview only changes if the PDF or the DPI does, so it can be cached for a long time
+        etag_value = f'{customized_resume.ensure_content_hash()[:32]}-{settings.THUMBNAIL_DPI}'
+
+        if not customized_resume.thumbnail:
+            thumbnail_path = os.path.join(settings.MEDIA_ROOT, sharded_path('temp', 'thumbnail.png'))
+            try:
+                pdf_pool.render_thumbnail(customized_resume.customized_resume_file.path, thumbnail_path)
+                with open(thumbnail_path, 'rb') as f:
+                    customized_resume.thumbnail.save('thumbnail.png', ContentFile(f.read()))
+            except ValidationError as e:
+                return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+            finally:
+                if os.path.exists(thumbnail_path):
+                    os.remove(thumbnail_path)
+
+        return serve_file(
+            request,
+            customized_resume.thumbnail,
+            etag_value,
+            content_type='image/png',
+            cache_control='private, max-age=31536000, immutable',
+            disposition='inline'
+        )
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream a ZIP of customized resumes selected by ?ids=1,2,3 and/or ?created_after=/?created_before=."""
+        queryset = self.get_queryset().exclude(customized_resume_file='')
+
+        ids = request.query_params.get('ids')
+        if ids:
+            try:
+                queryset = queryset.filter(id__in=[int(i) for i in ids.split(',') if i.strip()])
+            except ValueError:
+                return Response({'error': 'ids must be a comma-separated list of integers'},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        for param, lookup in [('created_after', 'created_at__gte'), ('created_before', 'created_at__lt')]:
+            value = request.query_params.get(param)
+            if value:
+                parsed = parse_datetime(value) or parse_date(value)
+                if parsed is None:
+                    return Response({'error': f'{param} must be an ISO date or datetime'},
+                                    status=status.HTTP_400_BAD_REQUEST)
+                queryset = queryset.filter(**{lookup: parsed})
+
+        if not ids and not any(request.query_params.get(p) for p in ['created_after', 'created_before']):
+            return Response({'error': 'Provide ids or a created_after/created_before filter'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        rows = queryset.order_by('-created_at', '-id')[:settings.EXPORT_MAX_FILES]
+        response = StreamingHttpResponse(
+            stream_zip(self._export_entries(rows)),
+            content_type='application/zip'
+        )
+        response['Content-Disposition'] = 'attachment; filename="customized_resumes.zip"'
+        return response
+
+    def _export_entries(self, rows):
+        # Rows are fetched lazily in chunks while the archive streams
+        for customized_resume in rows.only('id', 'customized_resume_file', 'job_description__job_title').iterator(chunk_size=100):
+            job_title = customized_resume.job_description.job_title if customized_resume.job_description else ''
+            arcname = f"{customized_resume.id}_{slugify(job_title) or 'resume'}.pdf"
+            yield arcname, customized_resume.customized_resume_file
 
     @action(detail=False, methods=['post'])
     def customize(self, request):
         """Customize a resume based on a job description while preserving layout."""
         try:
             # Create service instance
-            customizer = ResumeCustomizer(request.user)
+            customizer = ResumeCustomizer(request.user, priority=_request_priority(request.data))
+            customizer.profiler = _request_profiler(request.user, request.headers, request.data)
+
+            if _is_truthy(request.data.get('dry_run')):
+                draft = customizer.draft_resume(
+                    master_resume_file=request.FILES.get('master_resume'),
+                    job_description=request.data.get('job_description')
+                )
+                commit_url = reverse('customizationdraft-commit', args=[draft.id], request=request)
+                return Response(_draft_payload(draft, commit_url), status=status.HTTP_201_CREATED)
             
             # Execute customization
             result = customizer.customize_resume(
                 master_resume_file=request.FILES.get('master_resume'),
-                job_description=request.data.get('job_description')
+                job_description=request.data.get('job_description'),
+                idempotency_key=request.headers.get('Idempotency-Key')
             )
             
-            return Response({
+            payload = {
+                'id': result.id,
                 'customized_resume_file': result.customized_resume_file.url,
+                'download_url': reverse('customizedresume-download', args=[result.id], request=request),
                 'message': 'Resume customized successfully'
-            }, status=status.HTTP_201_CREATED)
+            }
+            if customizer.profiler is not None and not customizer.replayed:
+                payload['profile_url'] = reverse('customization-profile', args=[result.id], request=request)
+            response = Response(payload, status=status.HTTP_200_OK if customizer.replayed else status.HTTP_201_CREATED)
+            if customizer.replayed:
+                response['Idempotent-Replayed'] = 'true'
+            elif customizer.stage_timings:
+                response['Server-Timing'] = customizer.server_timing()
+            return response
             
         except ValidationError as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"Unexpected error: {str(e)}", exc_info=True)
-            return Response({'error': 'An unexpected error occurred'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response({'error': 'An unexpected error occurred'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class CustomizationDraftViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = CustomizationDraft.objects.all()
+    serializer_class = CustomizationDraftSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
+
+    def get_queryset(self):
+        return CustomizationDraft.objects.filter(user=self.request.user).select_related(
+            'master_resume', 'job_description', 'customized_resume'
+        )
+
+    @action(detail=True, methods=['post'])
+    def commit(self, request, pk=None):
+        """Render a dry run's stored rewrites into a PDF without calling the AI again."""
+        draft = self.get_object()
+        try:
+            customizer = ResumeCustomizer(request.user, priority=_request_priority(request.data))
+            result = customizer.commit_draft(draft)
+            return Response({
+                'id': result.id,
+                'customized_resume_file': result.customized_resume_file.url,
+                'download_url': reverse('customizedresume-download', args=[result.id], request=request),
+                'message': 'Resume customized successfully'
+            }, status=status.HTTP_200_OK if customizer.replayed else status.HTTP_201_CREATED)
+        except ValidationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Unexpected error: {str(e)}", exc_info=True)
+            return Response({'error': 'An unexpected error occurred'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class SchedulerMetricsView(APIView):
+    """Queue depth and admission wait times of the customization schedulers (staff only)."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({name: get_scheduler(name).metrics() for name in ('pipeline', 'ai')})
+
+
+class CustomizationProfileView(APIView):
+    """Stage timings, peak memory and sampled stacks of a profiled customization (staff only).
+
+    The folded variant returns the stacks as text for flamegraph.pl or speedscope.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, pk, folded=False):
+        profile = CustomizationProfile.objects.filter(customized_resume_id=pk).first()
+        if profile is None:
+            return Response({'error': 'No profile recorded for this customized resume'},
+                            status=status.HTTP_404_NOT_FOUND)
+        if folded:
+            response = HttpResponse(profile.folded_stacks, content_type='text/plain; charset=utf-8')
+            response['Content-Disposition'] = f'attachment; filename="customization_{pk}.folded"'
+            return response
+        return Response({
+            'customized_resume': pk,
+            'sample_interval': profile.sample_interval,
+            'sample_count': profile.sample_count,
+            'stage_timings': profile.stage_timings,
+            'stage_memory': profile.stage_memory,
+            'peak_memory': profile.peak_memory,
+            'folded_url': reverse('customization-profile-folded', args=[pk], request=request),
+            'created_at': profile.created_at,
+        })
+
+
+def _search_response(viewset, fallback_fields):
+    """One page of the viewset's rows matching ?q=, best match first"""
+    request = viewset.request
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'error': 'Provide a search query in q'}, status=status.HTTP_400_BAD_REQUEST)
+    paginator = SearchPagination()
+    page = paginator.paginate_queryset(search(viewset.get_queryset(), query, fallback_fields), request, view=viewset)
+    return paginator.get_paginated_response(viewset.get_serializer(page, many=True).data)
+
+def _request_priority(data):
+    """Clients may mark fan-out/batch work as bulk; everything else is interactive"""
+    return BULK if data.get('priority') == BULK else INTERACTIVE
+
+def _is_truthy(value):
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+def _request_profiler(user, headers, data):
+    """A RequestProfiler when a staff user asks for one (X-Profile header or profile field), else None"""
+    if not user.is_staff:
+        return None
+    if _is_truthy(headers.get('X-Profile')) or _is_truthy(data.get('profile')):
+        return RequestProfiler()
+    return None
+
+def _draft_payload(draft, commit_url):
+    return {
+        'draft_id': draft.id,
+        'groups': draft.group_rewrites,
+        'commit_url': commit_url,
+        'message': 'Dry run complete; commit the draft to render the PDF'
+    }
+
+def _authenticate_jwt(request):
+    """Resolve the JWT user for a plain Django view, or None"""
+    result = CachedJWTAuthentication().authenticate(request)
+    return result[0] if result else None
+
+@csrf_exempt
+@require_POST
+async def customize_resume_async(request):
+    """Async customize endpoint for ASGI deployments.
+
+    Same contract as CustomizedResumeViewSet.customize, but the worker is free while the AI
+    provider is generating, so one process can keep many customizations in flight.
+    """
+    try:
+        user = await sync_to_async(_authenticate_jwt)(request)
+    except AuthenticationFailed as e:
+        return JsonResponse({'error': str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+    if user is None or not user.is_active:
+        return JsonResponse({'error': 'Authentication credentials were not provided.'},
+                            status=status.HTTP_401_UNAUTHORIZED)
+
+    try:
+        customizer = await sync_to_async(ResumeCustomizer)(user, priority=_request_priority(request.POST))
+        customizer.profiler = _request_profiler(user, request.headers, request.POST)
+
+        if _is_truthy(request.POST.get('dry_run')):
+            draft = await customizer.adraft_resume(
+                master_resume_file=request.FILES.get('master_resume'),
+                job_description=request.POST.get('job_description')
+            )
+            commit_url = request.build_absolute_uri(reverse('customizationdraft-commit', args=[draft.id]))
+            return JsonResponse(_draft_payload(draft, commit_url), status=status.HTTP_201_CREATED)
+
+        result = await customizer.acustomize_resume(
+            master_resume_file=request.FILES.get('master_resume'),
+            job_description=request.POST.get('job_description'),
+            idempotency_key=request.headers.get('Idempotency-Key')
+        )
+
+        payload = {
+            'id': result.id,
+            'customized_resume_file': result.customized_resume_file.url,
+            'download_url': request.build_absolute_uri(
+                reverse('customizedresume-download', args=[result.id])
+            ),
+            'message': 'Resume customized successfully'
+        }
+        if customizer.profiler is not None and not customizer.replayed:
+            payload['profile_url'] = request.build_absolute_uri(reverse('customization-profile', args=[result.id]))
+        response = JsonResponse(payload, status=status.HTTP_200_OK if customizer.replayed else status.HTTP_201_CREATED)
+        if customizer.replayed:
+            response['Idempotent-Replayed'] = 'true'
+        elif customizer.stage_timings:
+            response['Server-Timing'] = customizer.server_timing()
+        return response
+
+    except ValidationError as e:
+        return JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}", exc_info=True)
+        return JsonResponse({'error': 'An unexpected error occurred'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -15,18 +15,20 @@ import os
 import logging
 from datetime import timedelta
 from dotenv import load_dotenv
+from corsheaders.defaults import default_headers
 
 load_dotenv()
 
 # Fetch the Gemini AI key from environment variables
 GEMINI_AI_KEY = os.getenv('GEMINI_AI_KEY')
 MISTRAL_API_KEY = os.getenv('MISTRAL_API_KEY')
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-1.5-pro')
+# Alternative Gemini API endpoint, e.g. the fake server of benchmarks/loadtest.py; empty uses Google's
+GEMINI_BASE_URL = os.getenv('GEMINI_BASE_URL', '')
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-print(BASE_DIR)
-
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
 
@@ -56,6 +58,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.request_context_middleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -67,11 +70,13 @@ MIDDLEWARE = [
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
 ]
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key', 'x-profile')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed', 'X-Request-ID', 'Server-Timing']
 
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -105,6 +110,9 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
 }
 
+# Seconds a JWT-authenticated user stays cached per token subject; 0 looks the user up every request
+JWT_USER_CACHE_TTL = int(os.getenv('JWT_USER_CACHE_TTL', 60))
+
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
@@ -116,6 +124,10 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD', 'postgres'),
         'HOST': os.getenv('DB_HOST', '172.18.0.3'),
         'PORT': os.getenv('DB_PORT', 5432),
+        # Keep connections open between requests instead of reconnecting each time.
+        # Under ASGI, set DB_CONN_MAX_AGE=0 (Django's advice for async) and pool in front of Postgres.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -160,6 +172,67 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Hand PDF downloads to the front proxy instead of streaming them from Python.
+# 'nginx' emits X-Accel-Redirect to DOWNLOAD_SENDFILE_PREFIX (an `internal` location aliased to MEDIA_ROOT),
+# 'apache' emits X-Sendfile with the absolute path. Empty serves the file from Django (development).
+DOWNLOAD_SENDFILE_BACKEND = os.getenv('DOWNLOAD_SENDFILE_BACKEND', '')
+DOWNLOAD_SENDFILE_PREFIX = os.getenv('DOWNLOAD_SENDFILE_PREFIX', '/protected-media/')
+
+# Resolution of first-page resume thumbnails; 40 DPI is roughly a 330x440 PNG for a Letter page
+THUMBNAIL_DPI = int(os.getenv('THUMBNAIL_DPI', 40))
+
+# Maximum number of PDFs in one streamed ZIP export
+EXPORT_MAX_FILES = 500
+
+# Resume uploads are checked while they stream in (api.utils.upload_handlers): PDF header,
+# size and, once complete, page count. The handlers also hash the file for request deduplication.
+RESUME_UPLOAD_MAX_BYTES = int(os.getenv('RESUME_UPLOAD_MAX_BYTES', 10 * 1024 * 1024))
+RESUME_UPLOAD_MAX_PAGES = int(os.getenv('RESUME_UPLOAD_MAX_PAGES', 10))
+FILE_UPLOAD_HANDLERS = [
+    'api.utils.upload_handlers.MemoryPDFUploadHandler',
+    'api.utils.upload_handlers.TemporaryPDFUploadHandler',
+]
+
+# Worker processes for CPU-bound PDF parsing and rendering, so request threads only wait on I/O and AI
+# calls; 0 runs them inline on the request thread. Defaults to one worker per usable core, except on a
+# single core, where the workers compete with the request threads for it (4 workers measured slower than inline)
+_USABLE_CORES = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+PDF_POOL_WORKERS = int(os.getenv('PDF_POOL_WORKERS', _USABLE_CORES if _USABLE_CORES > 1 else 0))
+
+# Fonts (with their measured glyph widths) kept per process for rendering replacements
+FONT_CACHE_SIZE = int(os.getenv('FONT_CACHE_SIZE', 64))
+
+# Documents longer than this are extracted in page-range shards spread over the pool workers,
+# when the pool has more than one usable core. 0 (the default) never shards: no measurement so far shows a win
+PDF_EXTRACT_PAGES_PER_SHARD = int(os.getenv('PDF_EXTRACT_PAGES_PER_SHARD', 0))
+
+# Seconds between stack samples of a staff-requested profiled customization
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', 0.005))
+
+# Stream AI rewrites and align/match each finished line while the rest is still generating
+AI_STREAMING = os.getenv('AI_STREAMING', 'true').lower() == 'true'
+
+# Groups outside Summary whose TF-IDF similarity to the job description is below this
+# are left as they are instead of being sent to the AI; 0 sends every group
+AI_RELEVANCE_THRESHOLD = float(os.getenv('AI_RELEVANCE_THRESHOLD', 0.02))
+# At most this many of those groups per section are sent, best scoring first; 0 means no cap
+AI_RELEVANCE_TOP_K = int(os.getenv('AI_RELEVANCE_TOP_K', 0))
+
+# Upper bound on concurrent AI calls made for the groups of one async customization
+AI_MAX_CONCURRENT_CALLS = 4
+
+# Fair-share scheduler caps (per process): customizations running at once, and AI calls in flight.
+# Queued work is served interactive > dry run > bulk, round-robin between users within a class.
+CUSTOMIZE_MAX_CONCURRENT = int(os.getenv('CUSTOMIZE_MAX_CONCURRENT', 8))
+AI_MAX_CONCURRENT_REQUESTS = int(os.getenv('AI_MAX_CONCURRENT_REQUESTS', 16))
+
+# Import the PDF and AI libraries when a WSGI/ASGI worker boots instead of on its first request.
+# Management commands and the test runner never preload.
+PRELOAD_WORKER_MODULES = os.getenv('PRELOAD_WORKER_MODULES', 'false').lower() == 'true'
+
+# How long a duplicate customize request waits for the identical in-flight one (seconds)
+CUSTOMIZE_INFLIGHT_TIMEOUT = 300
+
 
 
 # Default primary key field type
@@ -169,34 +242,57 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 
+# Log records are handed to a background thread (api.utils.log_handlers.QueueListenerHandler);
+# formatting and file/console I/O never run on the request thread. LOG_FORMAT=json writes one
+# JSON object per line. Per-span INFO events are kept for LOG_SPAN_SAMPLE_RATE of requests.
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'verbose')
+LOG_SPAN_SAMPLE_RATE = float(os.getenv('LOG_SPAN_SAMPLE_RATE', 0.01))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
     'formatters': {
         'verbose': {
-            'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
+            'format': '{levelname} {asctime} {module} {process:d} {thread:d} {request_id} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'api.utils.log_handlers.JsonFormatter',
+        },
+    },
+    'filters': {
+        'request_context': {
+            '()': 'api.utils.log_handlers.RequestContextFilter',
+        },
+        'span_sampling': {
+            '()': 'api.utils.log_handlers.SpanSamplingFilter',
+            'rate': LOG_SPAN_SAMPLE_RATE,
+        },
     },
     'handlers': {
         'file': {
             'level': 'INFO',
-            'class': 'logging.FileHandler',
+            'class': 'api.utils.log_handlers.LogFileHandler',
             'filename': os.path.join(BASE_DIR, 'logs', 'resume_customizer.log'),
-            'formatter': 'verbose',
+            'formatter': LOG_FORMAT,
         },
         'console': {
             'level': 'DEBUG',
             'class': 'logging.StreamHandler',
-            'formatter': 'verbose',
+            'formatter': LOG_FORMAT,
+        },
+        'queue': {
+            'class': 'api.utils.log_handlers.QueueListenerHandler',
+            'handlers': ['file', 'console'],
+            'filters': ['request_context', 'span_sampling'],
         },
     },
     'loggers': {
         'resume_customizer': {
-            'handlers': ['file', 'console'],
-            'level': 'INFO',
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
             'propagate': True,
         },
     },
 }
-os.makedirs(os.path.join(BASE_DIR, 'logs'), exist_ok=True)
\ No newline at end of file
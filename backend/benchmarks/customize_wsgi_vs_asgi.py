@@ -0,0 +1,161 @@
+"""Load comparison of the WSGI customize view against the native async one.
+
+Usage (from backend/):
+    python benchmarks/customize_wsgi_vs_asgi.py --requests 48 --threads 8 --ai-latency 0.5
+
+The AI client is replaced by a fake that sleeps for --ai-latency seconds per call, so the
+numbers measure how many customizations a single worker keeps in flight, not provider speed.
+The sync path runs requests on --threads threads (a threaded WSGI worker); the async path runs
+every request on one event loop (a single ASGI worker). A throwaway test database is used.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django
+django.setup()
+
+import fitz
+from django.conf import settings
+from django.db import connection
+from django.test import Client, AsyncClient
+from django.test.utils import setup_test_environment
+from django.contrib.auth.models import User
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class FakeResponse:
+    def __init__(self, contents):
+        # Echo the original section back so the pipeline renders realistic replacements
+        marker = 'SECTION:'
+        text = contents.split(marker, 2)[1] if marker in contents else contents
+        self.text = text.rsplit('INSTRUCTIONS:', 1)[0]
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+def split_stream(contents, pieces=4):
+    text = FakeResponse(contents).text
+    size = max(1, -(-len(text) // pieces))
+    return [FakeChunk(text[i:i + size]) for i in range(0, len(text), size)]
+
+
+class FakeModels:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def generate_content(self, contents, model):
+        time.sleep(self.latency)
+        return FakeResponse(contents)
+
+    def generate_content_stream(self, contents, model):
+        chunks = split_stream(contents)
+        for chunk in chunks:
+            time.sleep(self.latency / len(chunks))
+            yield chunk
+
+
+class FakeAsyncModels(FakeModels):
+    async def generate_content(self, contents, model):
+        await asyncio.sleep(self.latency)
+        return FakeResponse(contents)
+
+    async def generate_content_stream(self, contents, model):
+        chunks = split_stream(contents)
+
+        async def stream():
+            for chunk in chunks:
+                await asyncio.sleep(self.latency / len(chunks))
+                yield chunk
+        return stream()
+
+
+class FakeClient:
+    def __init__(self, latency):
+        self.models = FakeModels(latency)
+        self.aio = mock.Mock(models=FakeAsyncModels(latency))
+
+
+def make_resume(path):
+    doc = fitz.open()
+    page = doc.new_page()
+    y = 60
+    for section in ['Summary', 'Experience', 'Skills', 'Education']:
+        page.insert_text((50, y), section.upper(), fontsize=14)
+        y += 22
+        for line in range(4):
+            page.insert_text((50, y), f"Built {section.lower()} tooling {line} with Python and Django.", fontsize=10)
+            y += 14
+        y += 30
+    doc.save(path)
+    doc.close()
+
+
+def post_data(pdf_path, i):
+    return {'master_resume': open(pdf_path, 'rb'), 'job_description': f'Backend engineer posting #{i}'}
+
+
+def run_sync(pdf_path, token, requests, threads, url):
+    client = Client(headers={'Authorization': f'Bearer {token}'})
+
+    def one(i):
+        return client.post(url, post_data(pdf_path, i)).status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        statuses = list(pool.map(one, range(requests)))
+    return time.perf_counter() - start, statuses
+
+
+async def run_async(pdf_path, token, requests, url):
+    client = AsyncClient()
+    headers = {'Authorization': f'Bearer {token}'}
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(
+        client.post(url, post_data(pdf_path, requests + i), headers=headers) for i in range(requests)
+    ))
+    return time.perf_counter() - start, [r.status_code for r in responses]
+
+
+def report(label, elapsed, statuses):
+    ok = sum(1 for s in statuses if s in (200, 201))
+    print(f"{label:>28}: {len(statuses) / elapsed:6.2f} req/s, {elapsed:6.2f}s total, {ok}/{len(statuses)} ok")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=48)
+    parser.add_argument('--threads', type=int, default=8, help="Threads of the simulated WSGI worker")
+    parser.add_argument('--ai-latency', type=float, default=0.5, help="Seconds per fake AI call")
+    args = parser.parse_args()
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    with tempfile.TemporaryDirectory() as tmp, \
+            mock.patch('api.utils.ai_service.genai.Client', lambda api_key, http_options=None: FakeClient(args.ai_latency)):
+        settings.MEDIA_ROOT = tmp
+        pdf_path = os.path.join(tmp, 'resume.pdf')
+        make_resume(pdf_path)
+        user = User.objects.create_user(username='bench', password='bench')
+        token = str(RefreshToken.for_user(user).access_token)
+
+        print(f"requests={args.requests} ai_latency={args.ai_latency}s pdf_pool_workers={settings.PDF_POOL_WORKERS}")
+        elapsed, statuses = run_sync(pdf_path, token, args.requests, args.threads, '/api/customized-resumes/customize')
+        report(f'WSGI view, {args.threads} threads', elapsed, statuses)
+        elapsed, statuses = asyncio.run(run_async(pdf_path, token, args.requests, '/api/customized-resumes/customize-async'))
+        report('ASGI view, 1 event loop', elapsed, statuses)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""Local stand-in for the Gemini REST API with configurable latency and error rates.
+
+Usage (from backend/):
+    python benchmarks/fake_ai_server.py --port 8765 --latency lognormal:0.8,0.4 --error-rate 0.02
+
+Then run the backend with GEMINI_BASE_URL=http://127.0.0.1:8765. Both generateContent and
+streamGenerateContent (server-sent events) are served. A response echoes the section text of
+the prompt, so the pipeline renders realistic replacements. Used by benchmarks/loadtest.py.
+
+Latency specs (seconds): fixed:S, uniform:LOW,HIGH, lognormal:MEDIAN,SIGMA.
+"""
+import re
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Latency:
+    """A latency distribution parsed from a spec such as 'lognormal:0.8,0.4'"""
+
+    def __init__(self, spec):
+        kind, _, args = spec.partition(':')
+        values = [float(v) for v in args.split(',') if v]
+        if kind == 'fixed' and len(values) == 1:
+            self._sample = lambda: values[0]
+        elif kind == 'uniform' and len(values) == 2:
+            self._sample = lambda: random.uniform(*values)
+        elif kind == 'lognormal' and len(values) == 2:
+            median, sigma = values
+            self._sample = lambda: random.lognormvariate(math.log(median), sigma)
+        else:
+            raise ValueError(f'Bad latency spec {spec!r}; use fixed:S, uniform:LOW,HIGH or lognormal:MEDIAN,SIGMA')
+        self.spec = spec
+
+    def sample(self):
+        return max(0.0, self._sample())
+
+
+class CallStats:
+    """Thread-safe record of every call the fake server answered"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.errors = 0
+
+    def record(self, seconds, error):
+        with self._lock:
+            self.latencies.append(seconds)
+            self.errors += error
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.latencies), self.errors
+
+
+def echo_text(prompt):
+    # Same shape as the prompts built by AIService: the section sits between these markers
+    match = re.search(r'SECTION:(.*?)INSTRUCTIONS:', prompt, re.S)
+    return (match.group(1) if match else prompt).strip()
+
+
+def candidate(text):
+    return {
+        'candidates': [{'content': {'parts': [{'text': text}], 'role': 'model'}, 'finishReason': 'STOP', 'index': 0}],
+        'usageMetadata': {'promptTokenCount': 0, 'candidatesTokenCount': len(text.split())},
+    }
+
+
+class FakeAIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        started = time.perf_counter()
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        prompt = ''.join(
+            part.get('text', '') for content in body.get('contents', []) for part in content.get('parts', [])
+        )
+        delay = server.latency.sample()
+
+        if random.random() < server.error_rate:
+            time.sleep(delay)
+            self._send_json(server.error_status, {'error': {'code': server.error_status, 'message': 'injected error'}})
+            server.stats.record(time.perf_counter() - started, True)
+            return
+
+        text = echo_text(prompt)
+        if ':streamGenerateContent' in self.path:
+            self._stream(text, delay)
+        else:
+            time.sleep(delay)
+            self._send_json(200, candidate(text))
+        server.stats.record(time.perf_counter() - started, False)
+
+    def _stream(self, text, delay):
+        # The first chunk arrives after a third of the latency, the rest is spread evenly
+        words = text.split(' ')
+        pieces = max(1, min(self.server.stream_chunks, len(words)))
+        size = -(-len(words) // pieces)
+        chunks = [' '.join(words[i:i + size]) + (' ' if i + size < len(words) else '') for i in range(0, len(words), size)]
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for index, chunk in enumerate(chunks):
+            time.sleep(delay / 3 if index == 0 else (2 * delay / 3) / max(1, len(chunks) - 1))
+            payload = f'data: {json.dumps(candidate(chunk))}\r\n\r\n'.encode()
+            self.wfile.write(f'{len(payload):x}\r\n'.encode() + payload + b'\r\n')
+            self.wfile.flush()
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency='fixed:0.5', error_rate=0.0, error_status=500,
+                 stream_chunks=4):
+        super().__init__((host, port), FakeAIHandler)
+        self.latency = Latency(latency)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.stream_chunks = stream_chunks
+        self.stats = CallStats()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, name='fake-ai-server', daemon=True)
+        thread.start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', default='fixed:0.5')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=500)
+    args = parser.parse_args()
+
+    server = FakeAIServer(args.host, args.port, args.latency, args.error_rate, args.error_status)
+    print(f'Fake AI server on {server.url} (latency {args.latency}, error rate {args.error_rate})', file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
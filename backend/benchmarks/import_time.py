@@ -0,0 +1,71 @@
+"""Import-time profile of loading the API the way a worker or management command does.
+
+Usage (from backend/):
+    python benchmarks/import_time.py --top 15 [--raw importtime.log]
+
+Runs `python -X importtime` in a fresh interpreter that calls django.setup() and imports the
+URLconf (which pulls in every view), then prints the total and the slowest top-level packages.
+"""
+import os
+import re
+import sys
+import argparse
+import subprocess
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LINE_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+WATCHED = ['fitz', 'pymupdf', 'pdfminer', 'pikepdf', 'google.genai', 'rest_framework_simplejwt',
+           'rest_framework', 'django']
+
+
+def profile(target):
+    code = f"import django; django.setup(); import {target}"
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'backend.settings')}
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    return result.stderr
+
+
+def summarize(log):
+    """Return (total microseconds, cumulative microseconds per top-level package)"""
+    total = 0
+    packages = defaultdict(int)
+    for line in log.splitlines():
+        match = LINE_RE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        # Depth 1 entries were imported directly by the -c code; their cumulative times add up to the total
+        if indent == 1:
+            total += cumulative
+        root = name.split('.')[0]
+        watched = next((w for w in WATCHED if name == w or name.startswith(w + '.')), None)
+        key = watched or root
+        # Only count a package at its outermost appearance, so nested submodules are not double counted
+        if indent == 1 or not name.startswith(key + '.'):
+            packages[key] = max(packages[key], cumulative)
+    return total, packages
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--target', default='api.urls')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--raw', help="Also write the raw -X importtime output here")
+    args = parser.parse_args()
+
+    log = profile(args.target)
+    if args.raw:
+        with open(args.raw, 'w') as f:
+            f.write(log)
+    total, packages = summarize(log)
+    print(f"django.setup() + import {args.target}: {total / 1000:.0f} ms")
+    for name, cumulative in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:<28} {cumulative / 1000:8.1f} ms")
+    loaded = [w for w in WATCHED if re.search(rf'\| +{re.escape(w)}$', log, re.M)]
+    print(f"heavy packages loaded: {', '.join(loaded) or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Polling throughput with and without the JWT user cache.
+
+Usage (from backend/):
+    python benchmarks/jwt_user_cache.py --requests 2000 --threads 4
+
+Polls the list endpoint and the status-style detail endpoint of customized resumes with a
+bearer token, once with JWT_USER_CACHE_TTL=0 (user looked up every request) and once with the
+cache on. A throwaway test database is used; with Postgres over the network the saved query
+is worth more than on a local SQLite file.
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django
+django.setup()
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment
+from django.contrib.auth.models import User
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.models import MasterResume, JobDescription, CustomizedResume
+
+
+class UserQueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if 'FROM "auth_user"' in sql:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+
+def make_rows(user, count):
+    master = MasterResume.objects.create(user=user, resume_file=ContentFile(b'%PDF-1.4', name='m.pdf'))
+    job = JobDescription.objects.create(user=user, job_title='Engineer', description_text='Python')
+    rows = [
+        CustomizedResume(user=user, master_resume=master, job_description=job,
+                         customized_resume_file=f'customized_resumes/{i}.pdf')
+        for i in range(count)
+    ]
+    return CustomizedResume.objects.bulk_create(rows)
+
+
+def run(token, paths, requests, threads):
+    client = Client(headers={'Authorization': f'Bearer {token}'})
+    counter = UserQueryCounter()
+
+    def one(i):
+        with connection.execute_wrapper(counter):
+            return client.get(paths[i % len(paths)]).status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        statuses = list(pool.map(one, range(requests)))
+    return time.perf_counter() - start, statuses, counter.count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    user = User.objects.create_user(username='bench', password='bench')
+    rows = make_rows(user, 20)
+    token = str(RefreshToken.for_user(user).access_token)
+    paths = ['/api/customized-resumes/', f'/api/customized-resumes/{rows[0].id}/']
+
+    print(f"requests={args.requests} threads={args.threads} cache={settings.CACHES['default']['BACKEND']}")
+    for ttl in (0, 60):
+        settings.JWT_USER_CACHE_TTL = ttl
+        cache.clear()
+        elapsed, statuses, user_queries = run(token, paths, args.requests, args.threads)
+        ok = sum(1 for s in statuses if s == 200)
+        label = f'JWT_USER_CACHE_TTL={ttl}'
+        print(f"{label:>24}: {len(statuses) / elapsed:7.1f} req/s, {user_queries / len(statuses):.2f} user "
+              f"queries/req, {ok}/{len(statuses)} ok")
+    connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,326 @@
+"""Load test of the customize endpoint against a fake AI provider.
+
+Usage (from backend/):
+    # start the backend too (manage.py runserver, pointed at the fake AI server)
+    python benchmarks/loadtest.py --serve --concurrency 8 --duration 60 --ai-latency lognormal:0.8,0.4
+
+    # drive a backend that is already running with GEMINI_BASE_URL=http://127.0.0.1:8765
+    python benchmarks/loadtest.py --target http://127.0.0.1:8000 --ai-port 8765 --rate 2 --duration 60
+
+A fake Gemini server (benchmarks/fake_ai_server.py) runs in this process. Traffic is either
+closed-loop (--concurrency workers, each sending its next request when the last one returns)
+or open-loop (--rate requests per second whatever the response times; latency is measured
+from the scheduled send time, so a backlog shows up in the numbers). Every request uploads a
+generated resume with a unique job description, so idempotency replay never short-circuits it.
+Users are registered through /api/register for each run.
+
+The report gives throughput and p50/p95/p99 latency with error rates per stage: the client
+round trip of customize and of the download, the server stages from the Server-Timing header
+(queue, upload, extract, ai, render, save) and the individual fake AI calls. The error rate of
+the server ai stage is the share of section rewrites that failed and kept the original text
+(the ai-fallback Server-Timing entry); those requests still succeed.
+"""
+import os
+import sys
+import time
+import uuid
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_ai_server import FakeAIServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_STAGES = ['queue', 'upload', 'extract', 'ai', 'render', 'save']
+
+
+def make_resume(path, pages):
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        y = 60
+        for section in ['Summary', 'Experience', 'Skills', 'Education']:
+            page.insert_text((50, y), section.upper(), fontsize=14)
+            y += 22
+            for line in range(6):
+                page.insert_text(
+                    (50, y), f"Delivered project {page_num}-{line} with Python, Django and PostgreSQL.", fontsize=10
+                )
+                y += 14
+            y += 30
+    doc.save(path)
+    doc.close()
+
+
+def job_description(run_id, i):
+    return (
+        f"Backend engineer posting {run_id}-{i}. We are looking for an engineer experienced in Python, "
+        f"Django, PostgreSQL and cloud deployments to build document processing services."
+    )
+
+
+def parse_server_timing(header):
+    timings = {}
+    for entry in filter(None, (part.strip() for part in (header or '').split(','))):
+        name, _, params = entry.partition(';')
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'dur':
+                timings[name.strip()] = float(value) / 1000
+    return timings
+
+
+def parse_ai_fallbacks(header):
+    """(failed, requested) AI rewrites from an ai-fallback;desc="F/R" Server-Timing entry, or None"""
+    for entry in (part.strip() for part in (header or '').split(',')):
+        name, _, params = entry.partition(';')
+        if name.strip() == 'ai-fallback':
+            failed, _, requested = params.partition('=')[2].strip('"').partition('/')
+            return int(failed), int(requested)
+    return None
+
+
+def percentile(sorted_values, p):
+    # Nearest-rank percentile
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    """Latencies and error counts per stage, shared by all client threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.attempts = {}
+        self.errors = {}
+        self.error_samples = {}
+        # Per server stage [failed, total] units of work reported by successful responses
+        self.server_errors = {}
+
+    def record_server_errors(self, stage, failed, total):
+        with self._lock:
+            counts = self.server_errors.setdefault(stage, [0, 0])
+            counts[0] += failed
+            counts[1] += total
+
+    def record(self, stage, seconds=None, error=None):
+        with self._lock:
+            self.attempts[stage] = self.attempts.get(stage, 0) + 1
+            if error is None:
+                self.latencies.setdefault(stage, []).append(seconds)
+            else:
+                self.errors[stage] = self.errors.get(stage, 0) + 1
+                self.error_samples.setdefault(stage, {}).setdefault(error, 0)
+                self.error_samples[stage][error] += 1
+
+
+class LoadTest:
+    def __init__(self, target, pdf_path, endpoint, users, download, timeout):
+        self.target = target.rstrip('/')
+        self.pdf_path = pdf_path
+        self.endpoint = endpoint
+        self.download = download
+        self.timeout = timeout
+        self.run_id = uuid.uuid4().hex[:8]
+        self.recorder = Recorder()
+        self.sessions = [self._register(k) for k in range(users)]
+        with open(pdf_path, 'rb') as f:
+            self.pdf_bytes = f.read()
+
+    def _register(self, k):
+        session = requests.Session()
+        response = session.post(f'{self.target}/api/register', json={
+            'username': f'loadtest-{self.run_id}-{k}', 'password': uuid.uuid4().hex,
+        }, timeout=self.timeout)
+        response.raise_for_status()
+        session.headers['Authorization'] = f"Bearer {response.json()['accessToken']}"
+        return session
+
+    def one(self, i, scheduled=None):
+        session = self.sessions[i % len(self.sessions)]
+        started = scheduled if scheduled is not None else time.perf_counter()
+        try:
+            response = session.post(
+                f'{self.target}/api/customized-resumes/{self.endpoint}',
+                data={'job_description': job_description(self.run_id, i)},
+                files={'master_resume': ('resume.pdf', self.pdf_bytes, 'application/pdf')},
+                timeout=self.timeout,
+            )
+        except requests.RequestException as e:
+            self.recorder.record('customize', error=type(e).__name__)
+            return
+        elapsed = time.perf_counter() - started
+        if response.status_code not in (200, 201):
+            self.recorder.record('customize', error=f'HTTP {response.status_code}')
+            return
+        self.recorder.record('customize', elapsed)
+        for stage, seconds in parse_server_timing(response.headers.get('Server-Timing')).items():
+            self.recorder.record(f'server:{stage}', seconds)
+        fallbacks = parse_ai_fallbacks(response.headers.get('Server-Timing'))
+        if fallbacks is not None:
+            self.recorder.record_server_errors('server:ai', *fallbacks)
+
+        if self.download:
+            started = time.perf_counter()
+            try:
+                download = session.get(response.json()['download_url'], timeout=self.timeout)
+                error = None if download.status_code == 200 else f'HTTP {download.status_code}'
+            except requests.RequestException as e:
+                error = type(e).__name__
+            self.recorder.record('download', time.perf_counter() - started, error)
+
+    def closed_loop(self, concurrency, duration, total):
+        deadline = time.perf_counter() + duration
+        counter = iter(range(total or sys.maxsize))
+        lock = threading.Lock()
+
+        def worker():
+            while time.perf_counter() < deadline:
+                with lock:
+                    i = next(counter, None)
+                if i is None:
+                    return
+                self.one(i)
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def open_loop(self, rate, duration, total, max_in_flight):
+        count = min(int(rate * duration), total or sys.maxsize)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+            for i in range(count):
+                scheduled = start + i / rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self.one, i, scheduled)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_backend(port, ai_url):
+    env = dict(os.environ, GEMINI_BASE_URL=ai_url, GEMINI_AI_KEY='loadtest')
+    manage = [sys.executable, 'manage.py']
+    subprocess.run(manage + ['migrate', '--noinput', '-v', '0'], cwd=BACKEND_DIR, env=env, check=True)
+    process = subprocess.Popen(
+        manage + ['runserver', '--noreload', f'127.0.0.1:{port}'], cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f'http://127.0.0.1:{port}'
+    for _ in range(100):
+        if process.poll() is not None:
+            raise RuntimeError('runserver exited during startup')
+        try:
+            requests.get(f'{url}/api/user', timeout=1)
+            return process, url
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('runserver did not start')
+
+
+def report(recorder, ai_stats, elapsed):
+    completed = len(recorder.latencies.get('customize', []))
+    print(f"\n{completed} customizations in {elapsed:.1f}s: {completed / elapsed:.2f} req/s")
+    print(f"{'stage':<16} {'count':>6} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+
+    ai_latencies, ai_errors = ai_stats
+    rows = [('customize', 'customize'), ('download', 'download')]
+    rows += [(f'server:{stage}', f'server:{stage}') for stage in SERVER_STAGES]
+    stages = [(label, sorted(recorder.latencies.get(key, [])), recorder.attempts.get(key, 0), recorder.errors.get(key, 0))
+              for label, key in rows if recorder.attempts.get(key)]
+    stages.append(('ai call', sorted(ai_latencies), len(ai_latencies), ai_errors))
+
+    for label, latencies, attempts, errors in stages:
+        # Server stages only exist on successful responses, their failures count under customize;
+        # a server stage's own rate covers work it absorbed, such as AI rewrites that fell back
+        if label.startswith('server:'):
+            failed, total = recorder.server_errors.get(label, (0, 0))
+            error_rate = f'{failed / total:.1%}' if total else '-'
+        else:
+            error_rate = f'{errors / attempts:.1%}' if attempts else '-'
+        cells = [percentile(latencies, p) for p in (50, 95, 99)]
+        cells = ''.join(f' {c * 1000:8.1f}' if c is not None else f" {'-':>8}" for c in cells)
+        print(f"{label:<16} {attempts:>6} {error_rate:>7}{cells}")
+
+    for stage, samples in recorder.error_samples.items():
+        print(f"{stage} errors: " + ', '.join(f'{error} x{count}' for error, count in samples.items()))
+    failed, total = recorder.server_errors.get('server:ai', (0, 0))
+    if failed:
+        print(f"server:ai fallbacks: {failed} of {total} section rewrites failed and kept the original text")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--target', help="Base URL of a running backend")
+    parser.add_argument('--serve', action='store_true', help="Start manage.py runserver for the run")
+    parser.add_argument('--endpoint', choices=['customize', 'customize-async'], default='customize')
+    parser.add_argument('--concurrency', type=int, default=4, help="Closed-loop workers")
+    parser.add_argument('--rate', type=float, help="Open-loop requests per second (overrides --concurrency)")
+    parser.add_argument('--max-in-flight', type=int, default=256, help="Open-loop client thread limit")
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds to send traffic for")
+    parser.add_argument('--requests', type=int, help="Stop after this many requests")
+    parser.add_argument('--users', type=int, default=4, help="Registered users the traffic is spread over")
+    parser.add_argument('--pages', type=int, default=1, help="Pages of the generated resume")
+    parser.add_argument('--no-download', dest='download', action='store_false', help="Skip the download stage")
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--ai-port', type=int, default=0, help="Fake AI server port (0 picks a free one)")
+    parser.add_argument('--ai-latency', default='lognormal:0.5,0.3', help="fixed:S, uniform:LOW,HIGH or lognormal:MEDIAN,SIGMA")
+    parser.add_argument('--ai-error-rate', type=float, default=0.0)
+    parser.add_argument('--ai-error-status', type=int, default=500)
+    args = parser.parse_args()
+    if bool(args.target) == args.serve:
+        parser.error('pass exactly one of --target or --serve')
+
+    ai_server = FakeAIServer(
+        port=args.ai_port, latency=args.ai_latency, error_rate=args.ai_error_rate, error_status=args.ai_error_status
+    ).start()
+    backend = None
+    target = args.target
+    if args.serve:
+        backend, target = start_backend(free_port(), ai_server.url)
+    else:
+        print(f"Fake AI server on {ai_server.url}; the backend must run with GEMINI_BASE_URL={ai_server.url}")
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_path = os.path.join(tmp, 'resume.pdf')
+            make_resume(pdf_path, args.pages)
+            load = LoadTest(target, pdf_path, args.endpoint, args.users, args.download, args.timeout)
+            mode = f'rate={args.rate}/s' if args.rate else f'concurrency={args.concurrency}'
+            print(f"{target} endpoint={args.endpoint} {mode} duration={args.duration}s pages={args.pages} "
+                  f"ai_latency={args.ai_latency} ai_error_rate={args.ai_error_rate}")
+
+            start = time.perf_counter()
+            if args.rate:
+                load.open_loop(args.rate, args.duration, args.requests, args.max_in_flight)
+            else:
+                load.closed_loop(args.concurrency, args.duration, args.requests)
+            report(load.recorder, ai_server.stats.snapshot(), time.perf_counter() - start)
+    finally:
+        if backend is not None:
+            backend.terminate()
+            backend.wait()
+        ai_server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Latency of extracting one long resume: a single task vs page-range shards over the pool.
+
+Usage (from backend/):
+    python benchmarks/page_sharded_extraction.py --workers 4 --pages 1 2 10 30
+
+For each page count the document is extracted once as a single pool task and once through
+pdf_pool.extract_text_with_layout with --pages-per-shard shards. The pool is warmed up first,
+so the numbers are per-request latency, not worker start-up. Sharding needs more than one
+usable core; on a single core both columns run the same single task.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django
+django.setup()
+
+import fitz
+from django.conf import settings
+from api.utils import pdf_pool
+
+
+def make_resume(path, pages):
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        y = 60
+        for section in ['Publications', 'Experience', 'Teaching', 'Grants']:
+            page.insert_text((50, y), section.upper(), fontsize=14)
+            y += 22
+            for line in range(12):
+                page.insert_text(
+                    (50, y),
+                    f"Entry {page_num}-{line}: distributed data systems, Python, PostgreSQL, 2019-2024.",
+                    fontsize=10
+                )
+                y += 14
+    doc.save(path)
+    doc.close()
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 2, 10, 30])
+    parser.add_argument('--pages-per-shard', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    settings.PDF_POOL_WORKERS = args.workers
+    settings.PDF_EXTRACT_PAGES_PER_SHARD = args.pages_per_shard
+    pdf_pool.warm_up()
+
+    print(f"workers={args.workers} pages_per_shard={args.pages_per_shard} usable_cores={pdf_pool.usable_cores()}")
+    print(f"{'pages':>5} {'shards':>6} {'single task':>12} {'sharded':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            path = os.path.join(tmp, f'resume_{pages}.pdf')
+            make_resume(path, pages)
+            shards = pdf_pool.page_shards(path)
+            single = best_of(lambda: pdf_pool.run_pdf_task('extract_text_with_layout', path), args.repeat)
+            sharded = best_of(lambda: pdf_pool.extract_text_with_layout(path), args.repeat)
+            print(f"{pages:>5} {len(shards) if shards else 1:>6} {single * 1000:>9.1f} ms {sharded * 1000:>7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Throughput of the parse + render stages through the PDF process pool.
+
+Usage (from backend/):
+    python benchmarks/pdf_pool_throughput.py --workers 1 4 8 --jobs 64 --pages 2
+
+Each job extracts a generated resume and renders a replacement for every span, which is the
+CPU-bound part of a customization. Jobs are submitted from a thread pool sized like a threaded
+WSGI server so the numbers reflect request threads waiting on the process pool.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django
+django.setup()
+
+import fitz
+from django.conf import settings
+from api.utils import pdf_pool
+
+
+def make_resume(path, pages):
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        y = 60
+        for section in ['Summary', 'Experience', 'Skills', 'Education']:
+            page.insert_text((50, y), section.upper(), fontsize=14)
+            y += 22
+            for line in range(8):
+                page.insert_text(
+                    (50, y),
+                    f"Delivered project {page_num}-{line} using Python, Django and PostgreSQL at scale.",
+                    fontsize=10
+                )
+                y += 14
+            y += 10
+    doc.save(path)
+    doc.close()
+
+
+def run_job(pdf_path):
+    layout_info, text_blocks = pdf_pool.extract_text_with_layout(pdf_path)
+    replacements = {
+        key: {'text': info['text'].upper(), 'info': info}
+        for key, info in text_blocks.items()
+    }
+    output_path = pdf_pool.replace_text_in_pdf(pdf_path, replacements)
+    os.remove(output_path)
+    return len(layout_info)
+
+
+def bench(workers, jobs, pdf_path, threads):
+    settings.PDF_POOL_WORKERS = workers
+    pdf_pool._executor = None
+    pdf_pool.warm_up()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as request_threads:
+        list(request_threads.map(run_job, [pdf_path] * jobs))
+    elapsed = time.perf_counter() - start
+    if pdf_pool._executor is not None:
+        pdf_pool._executor.shutdown()
+    return jobs / elapsed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 4, 8],
+                        help="Pool sizes to compare; 0 runs inline on the request threads")
+    parser.add_argument('--jobs', type=int, default=32)
+    parser.add_argument('--pages', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=16, help="Concurrent request threads")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.MEDIA_ROOT = tmp
+        pdf_path = os.path.join(tmp, 'resume.pdf')
+        make_resume(pdf_path, args.pages)
+        print(f"cpus={os.cpu_count()} jobs={args.jobs} pages={args.pages} threads={args.threads}")
+        for workers in args.workers:
+            throughput, elapsed = bench(workers, args.jobs, pdf_path, args.threads)
+            label = 'inline' if workers == 0 else f'{workers} workers'
+            print(f"{label:>10}: {throughput:6.2f} docs/s ({elapsed:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
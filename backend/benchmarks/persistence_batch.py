@@ -0,0 +1,112 @@
+"""Database time per batch of customization results: per-row creates vs CustomizationBatch.
+
+Usage (from backend/):
+    python benchmarks/persistence_batch.py --sizes 1 10 50 100
+
+"per-row" replays the previous _save_to_database sequence for every result (create the master
+resume, the job description and the customized resume, save the file with an UPDATE, create
+the draft; no transaction). "batch" writes the same rows with CustomizationBatch. A throwaway
+test database is used; only time spent executing SQL is counted as DB time.
+"""
+import os
+import sys
+import time
+import hashlib
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django
+django.setup()
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test.utils import setup_test_environment
+from django.contrib.auth.models import User
+
+from api.models import MasterResume, JobDescription, CustomizedResume, CustomizationDraft
+from api.services.persistence import CustomizationBatch
+
+PDF_BYTES = b'%PDF-1.4\n' + b'0' * 20000
+
+
+class QueryTimer:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+
+
+def per_row(user, size, pdf_path):
+    for i in range(size):
+        master = MasterResume.objects.create(resume_file=ContentFile(PDF_BYTES, name='resume.pdf'), user=user)
+        job = JobDescription.objects.create(description_text=f'Job {i}', user=user)
+        with open(pdf_path, 'rb') as f:
+            pdf_bytes = f.read()
+        customized = CustomizedResume.objects.create(
+            master_resume=master, job_description=job, user=user,
+            content_hash=hashlib.sha256(pdf_bytes).hexdigest()
+        )
+        customized.customized_resume_file.save('customized_resume.pdf', ContentFile(pdf_bytes), save=False)
+        customized.save(update_fields=['customized_resume_file', 'thumbnail'])
+        CustomizationDraft.objects.create(
+            user=user, master_resume=master, job_description=job, job_description_text=f'Job {i}',
+            replacements={}, group_rewrites=[], customized_resume=customized
+        )
+
+
+def batched(user, size, pdf_path):
+    batch = CustomizationBatch(user)
+    for i in range(size):
+        batch.add(ContentFile(PDF_BYTES, name='resume.pdf'), f'Job {i}', pdf_path,
+                  draft={'job_description_text': f'Job {i}', 'replacements': {}, 'group_rewrites': []})
+    batch.commit()
+
+
+def measure(fn, user, size, pdf_path):
+    timer = QueryTimer()
+    start = time.perf_counter()
+    with connection.execute_wrapper(timer):
+        fn(user, size, pdf_path)
+    return timer, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 50, 100])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.MEDIA_ROOT = tmp
+        pdf_path = os.path.join(tmp, 'rendered.pdf')
+        with open(pdf_path, 'wb') as f:
+            f.write(PDF_BYTES)
+        user = User.objects.create_user(username='bench', password='bench')
+
+        print(f"database={connection.vendor} repeat={args.repeat} (best run shown)")
+        print(f"{'size':>5} {'mode':>8} {'queries':>8} {'DB ms':>9} {'DB ms/row':>10} {'wall ms':>9}")
+        for size in args.sizes:
+            for label, fn in (('per-row', per_row), ('batch', batched)):
+                timer, wall = min((measure(fn, user, size, pdf_path) for _ in range(args.repeat)),
+                                  key=lambda result: result[0].seconds)
+                print(f"{size:>5} {label:>8} {timer.count:>8} {timer.seconds * 1000:>9.1f} "
+                      f"{timer.seconds * 1000 / size:>10.2f} {wall * 1000:>9.1f}")
+    connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Time per render of the replacement stage, and what the process-wide font cache saves.
+
+Usage (from backend/):
+    python benchmarks/render_fonts.py --renders 20 --pages 2
+
+Renders a generated resume (base-14 fonts) and one that embeds its font, replacing every span
+with upper-cased text, the way a customization does. Each render is a fresh document, so the
+only state carried between renders is the process-wide font cache.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django
+django.setup()
+
+import fitz
+from django.conf import settings
+from api.utils.pdf_processor import PDFProcessor
+
+
+def make_resume(path, pages, embed_font):
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        fontname = 'helv'
+        if embed_font:
+            fontname = 'Emb'
+            page.insert_font(fontname=fontname, fontbuffer=fitz.Font('tiro').buffer)
+        y = 60
+        for section in ['Summary', 'Experience', 'Skills', 'Education']:
+            page.insert_text((50, y), section.upper(), fontname=fontname, fontsize=14)
+            y += 22
+            for line in range(8):
+                page.insert_text(
+                    (50, y),
+                    f"Delivered project {page_num}-{line} using Python, Django and PostgreSQL at scale.",
+                    fontname=fontname, fontsize=10
+                )
+                y += 14
+    doc.save(path)
+    doc.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--renders', type=int, default=20)
+    parser.add_argument('--pages', type=int, default=2)
+    args = parser.parse_args()
+
+    processor = PDFProcessor()
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.MEDIA_ROOT = tmp
+        for label, embed_font in [('base-14', False), ('embedded', True)]:
+            path = os.path.join(tmp, f'{label}.pdf')
+            make_resume(path, args.pages, embed_font)
+            _, text_blocks = processor.extract_text_with_layout(path)
+            replacements = {key: {'text': block['text'].upper(), 'info': block} for key, block in text_blocks.items()}
+
+            timings = []
+            for _ in range(args.renders):
+                start = time.perf_counter()
+                os.remove(processor.replace_text_in_pdf(path, replacements))
+                timings.append(time.perf_counter() - start)
+            first, rest = timings[0], sorted(timings[1:])
+            print(f"{label:>9}: {len(replacements)} spans, first render {first * 1000:.1f} ms, "
+                  f"then min {rest[0] * 1000:.1f} ms / median {rest[len(rest) // 2] * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
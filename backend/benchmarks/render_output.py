@@ -0,0 +1,67 @@
+"""Render time, output size and re-open cost of customized PDFs.
+
+Usage (from backend/):
+    python benchmarks/render_output.py --renders 15 --pages 2 [--embed-font]
+
+Every span of a generated resume is replaced with upper-cased text. Reported: replacement
+stage time, size of the output file, bytes of page content streams, and the time to re-open
+the output and extract its text (what thumbnails, recustomization and downloads pay later).
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django
+django.setup()
+
+import fitz
+from django.conf import settings
+from api.utils.pdf_processor import PDFProcessor
+from render_fonts import make_resume
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--renders', type=int, default=15)
+    parser.add_argument('--pages', type=int, default=2)
+    parser.add_argument('--embed-font', action='store_true')
+    args = parser.parse_args()
+
+    processor = PDFProcessor()
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.MEDIA_ROOT = tmp
+        path = os.path.join(tmp, 'resume.pdf')
+        make_resume(path, args.pages, args.embed_font)
+        _, text_blocks = processor.extract_text_with_layout(path)
+        replacements = {key: {'text': block['text'].upper(), 'info': block} for key, block in text_blocks.items()}
+
+        timings = []
+        for _ in range(args.renders):
+            start = time.perf_counter()
+            output_path = processor.replace_text_in_pdf(path, replacements)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+
+        with fitz.open(output_path) as doc:
+            content_bytes = sum(len(page.read_contents()) for page in doc)
+        start = time.perf_counter()
+        for _ in range(50):
+            with fitz.open(output_path) as doc:
+                for page in doc:
+                    page.get_text()
+        reopen = (time.perf_counter() - start) / 50
+
+        print(f"input {os.path.getsize(path)} B, {len(replacements)} spans")
+        print(f"render min {timings[0] * 1000:.1f} ms, median {timings[len(timings) // 2] * 1000:.1f} ms")
+        print(f"output {os.path.getsize(output_path)} B, content streams {content_bytes} B, "
+              f"re-open + text {reopen * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()